@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from api import crud
+from api.model import ClanSQL, ClanLanguagesSQL, Clan, ClanChanges, CountryStats, parse_country
+from database import meta
+from database.meta import bump_dataset_version, notify_dataset_change
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Simple queries are awaited directly. Functions with more logic run their api.crud version on the
+# sync session behind the AsyncSession (run_sync), which still does its I/O through the async driver.
+
+async def get_dataset_version(db: AsyncSession) -> str:
+    """
+    Return the dataset version as "<epoch>.<version>", it changes whenever the clans change.
+    """
+    return await db.run_sync(meta.get_dataset_version)
+
+async def create_clan(db: AsyncSession, clan_id: int, clan_tag: str, clan_name: str, country: str) -> Clan:
+    """
+    Create a new clan entry in the database.
+    """
+    try:
+        country_enum = parse_country(country)
+    except ValueError:
+        logger.error(f"Invalid country provided: {country}")
+        raise
+
+    new_clan = ClanSQL(id=clan_id, clan_tag=clan_tag, clan_name=clan_name, country=country_enum.name)
+    try:
+        db.add(new_clan)
+        await db.run_sync(bump_dataset_version)
+        await db.commit()
+        notify_dataset_change()
+        await db.refresh(new_clan)
+        logger.info(f"Successfully created clan: {clan_name} with ID: {clan_id}", extra={"rate_limit_key": "crud.create_clan"})
+        return Clan.model_validate(new_clan)
+    except IntegrityError:
+        await db.rollback()
+        logger.error(f"Clan with ID {clan_id} already exists.")
+        raise ValueError(f"Clan with ID {clan_id} already exists.")
+    except Exception as e:
+        await db.rollback()
+        logger.error(f"An error occurred while creating the clan: {e}")
+        raise ValueError(f"An error occurred while creating the clan: {e}")
+
+async def get_existing_clan_ids(db: AsyncSession, clan_ids: List[int]) -> set:
+    """
+    Return the subset of the given clan IDs already stored in the database.
+    """
+    if not clan_ids:
+        return set()
+    return set((await db.scalars(select(ClanSQL.id).where(ClanSQL.id.in_(clan_ids)))).all())
+
+async def create_clans(db: AsyncSession, clans: List[Clan]) -> Dict[int, str]:
+    """
+    Create several clans in a single transaction, see api.crud.create_clans.
+    """
+    return await db.run_sync(crud.create_clans, clans)
+
+async def read_clan(db: AsyncSession, clan_id: int) -> Optional[Clan]:
+    """
+    Read a clan's information by its ID.
+    """
+    clan = await db.get(ClanSQL, clan_id)
+    if clan:
+        logger.debug(f"Successfully retrieved clan: {clan_id}", extra={"rate_limit_key": "crud.read_clan"})
+        return Clan.model_validate(clan)
+    logger.warning(f"Clan with ID {clan_id} not found.", extra={"rate_limit_key": "crud.read_clan.missing"})
+    return None
+
+async def update_clan(db: AsyncSession, clan_id: int, clan_tag: str = None, clan_name: str = None, country: str = None) -> Clan:
+    """
+    Update an existing clan's tag, name, or country, see api.crud.update_clan.
+    """
+    return await db.run_sync(crud.update_clan, clan_id, clan_tag, clan_name, country)
+
+async def delete_clan(db: AsyncSession, clan_id: int) -> dict:
+    """
+    Delete a clan entry by its ID, see api.crud.delete_clan.
+    """
+    return await db.run_sync(crud.delete_clan, clan_id)
+
+async def get_clan_rows(db: AsyncSession, country: Optional[str] = None) -> List[tuple]:
+    """
+    Get all clans, or the clans of one country, as (id, clan_tag, clan_name, country) tuples.
+    """
+    query = crud.clan_rows_query(country)
+    try:
+        rows = (await db.execute(query)).all()
+    except Exception as e:
+        logger.error(f"Error fetching clan rows for country {country}: {e}")
+        raise
+
+    logger.info(f"Successfully retrieved {len(rows)} clan rows{f' for country {country}' if country else ''}.")
+    return rows
+
+async def get_clans_page(db: AsyncSession, limit: Optional[int], after_id: Optional[int] = None, fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Get one page of clans using keyset pagination on the clan ID, see api.crud.get_clans_page.
+    """
+    fields = fields or list(Clan.model_fields)
+    try:
+        rows = (await db.execute(crud.clans_page_query(limit, after_id, fields))).all()
+    except Exception as e:
+        logger.error(f"Error fetching clans page after ID {after_id}: {e}")
+        raise
+
+    clans, last_id = crud.clans_page_from_rows(rows, limit, fields)
+    logger.info(f"Successfully retrieved {len(clans)} clans after ID {after_id}.")
+    return clans, last_id
+
+async def search_clans(db: AsyncSession, query: str, limit: int) -> List[Clan]:
+    """
+    Search clans by tag prefix or accent-insensitive name, best match first.
+    """
+    return await db.run_sync(crud.search_clans, query, limit)
+
+async def get_cached_languages(db: AsyncSession, clan_id: int, max_age: timedelta) -> Optional[ClanLanguagesSQL]:
+    """
+    Get the cached languages of a clan if they were fetched less than max_age ago.
+    """
+    cutoff = datetime.utcnow() - max_age
+    return await db.scalar(select(ClanLanguagesSQL).where(ClanLanguagesSQL.clan_id == clan_id, ClanLanguagesSQL.fetched_at >= cutoff))
+
+async def save_languages(db: AsyncSession, clan_id: int, languages: List[str]) -> ClanLanguagesSQL:
+    """
+    Store freshly scraped languages for a clan, replacing any cached ones.
+    """
+    entry = await db.merge(ClanLanguagesSQL(clan_id=clan_id, languages=sorted(languages), fetched_at=datetime.utcnow()))
+    await db.commit()
+    logger.debug(f"Cached {len(languages)} languages for clan ID {clan_id}")
+    return entry
+
+async def get_country_stats(db: AsyncSession) -> List[CountryStats]:
+    """
+    Get the number of clans of each country that has clans, largest first.
+    """
+    return await db.run_sync(crud.get_country_stats)
+
+async def get_clan_changes(db: AsyncSession, since: int, limit: int) -> ClanChanges:
+    """
+    Get the clans created, updated or deleted after the change sequence number since, see api.crud.get_clan_changes.
+    """
+    return await db.run_sync(crud.get_clan_changes, since, limit)
@@ -0,0 +1,167 @@
+from fastapi import APIRouter, Depends, Query, Request
+from api import async_crud
+from api.model import Clan, ClanChanges, CountryStats, ClanInsertRequest, ClanInsertResult
+from api.route_helpers import BatchInsert, clan_from_wg, http_errors, languages_response, next_page_headers, parse_page_params
+from api.serialization import clan_rows_to_dicts
+from api.http_cache import async_conditional_json_response
+from api.snapshots import async_snapshot_response
+from api.routes import router
+from database.async_database import get_async_db
+from scraper.scraper import get_languages
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from utils.logging import setup_logger
+from utils.wg_api import get_wg_client
+from utils.config import LANGUAGES_TTL, MAX_PAGE_SIZE, MAX_SEARCH_RESULTS, SNAPSHOT_CACHE_ENABLED
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Async versions of the database routes of api.routes, served when DATABASE_ASYNC is enabled.
+# Request handling lives in api.route_helpers, these routes only differ by their database calls.
+async_router = APIRouter()
+
+@async_router.get("/clans", response_model=List[Clan], summary="Get all clans", tags=["Clans"])
+async def get_all_clans_endpoint(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, enables pagination."),
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page."),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. clan_tag,country."),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns all clans stored in the database.
+
+    When `limit` or `after` is given, clans are paginated by ID: the response carries a
+    `Link: <...>; rel="next"` header and an `X-Next-Cursor` header while more clans remain.
+    Responses carry an ETag, send it back in `If-None-Match` to get a 304 while no clan changed.
+    """
+    with http_errors("fetching all clans"):
+        page = parse_page_params(limit, after, fields)
+        if page is None:
+            if SNAPSHOT_CACHE_ENABLED:
+                return await async_snapshot_response(request, db)
+
+            async def build_all_clans():
+                return clan_rows_to_dicts(await async_crud.get_clan_rows(db))
+            return await async_conditional_json_response(request, db, build_all_clans)
+
+        limit, after_id, selected_fields = page
+        headers = {}
+        async def build_page():
+            clans, last_id = await async_crud.get_clans_page(db, limit, after_id=after_id, fields=selected_fields)
+            headers.update(next_page_headers(request, limit, last_id))
+            return clans
+        return await async_conditional_json_response(request, db, build_page, headers)
+
+@async_router.get("/clans/search", response_model=List[Clan], summary="Search clans by tag or name", tags=["Clans"])
+async def search_clans_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Words to match as prefixes of the clan tag or name."),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Full-text search over clan tags and names, ignoring case and accents, best match first.
+    """
+    async def build_results():
+        return [clan.model_dump(mode="json") for clan in await async_crud.search_clans(db, q, limit)]
+
+    with http_errors(f"searching clans for '{q}'"):
+        return await async_conditional_json_response(request, db, build_results)
+
+@async_router.get("/clans/changes", response_model=ClanChanges, summary="Get the clans changed since a cursor", tags=["Clans"])
+async def get_clan_changes_endpoint(
+    request: Request,
+    since: int = Query(0, ge=0, description="The next value of the previous call, 0 for a first sync."),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Returns the clans created, updated or deleted since the cursor, each with its current state.
+
+    Call again with `since` set to `next` while `has_more` is true. When `resync` is true the
+    changes are no longer available: download `/clans`, then continue from `next`.
+    """
+    async def build_changes():
+        return (await async_crud.get_clan_changes(db, since, limit)).model_dump(mode="json")
+
+    with http_errors(f"fetching clan changes since {since}"):
+        return await async_conditional_json_response(request, db, build_changes)
+
+@async_router.post("/clans/insert_by_id", response_model=Clan, summary="Insert a new clan by ID", tags=["Clans"])
+async def insert_new_clan_by_id(clan_data: ClanInsertRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Inserts a new clan into the database by fetching name and tag from the Wargaming API.
+    """
+    with http_errors(f"inserting clan {clan_data.id}", "Internal server error"):
+        clan = clan_from_wg(clan_data, await get_wg_client().get_clan(clan_data.id))
+        return await async_crud.create_clan(db, clan.id, clan.clan_tag, clan.clan_name, clan.country.value)
+
+@async_router.post("/clans/insert_by_ids", response_model=List[ClanInsertResult], summary="Insert several clans by ID", tags=["Clans"])
+async def insert_new_clans_by_ids(clans_data: List[ClanInsertRequest], db: AsyncSession = Depends(get_async_db)):
+    """
+    Inserts several clans at once, fetching names and tags from the Wargaming API in batches.
+
+    Every ID gets its own result (created, duplicate, not_found or invalid_country), and all
+    new clans are inserted in a single transaction.
+    """
+    batch = BatchInsert(clans_data)
+    with http_errors("inserting clans", "Internal server error"):
+        missing_ids = batch.add_existing(await async_crud.get_existing_clan_ids(db, batch.valid_ids))
+        new_clans = batch.add_wg_clans(await get_wg_client().get_clans(missing_ids))
+        batch.add_inserted(new_clans, await async_crud.create_clans(db, new_clans))
+    return batch.response()
+
+@async_router.post("/clans/insert", response_model=Clan, summary="Insert a new clan", tags=["Clans"])
+async def insert_new_clan(clan_data: Clan, db: AsyncSession = Depends(get_async_db)):
+    """
+    Inserts a new clan into the database.
+    """
+    with http_errors(f"inserting clan {clan_data.id}"):
+        return await async_crud.create_clan(db, clan_data.id, clan_data.clan_tag, clan_data.clan_name, clan_data.country)
+
+@async_router.get("/clans/{clan_id}/languages", summary="Get languages for a clan", tags=["Scrapper"])
+async def get_clan_languages(clan_id: int, db: AsyncSession = Depends(get_async_db)):
+    """
+    Returns the languages of a clan, from the cache when fresh and by web scraping otherwise.
+    """
+    with http_errors(f"retrieving languages for clan ID {clan_id}"):
+        entry = await async_crud.get_cached_languages(db, clan_id, LANGUAGES_TTL)
+        if entry is None:
+            entry = await async_crud.save_languages(db, clan_id, await get_languages(clan_id))
+        return languages_response(clan_id, entry)
+
+@async_router.get("/clans/country/{country_name}", response_model=list[Clan], summary="Get clans by country", tags=["Clans"])
+async def get_clans_by_country_endpoint(request: Request, country_name: str, db: AsyncSession = Depends(get_async_db)):
+    """
+    Get all clans from a specific country.
+    """
+    async def build_country_clans():
+        return clan_rows_to_dicts(await async_crud.get_clan_rows(db, country_name))
+
+    with http_errors(f"retrieving clans for country {country_name}"):
+        if SNAPSHOT_CACHE_ENABLED:
+            return await async_snapshot_response(request, db, country_name)
+        return await async_conditional_json_response(request, db, build_country_clans)
+
+@async_router.get("/countries/stats", response_model=List[CountryStats], summary="Get clan counts per country", tags=["Countries"])
+async def get_country_stats_endpoint(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Returns the number of clans of each country that has clans, largest first.
+    """
+    async def build_stats():
+        return [entry.model_dump() for entry in await async_crud.get_country_stats(db)]
+
+    with http_errors("retrieving country statistics"):
+        return await async_conditional_json_response(request, db, build_stats)
+
+def build_async_router() -> APIRouter:
+    """
+    Router of the API in async mode: the async database routes, then the routes of api.routes they don't replace.
+    """
+    replaced = {(route.path, method) for route in async_router.routes for method in route.methods}
+    combined = APIRouter()
+    combined.routes.extend(async_router.routes)
+    combined.routes.extend(route for route in router.routes if not any((route.path, method) in replaced for method in route.methods))
+    return combined
@@ -1,7 +1,14 @@
-from typing import List
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, insert, select
 from sqlalchemy.orm import Session
-from api.model import ClanSQL, Country, Clan
+from api.model import ClanSQL, ClanLanguagesSQL, Country, CountryStats, Clan, ClanChange, ClanChanges, parse_country
 from sqlalchemy.exc import IntegrityError
+from database.search import search_clan_ids
+from database.stats import get_country_counts
+from database.meta import bump_dataset_version, notify_dataset_change, get_dataset_epoch
+from database.changes import get_change_log_floor, get_changed_clan_ids, get_last_seq
+from database.seeds import FREED_TAG_PREFIX
 from utils.logging import setup_logger
 
 # Set up the logger for this file/module
@@ -13,24 +20,26 @@ def create_clan(db: Session, clan_id: int, clan_tag: str, clan_name: str, countr
     """
     # Validate and convert country
     try:
-        country_enum = Country[country.upper()]
-    except KeyError:
+        country_enum = parse_country(country)
+    except ValueError:
         logger.error(f"Invalid country provided: {country}")
-        raise ValueError(f"Invalid country: {country}")
+        raise
 
     # Instantiate SQLAlchemy model (ClanSQL) instead of Pydantic model (Clan)
     new_clan = ClanSQL(
         id=clan_id,
         clan_tag=clan_tag,
         clan_name=clan_name,
-        country=country_enum
+        country=country_enum.name
     )
 
     try:
         db.add(new_clan)
+        bump_dataset_version(db)
         db.commit()
+        notify_dataset_change()
         db.refresh(new_clan)
-        logger.info(f"Successfully created clan: {clan_name} with ID: {clan_id}")
+        logger.info(f"Successfully created clan: {clan_name} with ID: {clan_id}", extra={"rate_limit_key": "crud.create_clan"})
         return Clan.model_validate(new_clan)  # Use model_validate instead of from_orm
     except IntegrityError:
         db.rollback()
@@ -41,16 +50,138 @@ def create_clan(db: Session, clan_id: int, clan_tag: str, clan_name: str, countr
         logger.error(f"An error occurred while creating the clan: {e}")
         raise ValueError(f"An error occurred while creating the clan: {e}")
 
+def get_existing_clan_ids(db: Session, clan_ids: List[int]) -> set:
+    """
+    Return the subset of the given clan IDs already stored in the database.
+    """
+    if not clan_ids:
+        return set()
+    return {row[0] for row in db.query(ClanSQL.id).filter(ClanSQL.id.in_(clan_ids))}
+
+def create_clans(db: Session, clans: List[Clan]) -> Dict[int, str]:
+    """
+    Create several clans in a single transaction.
+
+    Clans whose ID or tag is already taken, in the database or earlier in the list, are skipped.
+
+    Returns:
+        A mapping of each skipped clan ID to the reason it was skipped.
+    """
+    taken_ids = get_existing_clan_ids(db, [clan.id for clan in clans])
+    tags = [clan.clan_tag for clan in clans]
+    taken_tags = {tag: clan_id for clan_id, tag in db.query(ClanSQL.id, ClanSQL.clan_tag).filter(ClanSQL.clan_tag.in_(tags))} if tags else {}
+
+    skipped = {}
+    rows = []
+    for clan in clans:
+        if clan.id in taken_ids:
+            skipped[clan.id] = f"Clan with ID {clan.id} already exists."
+        elif clan.clan_tag in taken_tags:
+            skipped[clan.id] = f"Clan tag {clan.clan_tag} is already used by clan ID {taken_tags[clan.clan_tag]}."
+        else:
+            taken_ids.add(clan.id)
+            taken_tags[clan.clan_tag] = clan.id
+            rows.append({"id": clan.id, "clan_tag": clan.clan_tag, "clan_name": clan.clan_name, "country": clan.country.name})
+
+    try:
+        if rows:
+            db.execute(insert(ClanSQL.__table__), rows)
+            bump_dataset_version(db)
+            db.commit()
+            notify_dataset_change()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"An error occurred while creating {len(rows)} clans: {e}")
+        raise ValueError(f"An error occurred while creating the clans: {e}")
+
+    logger.info(f"Successfully created {len(rows)} clans, skipped {len(skipped)}.")
+    return skipped
+
+def _free_wanted_tags(db: Session, rows: List[dict]) -> int:
+    """
+    Give a placeholder tag to the clans of rows whose current tag another row renames a clan to,
+    which breaks tags swapped between clans.
+
+    Returns:
+        The number of clans whose tag was freed.
+    """
+    clans = ClanSQL.__table__
+    wanted = {row["b_tag"] for row in rows}
+    current = db.execute(select(clans.c.id, clans.c.clan_tag).where(clans.c.id.in_([row["b_id"] for row in rows]))).all()
+    freed = [{"b_id": clan_id, "b_tag": f"{FREED_TAG_PREFIX}{clan_id}"} for clan_id, clan_tag in current if clan_tag in wanted]
+    if freed:
+        db.execute(clans.update().where(clans.c.id == bindparam("b_id")).values(clan_tag=bindparam("b_tag")), freed)
+    return len(freed)
+
+def bulk_update_clans(db: Session, renames: List[dict], disbanded: Dict[int, bool], chunk_size: int = 500) -> Dict[int, str]:
+    """
+    Apply tag and name changes and disbanded flags to many clans in a single transaction.
+
+    Args:
+        db: Database session to query the database.
+        renames: {"id", "clan_tag", "clan_name"} of the clans whose tag or name changed.
+        disbanded: The new is_disbanded flag of the clans whose flag changed.
+        chunk_size: IDs per UPDATE ... WHERE id IN statement.
+
+    Returns:
+        A mapping of each clan ID left unrenamed to the reason, when its new tag is still used by another clan.
+        A clan whose tag was passed to another one keeps a placeholder tag in that case.
+    """
+    clans = ClanSQL.__table__
+    rename = clans.update().where(clans.c.id == bindparam("b_id")).values(clan_tag=bindparam("b_tag"), clan_name=bindparam("b_name"))
+    params = [{"b_id": clan["id"], "b_tag": clan["clan_tag"], "b_name": clan["clan_name"]} for clan in renames]
+
+    skipped = {}
+    try:
+        try:
+            with db.begin_nested():
+                if params:
+                    db.execute(rename, params)
+        except IntegrityError:
+            # A new tag is still held by another clan. Rename one clan at a time, retrying the
+            # conflicting ones while others succeed, so tags passed from clan to clan still resolve.
+            pending = params
+            while pending:
+                conflicts = []
+                for row in pending:
+                    try:
+                        with db.begin_nested():
+                            db.execute(rename, row)
+                    except IntegrityError:
+                        conflicts.append(row)
+                # Stuck on tags swapped between clans, free them and retry
+                if len(conflicts) == len(pending) and not _free_wanted_tags(db, conflicts):
+                    break
+                pending = conflicts
+            for row in pending:
+                skipped[row["b_id"]] = f"Clan tag {row['b_tag']} is already used by another clan."
+
+        for flag in (True, False):
+            clan_ids = [clan_id for clan_id, value in disbanded.items() if value is flag]
+            for i in range(0, len(clan_ids), chunk_size):
+                db.execute(clans.update().where(clans.c.id.in_(clan_ids[i:i + chunk_size])).values(is_disbanded=flag))
+
+        bump_dataset_version(db)
+        db.commit()
+        notify_dataset_change()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"An error occurred while updating {len(renames)} clans: {e}")
+        raise ValueError(f"An error occurred while updating the clans: {e}")
+
+    logger.info(f"Renamed {len(params) - len(skipped)} clans, skipped {len(skipped)}, changed the disbanded flag of {len(disbanded)}.")
+    return skipped
+
 def read_clan(db: Session, clan_id: int):
     """
     Read a clan's information by its ID.
     """
     clan = db.query(ClanSQL).filter(ClanSQL.id == clan_id).first()  # Use ClanSQL for database query
     if clan:
-        logger.info(f"Successfully retrieved clan: {clan_id}")
+        logger.debug(f"Successfully retrieved clan: {clan_id}", extra={"rate_limit_key": "crud.read_clan"})
         return Clan.model_validate(clan)  # Use model_validate instead of from_orm
     else:
-        logger.warning(f"Clan with ID {clan_id} not found.")
+        logger.warning(f"Clan with ID {clan_id} not found.", extra={"rate_limit_key": "crud.read_clan.missing"})
     return None
 
 def update_clan(db: Session, clan_id: int, clan_tag: str = None, clan_name: str = None, country: str = None):
@@ -71,14 +202,16 @@ def update_clan(db: Session, clan_id: int, clan_tag: str = None, clan_name: str
         clan.clan_name = clan_name
     if country:
         try:
-            country_enum = Country[country.upper()]
-            logger.info(f"Updating country to {country_enum} for clan ID {clan_id}")
-            clan.country = country_enum
-        except KeyError:
+            country_enum = parse_country(country)
+        except ValueError:
             logger.error(f"Invalid country: {country} for clan ID {clan_id}")
-            raise ValueError(f"Invalid country: {country}")
+            raise
+        logger.info(f"Updating country to {country_enum.name} for clan ID {clan_id}")
+        clan.country = country_enum.name
 
+    bump_dataset_version(db)
     db.commit()
+    notify_dataset_change()
     db.refresh(clan)
     logger.info(f"Successfully updated clan ID {clan_id}")
     return Clan.model_validate(clan)  # Use model_validate instead of from_orm
@@ -93,8 +226,11 @@ def delete_clan(db: Session, clan_id: int):
         logger.warning(f"Clan with ID {clan_id} does not exist.")
         raise ValueError(f"Clan with ID {clan_id} does not exist.")
     
+    db.query(ClanLanguagesSQL).filter(ClanLanguagesSQL.clan_id == clan_id).delete()
     db.delete(clan)
+    bump_dataset_version(db)
     db.commit()
+    notify_dataset_change()
     logger.info(f"Successfully deleted clan ID {clan_id}")
     return {"message": f"Clan with ID {clan_id} has been deleted."}
 
@@ -116,39 +252,200 @@ def get_all_clans(db: Session) -> List[ClanSQL]:
         logger.error(f"Error fetching clans: {e}")
         raise
 
+def clan_rows_query(country: Optional[str] = None):
+    """
+    Select (id, clan_tag, clan_name, country) of all clans, or of the clans of one country, by ID.
+    """
+    clans = ClanSQL.__table__
+    query = select(clans.c.id, clans.c.clan_tag, clans.c.clan_name, clans.c.country).order_by(clans.c.id)
+    if country is not None:
+        country_enum = parse_country(country)
+        query = query.where(clans.c.country == country_enum.name)
+    return query
+
+def get_clan_rows(db: Session, country: Optional[str] = None) -> List[tuple]:
+    """
+    Get all clans, or the clans of one country, as (id, clan_tag, clan_name, country) tuples.
+
+    Skips the ORM objects and model validation, for list endpoints that encode the rows directly.
+    """
+    query = clan_rows_query(country)
+    try:
+        rows = db.execute(query).all()
+    except Exception as e:
+        logger.error(f"Error fetching clan rows for country {country}: {e}")
+        raise
+
+    logger.info(f"Successfully retrieved {len(rows)} clan rows{f' for country {country}' if country else ''}.")
+    return rows
+
+def clans_page_query(limit: Optional[int], after_id: Optional[int], fields: List[str]):
+    """
+    Select the fields of the clans after after_id by ID, plus one row to know whether another page exists.
+    """
+    query = select(*[getattr(ClanSQL, field) for field in fields]).order_by(ClanSQL.id)
+    if after_id is not None:
+        query = query.where(ClanSQL.id > after_id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+def clans_page_from_rows(rows: List[tuple], limit: Optional[int], fields: List[str]) -> Tuple[List[dict], Optional[int]]:
+    """
+    Turn the rows of clans_page_query into clan dictionaries and the cursor ID of the next page.
+    """
+    has_more = limit is not None and len(rows) > limit
+    rows = rows[:limit] if has_more else rows
+
+    clans = []
+    for row in rows:
+        clan = dict(zip(fields, row))
+        if "country" in clan:
+            clan["country"] = Country[clan["country"]].value
+        clans.append(clan)
+    return clans, (clans[-1]["id"] if has_more else None)
+
+def get_clans_page(db: Session, limit: Optional[int], after_id: Optional[int] = None, fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[int]]:
+    """
+    Get one page of clans using keyset pagination on the clan ID.
+
+    Args:
+        db: Database session to query the database.
+        limit: Maximum number of clans to return, or None for all remaining clans.
+        after_id: Only return clans with an ID strictly greater than this one.
+        fields: Clan fields to select, defaults to all fields.
+
+    Returns:
+        The clans as dictionaries, and the last returned ID if more clans remain (else None).
+    """
+    fields = fields or list(Clan.model_fields)
+    try:
+        rows = db.execute(clans_page_query(limit, after_id, fields)).all()
+    except Exception as e:
+        logger.error(f"Error fetching clans page after ID {after_id}: {e}")
+        raise
+
+    clans, last_id = clans_page_from_rows(rows, limit, fields)
+    logger.info(f"Successfully retrieved {len(clans)} clans after ID {after_id}.")
+    return clans, last_id
+
+def search_clans(db: Session, query: str, limit: int) -> List[Clan]:
+    """
+    Search clans by tag prefix or accent-insensitive name, best match first, see search_clan_ids.
+    """
+    try:
+        clan_ids = search_clan_ids(db, query, limit)
+        clans_by_id = {clan.id: clan for clan in db.query(ClanSQL).filter(ClanSQL.id.in_(clan_ids))} if clan_ids else {}
+    except Exception as e:
+        logger.error(f"Error searching clans for '{query}': {e}")
+        raise
+
+    logger.info(f"Found {len(clan_ids)} clans matching '{query}'.")
+    return [Clan.model_validate(clans_by_id[clan_id]) for clan_id in clan_ids if clan_id in clans_by_id]
+
 def get_clans_by_country(db: Session, country: str):
     """
     Get all clans from a specific country.
     """
-    # Normalize the input by replacing spaces with underscores and uppercasing
-    country_normalized = country.replace(" ", "_").upper()
-    
     try:
-        # Match the input to the Enum
-        country_enum = Country[country_normalized]
+        country_enum = parse_country(country)
         logger.info(f"Fetching clans for country: {country_enum.value}")
-    except KeyError:
+    except ValueError:
         logger.error(f"Invalid country: {country}")
-        raise ValueError(f"Invalid country: {country}")
+        raise
 
     try:
-        # Query the database with the country value (in DB format: UPPER)
-        clans_db = db.query(ClanSQL).filter(ClanSQL.country == country_enum.value.upper()).all()
+        # The country column is indexed and always holds the enum name
+        rows = (
+            db.query(ClanSQL.id, ClanSQL.clan_tag, ClanSQL.clan_name)
+            .filter(ClanSQL.country == country_enum.name)
+            .order_by(ClanSQL.id)
+            .all()
+        )
 
-        if clans_db:
-            logger.info(f"Successfully retrieved {len(clans_db)} clans for country: {country_enum.value}")
+        if rows:
+            logger.info(f"Successfully retrieved {len(rows)} clans for country: {country_enum.value}")
         else:
             logger.info(f"No clans found for country: {country_enum.value}")
 
-        # Before validating, fix the country value to match Pydantic expectations (title-case)
-        clans_fixed = []
-        for clan in clans_db:
-            clan_dict = clan.__dict__.copy()
-            clan_dict['country'] = clan.country.title()
-            clans_fixed.append(Clan.model_validate(clan_dict))
-        
-        return clans_fixed
+        # Rows come from the database, so skip validating them again
+        return [Clan.model_construct(id=clan_id, clan_tag=clan_tag, clan_name=clan_name, country=country_enum) for clan_id, clan_tag, clan_name in rows]
 
     except Exception as e:
         logger.error(f"Error while fetching clans for country {country_enum.value}: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def get_cached_languages(db: Session, clan_id: int, max_age: timedelta) -> Optional[ClanLanguagesSQL]:
+    """
+    Get the cached languages of a clan if they were fetched less than max_age ago.
+    """
+    cutoff = datetime.utcnow() - max_age
+    return db.query(ClanLanguagesSQL).filter(ClanLanguagesSQL.clan_id == clan_id, ClanLanguagesSQL.fetched_at >= cutoff).first()
+
+def save_languages(db: Session, clan_id: int, languages: List[str]) -> ClanLanguagesSQL:
+    """
+    Store freshly scraped languages for a clan, replacing any cached ones.
+    """
+    entry = db.merge(ClanLanguagesSQL(clan_id=clan_id, languages=sorted(languages), fetched_at=datetime.utcnow()))
+    db.commit()
+    logger.debug(f"Cached {len(languages)} languages for clan ID {clan_id}")
+    return entry
+
+def get_clan_ids_with_stale_languages(db: Session, max_age: timedelta, country: Optional[str] = None) -> List[int]:
+    """
+    Get the IDs of clans whose languages were never fetched or are older than max_age.
+    """
+    cutoff = datetime.utcnow() - max_age
+    query = (
+        db.query(ClanSQL.id)
+        .outerjoin(ClanLanguagesSQL, ClanLanguagesSQL.clan_id == ClanSQL.id)
+        .filter((ClanLanguagesSQL.fetched_at == None) | (ClanLanguagesSQL.fetched_at < cutoff))  # noqa: E711
+        .order_by(ClanSQL.id)
+    )
+    if country:
+        country_enum = parse_country(country)
+        query = query.filter(ClanSQL.country == country_enum.name)
+    return [row[0] for row in query]
+
+def get_country_stats(db: Session) -> List[CountryStats]:
+    """
+    Get the number of clans of each country that has clans, largest first.
+    """
+    try:
+        counts = get_country_counts(db)
+    except Exception as e:
+        logger.error(f"Error fetching country statistics: {e}")
+        raise
+
+    logger.info(f"Successfully retrieved clan counts for {len(counts)} countries.")
+    return [CountryStats(country=entry.country, name=Country[entry.country].value, clan_count=entry.clan_count) for entry in counts]
+
+def get_clan_changes(db: Session, since: int, limit: int) -> ClanChanges:
+    """
+    Get the clans created, updated or deleted after the change sequence number since.
+
+    Each clan appears once, with its current state, ordered by its latest change. next is the
+    cursor of the following call. resync is set when since is 0, unknown, or older than the
+    compacted part of the log: the client must then download /clans and continue from next.
+    """
+    try:
+        epoch = get_dataset_epoch(db)
+        last_seq = get_last_seq(db)
+        floor = get_change_log_floor(db)
+        if since == 0 or since < floor or since > last_seq:
+            logger.info(f"Change cursor {since} is outside the log ({floor}, {last_seq}], a full resync is needed.")
+            return ClanChanges(epoch=epoch, next=last_seq, has_more=False, resync=True, changes=[])
+
+        changed = get_changed_clan_ids(db, since, limit)
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        clan_ids = [clan_id for clan_id, _ in changed]
+        rows = db.execute(clan_rows_query().where(ClanSQL.id.in_(clan_ids))).all() if clan_ids else []
+    except Exception as e:
+        logger.error(f"Error fetching clan changes since {since}: {e}")
+        raise
+
+    clans = {row.id: Clan(id=row.id, clan_tag=row.clan_tag, clan_name=row.clan_name, country=row.country) for row in rows}
+    changes = [ClanChange(seq=seq, id=clan_id, deleted=clan_id not in clans, clan=clans.get(clan_id)) for clan_id, seq in changed]
+    logger.info(f"Successfully retrieved {len(changes)} clan changes since {since}.")
+    return ClanChanges(epoch=epoch, next=changed[-1][1] if has_more else last_seq, has_more=has_more, resync=False, changes=changes)
@@ -0,0 +1,119 @@
+import gzip
+import hashlib
+from typing import Any, Awaitable, Callable, Optional, Tuple
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from api.serialization import dumps
+from database.meta import get_dataset_version
+from utils.config import COMPRESSION_MIN_SIZE, GZIP_LEVEL, BROTLI_QUALITY
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered without it
+    brotli = None
+
+IDENTITY = "identity"
+# Content codings offered to clients, preferred first when their q-values are equal
+SUPPORTED_ENCODINGS = ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the content coding for an Accept-Encoding header, honouring q-values.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+
+    best, best_quality = IDENTITY, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str, gzip_level: int = GZIP_LEVEL, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    """
+    Compress a body with the given content coding. Gzip output has no timestamp, so it is reproducible.
+    """
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return body
+
+def make_etag(version: str, request: Request, encoding: str) -> str:
+    """
+    Strong ETag of a read response: one per dataset version, URL and content coding.
+    """
+    digest = hashlib.sha1(f"{request.url.path}?{request.url.query}|{encoding}".encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Weak comparison of an If-None-Match header against an ETag, as required for GET requests.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+def cache_headers(etag: str) -> dict:
+    """
+    Headers of every cacheable read response: clients must revalidate, and the body depends on Accept-Encoding.
+    """
+    return {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+def prepare_conditional(request: Request, version: str) -> Tuple[str, dict]:
+    """
+    Negotiate the content coding of a read response and build its cache headers for a dataset version.
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    return encoding, cache_headers(make_etag(version, request, encoding))
+
+def json_response(content: Any, encoding: str, response_headers: dict, headers: Optional[dict] = None) -> Response:
+    """
+    Serve content as JSON, compressed with the negotiated coding when it is large enough.
+    """
+    body = dumps(content)
+    if encoding != IDENTITY and len(body) >= COMPRESSION_MIN_SIZE:
+        body = compress(body, encoding)
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers={**(headers or {}), **response_headers})
+
+def conditional_json_response(request: Request, db: Session, build_content: Callable[[], Any], headers: Optional[dict] = None) -> Response:
+    """
+    Serve the JSON of build_content() with a strong ETag, or a bodyless 304 if the client has it.
+
+    build_content only runs when the body is needed, and may fill headers before it returns.
+    Large bodies are compressed with the best coding the client accepts.
+    """
+    # Read the version before the content, so an ETag never labels content older than its version
+    encoding, response_headers = prepare_conditional(request, get_dataset_version(db))
+    if etag_matches(request.headers.get("if-none-match"), response_headers["ETag"]):
+        return Response(status_code=304, headers=response_headers)
+    return json_response(build_content(), encoding, response_headers, headers)
+
+async def async_conditional_json_response(request: Request, db: AsyncSession, build_content: Callable[[], Awaitable[Any]], headers: Optional[dict] = None) -> Response:
+    """
+    Async version of conditional_json_response, for an AsyncSession and an async build_content.
+    """
+    encoding, response_headers = prepare_conditional(request, await db.run_sync(get_dataset_version))
+    if etag_matches(request.headers.get("if-none-match"), response_headers["ETag"]):
+        return Response(status_code=304, headers=response_headers)
+    return json_response(await build_content(), encoding, response_headers, headers)
@@ -0,0 +1,161 @@
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from pydantic import BaseModel
+from api.model import Job, JobStatus
+from utils.config import JOB_WORKERS, JOB_HISTORY_SIZE, JOB_STOP_TIMEOUT
+from utils.logging import setup_logger
+from utils.metrics import JOBS, JOB_DURATION
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Job functions are called as func(progress, stop_event, **params). progress(done, total) updates
+# the job, and long jobs check stop_event between steps to give up early at shutdown.
+ProgressCallback = Callable[[int, int], None]
+
+class JobManager:
+    """
+    Runs long operations on a bounded thread pool and keeps their status for GET /jobs/{id}.
+
+    A job submitted while the same kind with the same parameters is queued or running is not
+    queued again, the caller gets the existing job instead. Finished jobs are kept in memory,
+    the oldest are dropped beyond history_size.
+    """
+    def __init__(self, workers: int = JOB_WORKERS, history_size: int = JOB_HISTORY_SIZE, stop_timeout: float = JOB_STOP_TIMEOUT):
+        self._workers = workers
+        self._history_size = history_size
+        self._stop_timeout = stop_timeout
+        self._stop_event = threading.Event()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, str] = {}  # Deduplication key -> ID of the queued or running job
+        self._futures: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def start(self):
+        """
+        Start the worker threads.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._stop_event.clear()
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="jobs")
+        logger.info(f"Job runner started with {self._workers} workers.")
+
+    def stop(self):
+        """
+        Cancel the queued jobs, ask the running ones to stop and wait for them up to the stop timeout.
+
+        Jobs still running after the timeout are logged and left to finish in their thread.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._stop_event.set()
+            for job_id, future in list(self._futures.items()):
+                if future.cancel():
+                    self._finish(job_id, JobStatus.CANCELLED, error="Cancelled at shutdown.")
+            running = {job_id: (future, self._jobs[job_id].kind) for job_id, future in self._futures.items()}
+        if executor is None:
+            return
+
+        executor.shutdown(wait=False)
+        _, not_done = wait([future for future, _ in running.values()], timeout=self._stop_timeout)
+        for job_id, (future, kind) in running.items():
+            if future in not_done:
+                logger.warning(f"Job {job_id} ({kind}) still running after {self._stop_timeout:.0f}s, abandoned at shutdown.")
+        logger.info("Job runner stopped.")
+
+    def submit(self, kind: str, func: Callable[..., Any], **params) -> Tuple[Job, bool]:
+        """
+        Queue func(progress, stop_event, **params) as a job of the given kind.
+
+        Returns:
+            The job, and whether it was created (False when an identical job was already active).
+        """
+        key = f"{kind}:{json.dumps(params, sort_keys=True, default=str)}"
+        with self._lock:
+            if self._executor is None:
+                raise RuntimeError("The job runner is not running.")
+            active_id = self._active.get(key)
+            if active_id is not None:
+                logger.info(f"Job {kind} {params} is already {self._jobs[active_id].status.value} as {active_id}.")
+                return self._jobs[active_id].model_copy(), False
+
+            job = Job(id=uuid.uuid4().hex, kind=kind, params=params, created_at=datetime.utcnow())
+            self._jobs[job.id] = job
+            self._active[key] = job.id
+            self._futures[job.id] = self._executor.submit(self._run, job.id, key, func, params)
+            self._evict()
+            logger.info(f"Queued job {job.id} ({kind} {params}).")
+            return job.model_copy(), True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Return a copy of a job, or None if it is unknown or was dropped from the history.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy() if job is not None else None
+
+    def list(self) -> List[Job]:
+        """
+        Return copies of the known jobs, newest first.
+        """
+        with self._lock:
+            return [job.model_copy() for job in reversed(self._jobs.values())]
+
+    def _run(self, job_id: str, key: str, func: Callable[..., Any], params: dict):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = JobStatus.RUNNING
+            job.started_at = datetime.utcnow()
+
+        def progress(done: int, total: int):
+            with self._lock:
+                job.progress = round(done / total, 4) if total else None
+
+        start_time = time.perf_counter()
+        try:
+            result = func(progress, self._stop_event, **params)
+            if isinstance(result, BaseModel):
+                result = result.model_dump(mode="json")
+            status, error = JobStatus.SUCCEEDED, None
+        except Exception as e:
+            # A job giving up because of the shutdown is cancelled, not failed
+            status = JobStatus.CANCELLED if self._stop_event.is_set() else JobStatus.FAILED
+            logger.error(f"Job {job_id} ({job.kind}) {status.value}: {e}")
+            result, error = None, str(e)
+
+        elapsed = time.perf_counter() - start_time
+        JOB_DURATION.labels(job.kind).observe(elapsed)
+        with self._lock:
+            job.result = result
+            self._finish(job_id, status, error)
+        logger.info(f"Job {job_id} ({job.kind}) {status.value} in {elapsed:.2f}s.")
+
+    def _finish(self, job_id: str, status: JobStatus, error: Optional[str] = None):
+        # Called with the lock held
+        job = self._jobs[job_id]
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if status == JobStatus.SUCCEEDED:
+            job.progress = 1.0
+        self._futures.pop(job_id, None)
+        self._active = {key: active_id for key, active_id in self._active.items() if active_id != job_id}
+        JOBS.labels(job.kind, status.value).inc()
+
+    def _evict(self):
+        # Called with the lock held, drops the oldest finished jobs beyond the history size
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self._history_size)]:
+            del self._jobs[job_id]
+
+# Shared job runner, started and stopped in the application lifespan
+job_manager = JobManager()
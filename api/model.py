@@ -1,8 +1,9 @@
 from pydantic import BaseModel, field_validator
 from enum import Enum
-from sqlalchemy import Column, Integer, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, JSON, String
 from sqlalchemy.ext.declarative import declarative_base
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 # Create a Base class for SQLAlchemy models
 Base = declarative_base()
@@ -63,16 +64,73 @@ class ClanSQL(Base):
     id: int = Column(Integer, primary_key=True, index=True)
     clan_tag: str = Column(String, unique=True, index=True)
     clan_name: str = Column(String)
-    country: str = Column(String, default=Country.UNKNOWN.value)
+    # Always the Country enum name (e.g. "UNITED_KINGDOM"), see parse_country
+    country: str = Column(String, nullable=False, default=Country.UNKNOWN.name, index=True)
+    # Set by the importer refresh when the WG API reports the clan as disbanded or unknown
+    is_disbanded: bool = Column(Boolean, nullable=False, default=False, server_default="0")
 
     def __repr__(self):
-        return f"<ClanSQL(id={self.id}, clan_tag={self.clan_tag}, clan_name={self.clan_name}, country={self.country})>"
+        return f"<ClanSQL(id={self.id}, clan_tag={self.clan_tag}, clan_name={self.clan_name}, country={self.country}, is_disbanded={self.is_disbanded})>"
 
     # Add a method to return the country as an enum instance for easier access
     @property
     def country_enum(self):
         return Country[self.country] if self.country in Country.__members__ else Country.UNKNOWN
 
+# Languages scraped from a clan's page, cached with the time they were fetched
+class ClanLanguagesSQL(Base):
+    __tablename__ = 'clan_languages'
+
+    clan_id: int = Column(Integer, ForeignKey('clans.id', ondelete="CASCADE"), primary_key=True)
+    languages: list = Column(JSON, nullable=False)
+    fetched_at = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<ClanLanguagesSQL(clan_id={self.clan_id}, languages={self.languages}, fetched_at={self.fetched_at})>"
+
+# Number of clans per country, kept up to date by triggers on the clans table
+class CountryStatsSQL(Base):
+    __tablename__ = 'country_stats'
+
+    country: str = Column(String, primary_key=True)
+    clan_count: int = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CountryStatsSQL(country={self.country}, clan_count={self.clan_count})>"
+
+# Dataset-wide values, such as the version bumped by every write to the clans table
+class DatasetMetaSQL(Base):
+    __tablename__ = 'dataset_meta'
+
+    key: str = Column(String, primary_key=True)
+    value: str = Column(String, nullable=False)
+
+    def __repr__(self):
+        return f"<DatasetMetaSQL(key={self.key}, value={self.value})>"
+
+# One row per write to the clans table, appended by triggers, for clients syncing deltas
+class ClanChangeSQL(Base):
+    __tablename__ = 'clan_changes'
+    # AUTOINCREMENT never reuses the sequence numbers of compacted rows
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    seq: int = Column(Integer, primary_key=True, autoincrement=True)
+    clan_id: int = Column(Integer, nullable=False, index=True)
+    operation: str = Column(String, nullable=False)  # "insert", "update" or "delete"
+    changed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ClanChangeSQL(seq={self.seq}, clan_id={self.clan_id}, operation={self.operation}, changed_at={self.changed_at})>"
+
+def parse_country(value: str) -> Country:
+    """
+    Match a Country by its enum name or display value, ignoring case, spaces and underscores.
+    """
+    try:
+        return Country[value.strip().replace(" ", "_").upper()]
+    except KeyError:
+        raise ValueError(f"Invalid country: {value}")
+
 # Pydantic base model for Clan
 class Clan(BaseModel):
     id: int
@@ -85,15 +143,70 @@ class Clan(BaseModel):
     
     @field_validator('country', mode="before")
     def normalize_country(cls, v):
-        if isinstance(v, str):
-            v = v.strip().title()
         if isinstance(v, Country):
             return v
-        try:
-            return Country(v)
-        except ValueError:
-            raise ValueError(f"Invalid country: {v}")
+        if isinstance(v, str):
+            return parse_country(v)
+        raise ValueError(f"Invalid country: {v}")
 
 class ClanInsertRequest(BaseModel):
     id: int
     country: Optional[str] = "Unknown"
+
+class CountryStats(BaseModel):
+    country: str
+    name: str
+    clan_count: int
+
+class ClanChange(BaseModel):
+    seq: int
+    id: int
+    deleted: bool
+    clan: Optional[Clan] = None
+
+class ClanChanges(BaseModel):
+    epoch: str
+    next: int
+    has_more: bool
+    resync: bool
+    changes: List[ClanChange]
+
+class RefreshSummary(BaseModel):
+    checked: int
+    renamed: int
+    disbanded: int
+    reactivated: int
+    failed: int
+    conflicts: Dict[int, str] = {}
+    duration_s: float
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+class Job(BaseModel):
+    id: str
+    kind: str
+    params: Dict[str, Any] = {}
+    status: JobStatus = JobStatus.QUEUED
+    progress: Optional[float] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+class InsertStatus(str, Enum):
+    CREATED = "created"
+    DUPLICATE = "duplicate"
+    NOT_FOUND = "not_found"
+    INVALID_COUNTRY = "invalid_country"
+
+class ClanInsertResult(BaseModel):
+    id: int
+    status: InsertStatus
+    clan: Optional[Clan] = None
+    detail: Optional[str] = None
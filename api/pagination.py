@@ -0,0 +1,43 @@
+import base64
+import binascii
+from typing import List, Optional
+from api.model import Clan
+
+CURSOR_PREFIX = "id:"
+
+def encode_cursor(last_id: int) -> str:
+    """
+    Build the opaque cursor pointing after the given clan ID.
+    """
+    raw = f"{CURSOR_PREFIX}{last_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Return the clan ID encoded in a cursor built by encode_cursor().
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode("ascii")).decode("ascii")
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    if not raw.startswith(CURSOR_PREFIX) or not raw[len(CURSOR_PREFIX):].isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return int(raw[len(CURSOR_PREFIX):])
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse a comma-separated fields= projection into a list of Clan field names.
+
+    The clan ID is always returned so that projected items stay identifiable.
+    """
+    if not fields:
+        return None
+
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in Clan.model_fields]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return ["id"] + [field for field in Clan.model_fields if field != "id" and field in requested]
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from api.model import Clan, ClanInsertRequest, ClanInsertResult, InsertStatus, parse_country
+from api.pagination import decode_cursor, encode_cursor, parse_fields
+from utils.config import DEFAULT_PAGE_SIZE, MAX_INSERT_BATCH_SIZE
+from utils.logging import setup_logger
+from utils.wg_api import WGAPIError
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Request handling shared by the sync routes of api.routes and the async routes of
+# api.async_routes, which only differ by how they call the database.
+
+@contextmanager
+def http_errors(action: str, internal_detail: Optional[str] = None):
+    """
+    Turn the errors raised while handling a request into HTTP errors.
+
+    ValueError becomes a 400, WGAPIError a 502 and any other error a 500, with internal_detail
+    as detail when given. HTTPException goes through unchanged.
+    """
+    try:
+        yield
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        logger.warning(f"Invalid request while {action}: {ve}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except WGAPIError as wg_err:
+        logger.error(f"WG API error while {action}: {wg_err}")
+        raise HTTPException(status_code=502, detail="Failed to fetch clans from WG API")
+    except Exception as e:
+        logger.error(f"Error while {action}: {e}")
+        raise HTTPException(status_code=500, detail=internal_detail or str(e))
+
+def parse_page_params(limit: Optional[int], after: Optional[str], fields: Optional[str]) -> Optional[Tuple[int, Optional[int], List[str]]]:
+    """
+    Validate the pagination parameters of GET /clans.
+
+    Returns:
+        None when the full list is requested, else the page size, the ID to start after and the fields.
+    """
+    if limit is None and after is None and fields is None:
+        return None
+    after_id = decode_cursor(after) if after else None
+    if limit is None and after is not None:
+        limit = DEFAULT_PAGE_SIZE
+    return limit, after_id, parse_fields(fields)
+
+def next_page_headers(request: Request, limit: int, last_id: Optional[int]) -> Dict[str, str]:
+    """
+    Link and X-Next-Cursor headers pointing to the page after last_id, none on the last page.
+    """
+    if last_id is None:
+        return {}
+    cursor = encode_cursor(last_id)
+    next_url = request.url.include_query_params(after=cursor, limit=limit)
+    return {"Link": f'<{next_url}>; rel="next"', "X-Next-Cursor": cursor}
+
+def clan_from_wg(clan_data: ClanInsertRequest, wg_clan: Optional[dict]) -> Clan:
+    """
+    Build the clan to insert from the request and its WG API record, 404 if the API does not know it.
+    """
+    logger.debug(f"WG API clan data: {wg_clan}")
+    if not wg_clan:
+        logger.warning(f"Clan ID {clan_data.id} not found in WG API.")
+        raise HTTPException(status_code=404, detail="Clan not found in WG API")
+    return Clan(id=clan_data.id, clan_tag=wg_clan["tag"], clan_name=wg_clan["name"], country=clan_data.country)
+
+def languages_response(clan_id: int, entry) -> dict:
+    """
+    Body of GET /clans/{clan_id}/languages for a cached languages entry.
+    """
+    return {"clan_id": clan_id, "languages": entry.languages, "fetched_at": entry.fetched_at}
+
+class BatchInsert:
+    """
+    Results of POST /clans/insert_by_ids, one per requested ID, filled in as the request goes.
+
+    The route reads the existing IDs, fetches the others from the WG API and inserts the new
+    clans, passing each outcome here. Repeated IDs share the result of their first occurrence.
+    """
+    def __init__(self, clans_data: List[ClanInsertRequest]):
+        if len(clans_data) > MAX_INSERT_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_INSERT_BATCH_SIZE} clans can be inserted at once.")
+
+        self.requested_ids = list(dict.fromkeys(clan_data.id for clan_data in clans_data))
+        self.results: Dict[int, ClanInsertResult] = {}
+        self.countries = {}
+        for clan_data in clans_data:
+            if clan_data.id in self.results or clan_data.id in self.countries:
+                continue
+            try:
+                self.countries[clan_data.id] = parse_country(clan_data.country)
+            except ValueError as ve:
+                self.results[clan_data.id] = ClanInsertResult(id=clan_data.id, status=InsertStatus.INVALID_COUNTRY, detail=str(ve))
+
+    @property
+    def valid_ids(self) -> List[int]:
+        """
+        IDs with a valid country, to check against the database.
+        """
+        return list(self.countries)
+
+    def add_existing(self, existing_ids: Iterable[int]) -> List[int]:
+        """
+        Record the IDs already in the database as duplicates.
+
+        Returns:
+            The IDs left to fetch from the WG API.
+        """
+        existing_ids = set(existing_ids)
+        for clan_id in existing_ids:
+            self.results[clan_id] = ClanInsertResult(id=clan_id, status=InsertStatus.DUPLICATE, detail=f"Clan with ID {clan_id} already exists.")
+        return [clan_id for clan_id in self.countries if clan_id not in existing_ids]
+
+    def add_wg_clans(self, wg_clans: Dict[int, Optional[dict]]) -> List[Clan]:
+        """
+        Record the IDs unknown to the WG API as not found.
+
+        Returns:
+            The clans to insert.
+        """
+        new_clans = []
+        for clan_id, wg_clan in wg_clans.items():
+            if not wg_clan:
+                self.results[clan_id] = ClanInsertResult(id=clan_id, status=InsertStatus.NOT_FOUND, detail="Clan not found in WG API")
+            else:
+                new_clans.append(Clan(id=clan_id, clan_tag=wg_clan["tag"], clan_name=wg_clan["name"], country=self.countries[clan_id]))
+        return new_clans
+
+    def add_inserted(self, new_clans: List[Clan], skipped: Dict[int, str]):
+        """
+        Record the inserted clans as created, and those create_clans skipped as duplicates.
+        """
+        for clan in new_clans:
+            if clan.id in skipped:
+                self.results[clan.id] = ClanInsertResult(id=clan.id, status=InsertStatus.DUPLICATE, detail=skipped[clan.id])
+            else:
+                self.results[clan.id] = ClanInsertResult(id=clan.id, status=InsertStatus.CREATED, clan=clan)
+
+    def response(self) -> List[ClanInsertResult]:
+        """
+        One result per requested ID, in request order.
+        """
+        logger.info(f"Processed batch insert of {len(self.results)} clans.")
+        return [self.results[clan_id] for clan_id in self.requested_ids]
@@ -1,18 +1,24 @@
-import json
 import os
-from fastapi import APIRouter, HTTPException, Depends
-import requests
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from importer_exporter.importer import update_clan_data
-from importer_exporter.exporter import export_clans_to_csv, export_clans_to_txt
+from importer_exporter.exporter import ExportFormat, MEDIA_TYPES, export_clans_to_file, export_filename, stream_clans
 from scraper.scraper import get_languages
-from utils.config import CSV_EXPORT_PATH, TXT_EXPORT_PATH
-from api.model import Clan, Country, ClanInsertRequest
-from api.crud import read_clan, get_clans_by_country, get_all_clans, create_clan
+from api.model import Clan, ClanChanges, Country, CountryStats, ClanInsertRequest, ClanInsertResult, Job
+from api.crud import read_clan, get_clan_rows, get_clans_page, search_clans, create_clan, create_clans, get_existing_clan_ids, get_cached_languages, save_languages, get_country_stats, get_clan_changes
+from api.route_helpers import BatchInsert, clan_from_wg, http_errors, languages_response, next_page_headers, parse_page_params
+from api.serialization import clan_rows_to_dicts
+from api.http_cache import conditional_json_response
+from api.snapshots import snapshot_response
+from api.jobs import job_manager
 from database.database import get_db
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from utils.logging import setup_logger
-from utils.config import WG_API_KEY, BASE_URL
+from utils.wg_api import get_wg_client
+from utils.metrics import render_metrics
+from utils.config import LANGUAGES_TTL, MAX_PAGE_SIZE, MAX_SEARCH_RESULTS, SNAPSHOT_CACHE_ENABLED, EXPORT_DIR
 from database.save_new_seed import export_clans_to_seed_file
 
 # Set up the logger for this file/module
@@ -21,160 +27,151 @@ logger = setup_logger(__name__)
 router = APIRouter()
 
 @router.get("/clans", response_model=List[Clan], summary="Get all clans", tags=["Clans"])
-def get_all_clans_endpoint(db: Session = Depends(get_db)):
+def get_all_clans_endpoint(
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size, enables pagination."),
+    after: Optional[str] = Query(None, description="Opaque cursor from the X-Next-Cursor header of the previous page."),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. clan_tag,country."),
+    db: Session = Depends(get_db),
+):
     """
     Returns all clans stored in the database.
+
+    When `limit` or `after` is given, clans are paginated by ID: the response carries a
+    `Link: <...>; rel="next"` header and an `X-Next-Cursor` header while more clans remain.
+    Responses carry an ETag, send it back in `If-None-Match` to get a 304 while no clan changed.
     """
-    try:
-        clans = get_all_clans(db)
-        logger.info(f"Successfully fetched {len(clans)} clans from the database.")
-        return clans
-    except Exception as e:
-        logger.error(f"Error fetching all clans: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    with http_errors("fetching all clans"):
+        page = parse_page_params(limit, after, fields)
+        if page is None:
+            if SNAPSHOT_CACHE_ENABLED:
+                return snapshot_response(request, db)
+            return conditional_json_response(request, db, lambda: clan_rows_to_dicts(get_clan_rows(db)))
+
+        limit, after_id, selected_fields = page
+        headers = {}
+        def build_page():
+            clans, last_id = get_clans_page(db, limit, after_id=after_id, fields=selected_fields)
+            headers.update(next_page_headers(request, limit, last_id))
+            return clans
+        return conditional_json_response(request, db, build_page, headers)
+
+@router.get("/clans/search", response_model=List[Clan], summary="Search clans by tag or name", tags=["Clans"])
+def search_clans_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=100, description="Words to match as prefixes of the clan tag or name."),
+    limit: int = Query(20, ge=1, le=MAX_SEARCH_RESULTS),
+    db: Session = Depends(get_db),
+):
+    """
+    Full-text search over clan tags and names, ignoring case and accents, best match first.
+    """
+    with http_errors(f"searching clans for '{q}'"):
+        return conditional_json_response(request, db, lambda: [clan.model_dump(mode="json") for clan in search_clans(db, q, limit)])
+
+@router.get("/clans/changes", response_model=ClanChanges, summary="Get the clans changed since a cursor", tags=["Clans"])
+def get_clan_changes_endpoint(
+    request: Request,
+    since: int = Query(0, ge=0, description="The next value of the previous call, 0 for a first sync."),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_db),
+):
+    """
+    Returns the clans created, updated or deleted since the cursor, each with its current state.
+
+    Call again with `since` set to `next` while `has_more` is true. When `resync` is true the
+    changes are no longer available: download `/clans`, then continue from `next`.
+    """
+    with http_errors(f"fetching clan changes since {since}"):
+        return conditional_json_response(request, db, lambda: get_clan_changes(db, since, limit).model_dump(mode="json"))
 
 @router.post("/clans/insert_by_id", response_model=Clan, summary="Insert a new clan by ID", tags=["Clans"])
-def insert_new_clan_by_id(clan_data: ClanInsertRequest, db: Session = Depends(get_db)):
+async def insert_new_clan_by_id(clan_data: ClanInsertRequest, db: Session = Depends(get_db)):
     """
     Inserts a new clan into the database by fetching name and tag from the Wargaming API.
     """
-    try:
-        # Validate and convert country
-        response = requests.get(f"{BASE_URL}{clan_data.id}")
-        response.raise_for_status()
-        wg_result = response.json()
-
-        logger.debug(f"WG API response: {json.dumps(wg_result, indent=2)}")
-
-        # Check if the clan ID exists in the response
-        wg_clan = wg_result.get("data", {}).get(str(clan_data.id))
-        if not wg_clan:
-            logger.warning(f"Clan ID {clan_data.id} not found in WG API.")
-            raise HTTPException(status_code=404, detail="Clan not found in WG API")
-
-        # Use Pydantic model to normalize/validate country
-        try:
-            clan_model = Clan(
-                id=clan_data.id,
-                clan_tag=wg_clan["tag"],
-                clan_name=wg_clan["name"],
-                country=clan_data.country
-            )
-        except ValueError as ve:
-            logger.warning(f"Validation error: {ve}")
-            raise ve
-
-        # Call DB creation
-        try:
-            return create_clan(
-                db=db,
-                clan_id=clan_model.id,
-                clan_tag=clan_model.clan_tag,
-                clan_name=clan_model.clan_name,
-                country=clan_model.country.value  # .value needed for Enum to str
-            )
-        except ValueError as ve:
-            logger.warning(f"Database error: {ve}")
-            raise ve
-
-    except HTTPException:
-        raise  # Let FastAPI handle any HTTPExceptions you raise explicitly
-    except ValueError as ve:
-        logger.warning(f"Validation error inserting clan: {ve}")
-        raise HTTPException(status_code=400, detail=str(ve))
-    except requests.HTTPError as http_err:
-        logger.error(f"WG API error: {http_err}")
-        raise HTTPException(status_code=502, detail="Failed to fetch clan from WG API")
-    except Exception as e:
-        logger.error(f"Unexpected error: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+    with http_errors(f"inserting clan {clan_data.id}", "Internal server error"):
+        clan = clan_from_wg(clan_data, await get_wg_client().get_clan(clan_data.id))
+        return await run_in_threadpool(create_clan, db, clan.id, clan.clan_tag, clan.clan_name, clan.country.value)
 
-@router.post("/clans/update", summary="Update clan data", tags=["Clans"])
-def update_clans():
+@router.post("/clans/insert_by_ids", response_model=List[ClanInsertResult], summary="Insert several clans by ID", tags=["Clans"])
+async def insert_new_clans_by_ids(clans_data: List[ClanInsertRequest], db: Session = Depends(get_db)):
     """
-    Trigger an update of clan data using importer logic.
+    Inserts several clans at once, fetching names and tags from the Wargaming API in batches.
+
+    Every ID gets its own result (created, duplicate, not_found or invalid_country), and all
+    new clans are inserted in a single transaction.
     """
-    try:
-        update_clan_data()
-        logger.info("Clan data updated successfully.")
-        return {"message": "Clan data updated successfully."}
-    except Exception as e:
-        logger.error(f"Error updating clan data: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    batch = BatchInsert(clans_data)
+    with http_errors("inserting clans", "Internal server error"):
+        missing_ids = batch.add_existing(await run_in_threadpool(get_existing_clan_ids, db, batch.valid_ids))
+        new_clans = batch.add_wg_clans(await get_wg_client().get_clans(missing_ids))
+        batch.add_inserted(new_clans, await run_in_threadpool(create_clans, db, new_clans))
+    return batch.response()
+
+@router.post("/clans/update", response_model=Job, status_code=202, summary="Update clan data", tags=["Clans"])
+def update_clans(response: Response):
+    """
+    Queue a refresh of the tag, name and disbanded flag of every clan from the WG API.
+
+    Returns the job at once, follow it with GET /jobs/{id}, its result is the refresh summary.
+    """
+    return _submit_job(response, "refresh", _refresh_job)
 
 @router.post("/clans/insert", response_model=Clan, summary="Insert a new clan", tags=["Clans"])
 def insert_new_clan(clan_data: Clan, db: Session = Depends(get_db)):
     """
     Inserts a new clan into the database.
     """
-    try:
-        clan = create_clan(
-            db=db,
-            clan_id=clan_data.id,
-            clan_tag=clan_data.clan_tag,
-            clan_name=clan_data.clan_name,
-            country=clan_data.country,
-        )
-        logger.info(f"Successfully inserted clan with ID {clan_data.id}.")
-        return clan
-    except ValueError as ve:
-        logger.warning(f"Validation error inserting clan: {ve}")
-        raise HTTPException(status_code=400, detail=str(ve))
-    except Exception as e:
-        logger.error(f"Unexpected error inserting clan: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    with http_errors(f"inserting clan {clan_data.id}"):
+        return create_clan(db, clan_data.id, clan_data.clan_tag, clan_data.clan_name, clan_data.country)
 
-@router.get("/clans/export/csv", summary="Export clans data to CSV", tags=["Export"])
-def export_csv():
+@router.get("/clans/export/{export_format}", summary="Export clans data", tags=["Export"])
+def export_clans(export_format: ExportFormat, compress: bool = False):
     """
-    Export the clan data to a CSV file.
+    Stream all clans as CSV, TXT or NDJSON, optionally gzip-compressed.
     """
     try:
-        export_clans_to_csv(CSV_EXPORT_PATH)
-        logger.info(f"Exported clans to CSV: {CSV_EXPORT_PATH}")
-        return {"message": f"Exported clans to CSV: {CSV_EXPORT_PATH}"}
+        filename = export_filename(export_format, compress)
+        logger.info(f"Streaming clans export: {filename}")
+        return StreamingResponse(
+            stream_clans(export_format, compress=compress),
+            media_type="application/gzip" if compress else MEDIA_TYPES[export_format],
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
     except Exception as e:
-        logger.error(f"Error exporting clans to CSV: {e}")
+        logger.error(f"Error exporting clans to {export_format.value}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/clans/export/txt", summary="Export clans data to TXT", tags=["Export"])
-def export_txt():
+@router.post("/clans/export/{export_format}", response_model=Job, status_code=202, summary="Export clans data to a file", tags=["Export"])
+def export_clans_job(response: Response, export_format: ExportFormat, compress: bool = False):
     """
-    Export the clan data to a TXT file.
+    Queue an export of all clans as CSV, TXT or NDJSON to the export directory.
+
+    Returns the job at once, follow it with GET /jobs/{id}, its result holds the file path and size.
     """
-    try:
-        export_clans_to_txt(TXT_EXPORT_PATH)
-        logger.info(f"Exported clans to TXT: {TXT_EXPORT_PATH}")
-        return {"message": f"Exported clans to TXT: {TXT_EXPORT_PATH}"}
-    except Exception as e:
-        logger.error(f"Error exporting clans to TXT: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return _submit_job(response, "export", _export_job, export_format=export_format.value, compress=compress)
 
 @router.get("/clans/{clan_id}/languages", summary="Get languages for a clan", tags=["Scrapper"])
-async def get_clan_languages(clan_id: int):
+async def get_clan_languages(clan_id: int, db: Session = Depends(get_db)):
     """
-    Uses web scraping to obtain a list of languages for a given clan.
+    Returns the languages of a clan, from the cache when fresh and by web scraping otherwise.
     """
-    try:
-        languages = await get_languages(clan_id)
-        logger.info(f"Successfully retrieved languages for clan ID {clan_id}.")
-        return {"clan_id": clan_id, "languages": languages}
-    except Exception as e:
-        logger.error(f"Error retrieving languages for clan ID {clan_id}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    with http_errors(f"retrieving languages for clan ID {clan_id}"):
+        entry = await run_in_threadpool(get_cached_languages, db, clan_id, LANGUAGES_TTL)
+        if entry is None:
+            entry = await run_in_threadpool(save_languages, db, clan_id, await get_languages(clan_id))
+        return languages_response(clan_id, entry)
 
 @router.get("/clans/country/{country_name}", response_model=list[Clan], summary="Get clans by country", tags=["Clans"])
-def get_clans_by_country_endpoint(country_name: str, db: Session = Depends(get_db)):
+def get_clans_by_country_endpoint(request: Request, country_name: str, db: Session = Depends(get_db)):
     """
     Get all clans from a specific country.
     """
-    try:
-        clans = get_clans_by_country(db, country_name)
-        logger.info(f"Successfully retrieved clans for country: {country_name}.")
-        return clans
-    except Exception as e:
-        logger.error(f"Error retrieving clans for country {country_name}: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    with http_errors(f"retrieving clans for country {country_name}"):
+        if SNAPSHOT_CACHE_ENABLED:
+            return snapshot_response(request, db, country_name)
+        return conditional_json_response(request, db, lambda: clan_rows_to_dicts(get_clan_rows(db, country_name)))
 
 @router.get("/countries", response_model=List[str], summary="Get all countries", tags=["Countries"])
 def get_all_countries():
@@ -189,17 +186,73 @@ def get_all_countries():
         logger.error(f"Error retrieving countries: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/clans/save_seed", summary="Export clans to a seed file", tags=["Utilities"])
-def save_seed_file():
+@router.get("/countries/stats", response_model=List[CountryStats], summary="Get clan counts per country", tags=["Countries"])
+def get_country_stats_endpoint(request: Request, db: Session = Depends(get_db)):
+    """
+    Returns the number of clans of each country that has clans, largest first.
+    """
+    with http_errors("retrieving country statistics"):
+        return conditional_json_response(request, db, lambda: [entry.model_dump() for entry in get_country_stats(db)])
+
+@router.post("/clans/save_seed", response_model=Job, status_code=202, summary="Export clans to a seed file", tags=["Utilities"])
+def save_seed_file(response: Response):
+    """
+    Queue an export of all current clans to a seed file with today's date.
+
+    Returns the job at once, follow it with GET /jobs/{id}, its result holds the file path.
+    """
+    return _submit_job(response, "save_seed", _save_seed_job)
+
+@router.get("/jobs", response_model=List[Job], summary="List background jobs", tags=["Jobs"])
+def list_jobs():
     """
-    Exports all current clans to a seed file with today's date.
+    Returns the queued, running and recently finished jobs, newest first.
+    """
+    return job_manager.list()
+
+@router.get("/jobs/{job_id}", response_model=Job, summary="Get a background job", tags=["Jobs"])
+def get_job(job_id: str):
+    """
+    Returns the status, progress and result of a job.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found.")
+    return job
+
+# Job functions, see api.jobs. Seed exports are short and ignore stop_event.
+
+def _refresh_job(progress, stop_event):
+    return update_clan_data(progress=progress, stop_event=stop_event)
+
+def _save_seed_job(progress, stop_event):
+    path = export_clans_to_seed_file()
+    if not path:
+        raise ValueError("No clans to export.")
+    return {"path": path}
+
+def _export_job(progress, stop_event, export_format: str, compress: bool):
+    export_format = ExportFormat(export_format)
+    path = os.path.join(EXPORT_DIR, export_filename(export_format, compress))
+    export_clans_to_file(path, export_format, compress=compress, stop_event=stop_event)
+    return {"path": path, "size": os.path.getsize(path)}
+
+def _submit_job(response: Response, kind: str, func, **params) -> Job:
+    """
+    Queue a job, or return the identical job already queued or running, with its URL in Location.
     """
     try:
-        path = export_clans_to_seed_file()
-        if path:
-            return {"message": "✅ Seed file saved", "path": path}
-        else:
-            raise HTTPException(status_code=404, detail="No clans to export.")
-    except Exception as e:
-        logger.error(f"Error exporting seed: {e}")
-        raise HTTPException(status_code=500, detail="Failed to export seed file")
\ No newline at end of file
+        job, _ = job_manager.submit(kind, func, **params)
+    except RuntimeError as e:
+        logger.error(f"Could not queue a {kind} job: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
+    response.headers["Location"] = f"/jobs/{job.id}"
+    return job
+
+@router.get("/metrics", summary="Prometheus metrics", tags=["Utilities"], include_in_schema=False)
+def get_metrics():
+    """
+    Exposes request, WG API, scraper, seed and export metrics in the Prometheus text format.
+    """
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
@@ -0,0 +1,32 @@
+import json
+from typing import Any, Iterable, List
+from api.model import Country
+
+try:
+    import orjson
+except ImportError:  # The standard library encoder gives the same bytes, only slower
+    orjson = None
+
+# Stored enum name -> display value, e.g. "UNITED_KINGDOM" -> "United Kingdom"
+COUNTRY_VALUES = {country.name: country.value for country in Country}
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content exactly like Starlette's JSONResponse: compact, UTF-8, non-ASCII kept as is.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content)
+        except TypeError:
+            pass  # Let the standard encoder accept or reject it the way JSONResponse would
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def clan_rows_to_dicts(rows: Iterable[tuple]) -> List[dict]:
+    """
+    Turn (id, clan_tag, clan_name, country) rows into the dicts served by the Clan model.
+    """
+    country_values = COUNTRY_VALUES
+    return [
+        {"id": clan_id, "clan_tag": clan_tag, "clan_name": clan_name, "country": country_values[country]}
+        for clan_id, clan_tag, clan_name, country in rows
+    ]
@@ -0,0 +1,223 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from fastapi import Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from api.crud import get_clan_rows
+from api.http_cache import IDENTITY, cache_headers, compress, etag_matches, make_etag, negotiate_encoding
+from api.model import parse_country
+from api.serialization import clan_rows_to_dicts, dumps
+from database.database import SessionLocal
+from database.meta import get_dataset_version, on_dataset_change
+from database.stats import get_country_counts
+from utils.config import COMPRESSION_MIN_SIZE, SNAPSHOT_GZIP_LEVEL, SNAPSHOT_BROTLI_QUALITY
+from utils.logging import setup_logger
+from utils.metrics import SNAPSHOT_REQUESTS, SNAPSHOT_REBUILD_DURATION
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Snapshot key of the full clan list, per-country lists use the Country enum name
+ALL_CLANS = "ALL"
+
+class Snapshot:
+    """
+    The serialized JSON of one clan list at one dataset version.
+
+    Each content coding is compressed on its first request, or up front for the given encodings.
+    """
+    def __init__(self, version: str, body: bytes, encodings: Iterable[str] = ()):
+        self.version = version
+        self.bodies: Dict[str, bytes] = {IDENTITY: body}
+        self._lock = threading.Lock()
+        for encoding in encodings:
+            self.body(encoding)
+
+    def body(self, encoding: str) -> bytes:
+        """
+        Return the body in a content coding, the uncompressed one if it is too small to compress.
+        """
+        body = self.bodies.get(encoding)
+        if body is not None:
+            return body
+        if len(self.bodies[IDENTITY]) < COMPRESSION_MIN_SIZE:
+            return self.bodies[IDENTITY]
+        # One compression per coding, concurrent requests wait for it
+        with self._lock:
+            if encoding not in self.bodies:
+                self.bodies[encoding] = compress(self.bodies[IDENTITY], encoding, gzip_level=SNAPSHOT_GZIP_LEVEL, brotli_quality=SNAPSHOT_BROTLI_QUALITY)
+            return self.bodies[encoding]
+
+class SnapshotCache:
+    """
+    Serialized and pre-compressed bytes of /clans and of each per-country clan list.
+
+    A snapshot is built on its first request, and compressed in the content coding of each
+    request as it comes. When the dataset version changes, every cached snapshot is rebuilt by
+    a background thread, in the codings the previous one was requested in, while requests keep
+    getting the stale one.
+    """
+    def __init__(self):
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._rebuild_scheduled = False
+        self._closed = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def get(self, key: str, version: str) -> Snapshot:
+        """
+        Return the snapshot of a list, possibly older than version, building it if there is none.
+        """
+        snapshot = self.get_cached(key, version)
+        return snapshot if snapshot is not None else self.build(key)
+
+    def get_cached(self, key: str, version: str) -> Optional[Snapshot]:
+        """
+        Return the snapshot of a list, possibly older than version, or None if it was never built.
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            SNAPSHOT_REQUESTS.labels("miss").inc()
+        elif snapshot.version == version:
+            SNAPSHOT_REQUESTS.labels("hit").inc()
+        else:
+            SNAPSHOT_REQUESTS.labels("stale").inc()
+            self.schedule_rebuild()
+        return snapshot
+
+    def schedule_rebuild(self):
+        """
+        Rebuild every cached snapshot in the background, at most one rebuild waiting at a time.
+        """
+        with self._lock:
+            if self._closed or self._rebuild_scheduled or not self._snapshots:
+                return
+            self._rebuild_scheduled = True
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshots")
+            self._executor.submit(self._rebuild_all)
+
+    def open(self):
+        """
+        Cache snapshots and rebuild them in the background again, after close.
+        """
+        with self._lock:
+            self._closed = False
+
+    def warm(self):
+        """
+        Build the full list and the list of every country that has clans.
+        """
+        db = SessionLocal()
+        try:
+            keys = [ALL_CLANS] + [entry.country for entry in get_country_counts(db)]
+        finally:
+            db.close()
+        start_time = time.perf_counter()
+        for key in keys:
+            self.build(key)
+        logger.info(f"Warmed {len(keys)} clan list snapshots in {time.perf_counter() - start_time:.2f}s.")
+
+    def close(self):
+        """
+        Stop the background rebuilds, waiting for the snapshot being built, and drop the snapshots.
+
+        Until open is called again, snapshots built for requests are served but not cached.
+        """
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+            self._rebuild_scheduled = False
+            self._snapshots.clear()
+        if executor is not None:
+            # A running rebuild stops at its next key, see _rebuild_all
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _rebuild_all(self):
+        with self._lock:
+            # Cleared first, so a write landing during this rebuild schedules another one
+            self._rebuild_scheduled = False
+        for key in list(self._snapshots):
+            if self._closed:
+                return
+            try:
+                self.build(key)
+            except Exception as e:
+                logger.error(f"Error rebuilding the {key} snapshot: {e}")
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def build(self, key: str) -> Snapshot:
+        """
+        Build the snapshot of a list at the current version, unless it is already up to date.
+        """
+        # One build per key at a time, concurrent callers reuse its result
+        with self._key_lock(key):
+            db = SessionLocal()
+            try:
+                # Read the version before the rows, so a snapshot is never older than its version
+                version = get_dataset_version(db)
+                snapshot = self._snapshots.get(key)
+                if snapshot is not None and snapshot.version == version:
+                    return snapshot
+
+                start_time = time.perf_counter()
+                body = dumps(clan_rows_to_dicts(get_clan_rows(db, None if key == ALL_CLANS else key)))
+            finally:
+                db.close()
+
+            # A first build, the miss path of a request, only serializes, see Snapshot.body
+            snapshot = Snapshot(version, body, encodings=[] if snapshot is None else list(snapshot.bodies))
+            with self._lock:
+                if not self._closed:
+                    self._snapshots[key] = snapshot
+
+            elapsed = time.perf_counter() - start_time
+            SNAPSHOT_REBUILD_DURATION.observe(elapsed)
+            logger.info(f"Built the {key} clan list snapshot for version {version} in {elapsed:.2f}s ({len(body)} bytes).", extra={"rate_limit_key": "snapshots.build"})
+            return snapshot
+
+# Shared cache, warmed in the application lifespan and refreshed after every committed write
+snapshot_cache = SnapshotCache()
+on_dataset_change(snapshot_cache.schedule_rebuild)
+
+def snapshot_key(country: Optional[str] = None) -> str:
+    """
+    Snapshot key of /clans, or of the clans of one country.
+    """
+    return ALL_CLANS if country is None else parse_country(country).name
+
+def snapshot_response(request: Request, db: Session, country: Optional[str] = None) -> Response:
+    """
+    Serve /clans, or the clans of one country, from the snapshot cache with a strong ETag.
+    """
+    key = snapshot_key(country)
+    return _serve_snapshot(request, snapshot_cache.get(key, get_dataset_version(db)))
+
+async def async_snapshot_response(request: Request, db: AsyncSession, country: Optional[str] = None) -> Response:
+    """
+    Async version of snapshot_response, a missing snapshot is built in the threadpool.
+    """
+    key = snapshot_key(country)
+    snapshot = snapshot_cache.get_cached(key, await db.run_sync(get_dataset_version))
+    if snapshot is None:
+        snapshot = await run_in_threadpool(snapshot_cache.build, key)
+    return _serve_snapshot(request, snapshot)
+
+def _serve_snapshot(request: Request, snapshot: Snapshot) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    # The ETag follows the served snapshot, which may be older than the current version
+    response_headers = cache_headers(make_etag(snapshot.version, request, encoding))
+    if etag_matches(request.headers.get("if-none-match"), response_headers["ETag"]):
+        return Response(status_code=304, headers=response_headers)
+
+    body = snapshot.body(encoding)
+    if body is not snapshot.bodies[IDENTITY]:
+        response_headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=response_headers)
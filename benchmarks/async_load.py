@@ -0,0 +1,181 @@
+"""
+Throughput and latency of the database routes under many concurrent clients, sync vs async.
+
+In sync mode the routes run in Starlette's threadpool on the sync engine, in async mode they
+are awaited on the event loop with the aiosqlite engine (DATABASE_ASYNC=true). Clients send a
+mix of paginated reads, searches, statistics and inserts through httpx's ASGI transport, so
+the server side is measured without network or worker processes. Each mode runs in its own
+subprocess, because the application reads its settings from the environment at import time.
+
+Usage, from the repository root:
+    python -m benchmarks.async_load [--modes sync,async] [--size 100k] [--concurrency 256] [--requests 20000]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks.run import REPO_ROOT, RESULTS_DIR, git_commit
+from benchmarks.datasets import SIZES, FIRST_CLAN_ID, generate_clans
+from benchmarks.concurrent_reads import _percentiles
+
+MODES = {"sync": "false", "async": "true"}
+# Request kinds and their share of the traffic, inserts take the remainder
+REQUEST_MIX = {"page": 0.6, "search": 0.25, "stats": 0.1}
+
+async def drive(app, clan_ids: list, tags: list, concurrency: int, requests: int) -> dict:
+    """
+    Send requests from concurrency clients, each waiting for its response before sending the next.
+    """
+    import httpx
+    from api.pagination import encode_cursor
+
+    latencies = {kind: [] for kind in [*REQUEST_MIX, "insert"]}
+    errors = {kind: 0 for kind in latencies}
+    sent = itertools.count()
+    inserted = itertools.count()
+
+    def next_request(rng: random.Random):
+        draw = rng.random()
+        if draw < REQUEST_MIX["page"]:
+            return "page", "GET", f"/clans?limit=100&after={encode_cursor(rng.choice(clan_ids))}", None
+        draw -= REQUEST_MIX["page"]
+        if draw < REQUEST_MIX["search"]:
+            return "search", "GET", f"/clans/search?q={rng.choice(tags)[:3]}", None
+        draw -= REQUEST_MIX["search"]
+        if draw < REQUEST_MIX["stats"]:
+            return "stats", "GET", "/countries/stats", None
+        index = next(inserted)
+        clan = {"id": FIRST_CLAN_ID + len(clan_ids) + index, "clan_tag": f"a{index}", "clan_name": f"Load {index}", "country": "France"}
+        return "insert", "POST", "/clans/insert", clan
+
+    async def client_loop(client, index: int):
+        rng = random.Random(index)
+        while next(sent) < requests:
+            kind, method, url, body = next_request(rng)
+            start_time = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                if response.status_code >= 400:
+                    errors[kind] += 1
+                    continue
+            except Exception:
+                errors[kind] += 1
+                continue
+            latencies[kind].append(time.perf_counter() - start_time)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        start_time = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - start_time
+
+    all_latencies = [latency for kind_latencies in latencies.values() for latency in kind_latencies]
+    return {
+        "elapsed_s": elapsed,
+        "requests": len(all_latencies),
+        "requests_per_sec": len(all_latencies) / elapsed,
+        "errors": sum(errors.values()),
+        "latency": _percentiles(all_latencies),
+        "by_kind": {kind: {"requests": len(latencies[kind]), "errors": errors[kind], **_percentiles(latencies[kind])} for kind in latencies},
+    }
+
+def run_worker(size: int, concurrency: int, requests: int) -> dict:
+    """
+    Seed a fresh database, then load the application in the mode set by DATABASE_ASYNC.
+    """
+    from database.database import create_tables
+    from database.seeds import bulk_insert_clans
+    from utils.config import DATABASE_ASYNC
+    import main
+
+    clans = generate_clans(size)
+    create_tables()
+    bulk_insert_clans(clans)
+    clan_ids = [clan["clan_id"] for clan in clans]
+    tags = [clan["clan_tag"] for clan in clans]
+    del clans
+
+    async def run():
+        try:
+            return await drive(main.app, clan_ids, tags, concurrency, requests)
+        finally:
+            if DATABASE_ASYNC:
+                from database.async_database import close_async_engine
+                await close_async_engine()
+
+    result = asyncio.run(run())
+    return {"mode": "async" if DATABASE_ASYNC else "sync", "rows": size, "concurrency": concurrency, **result}
+
+def run_mode(mode: str, args) -> dict:
+    """
+    Run the worker in a subprocess configured for one database mode.
+    """
+    with tempfile.TemporaryDirectory(prefix=f"wot_bench_{mode}_") as work_dir:
+        output_path = os.path.join(work_dir, "result.json")
+        env = dict(os.environ, DATABASE_ASYNC=MODES[mode], PYTHONPATH=REPO_ROOT)
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.async_load", "--worker", output_path,
+                "--size", args.size, "--concurrency", str(args.concurrency), "--requests", str(args.requests),
+            ],
+            cwd=work_dir,
+            env=env,
+            check=True,
+        )
+        with open(output_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the sync and async database modes under concurrent load.")
+    parser.add_argument("--modes", default="sync,async", help="Comma-separated modes to compare: sync, async.")
+    parser.add_argument("--size", default="100k", choices=list(SIZES), help="Dataset size.")
+    parser.add_argument("--concurrency", type=int, default=256, help="Concurrent clients.")
+    parser.add_argument("--requests", type=int, default=20000, help="Requests sent per mode.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>_async_load.json.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(SIZES[args.size], args.concurrency, args.requests)
+        with open(args.worker, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}_async_load.json"))
+
+    results = []
+    for mode in (mode.strip().lower() for mode in args.modes.split(",") if mode.strip()):
+        if mode not in MODES:
+            parser.error(f"Unknown mode {mode}, expected one of {', '.join(MODES)}.")
+        print(f"Benchmarking {args.requests:,} requests from {args.concurrency} clients on {SIZES[args.size]:,} clans in {mode} mode", flush=True)
+        result = run_mode(mode, args)
+        results.append(result)
+        latency = result["latency"]
+        print(
+            f"{mode:>6}  {result['requests_per_sec']:>9,.1f} req/s  p50 {latency['p50_ms'] or 0:.2f} ms  p99 {latency['p99_ms'] or 0:.2f} ms  {result['errors']} errors",
+            flush=True,
+        )
+        for kind, stats in result["by_kind"].items():
+            print(f"{'':>8}{kind:<8} {stats['requests']:>7,} requests  p50 {stats['p50_ms'] or 0:.2f} ms  p99 {stats['p99_ms'] or 0:.2f} ms  {stats['errors']} errors", flush=True)
+
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Read throughput while clans are being inserted, for each SQLite journal mode.
+
+Reader threads mix crud.read_clan and crud.get_clans_page calls while a writer thread inserts
+clans with crud.create_clan, like calls to /clans/insert. Each journal mode runs in its own
+subprocess, because the engine reads its settings from the environment at import time.
+
+Usage, from the repository root:
+    python -m benchmarks.concurrent_reads [--modes DELETE,WAL] [--size 100k] [--readers 8] [--duration 10]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import List
+
+from benchmarks.run import REPO_ROOT, RESULTS_DIR, git_commit
+from benchmarks.datasets import SIZES, FIRST_CLAN_ID, generate_clans
+
+def _percentiles(latencies: List[float]) -> dict:
+    if len(latencies) < 2:
+        return {"p50_ms": None, "p99_ms": None, "max_ms": None}
+    cuts = statistics.quantiles(latencies, n=100)
+    return {"p50_ms": cuts[49] * 1000, "p99_ms": cuts[98] * 1000, "max_ms": max(latencies) * 1000}
+
+def run_worker(size: int, readers: int, duration: float, write_interval: float) -> dict:
+    """
+    Seed a fresh database, then run the readers and the writer for duration seconds.
+    """
+    from api import crud
+    from database.database import SessionLocal, create_tables, engine
+    from database.seeds import bulk_insert_clans
+
+    clans = generate_clans(size)
+    create_tables()
+    bulk_insert_clans(clans)
+    clan_ids = [clan["clan_id"] for clan in clans]
+    del clans
+
+    stop = threading.Event()
+    read_latencies = [[] for _ in range(readers)]
+    read_errors = [0] * readers
+    write_latencies = []
+    write_errors = [0]
+
+    def reader(index: int):
+        rng = random.Random(index)
+        db = SessionLocal()
+        try:
+            while not stop.is_set():
+                start_time = time.perf_counter()
+                try:
+                    if rng.random() < 0.5:
+                        crud.read_clan(db, rng.choice(clan_ids))
+                    else:
+                        crud.get_clans_page(db, 100, after_id=rng.choice(clan_ids))
+                except Exception:
+                    read_errors[index] += 1
+                    db.rollback()
+                    continue
+                read_latencies[index].append(time.perf_counter() - start_time)
+        finally:
+            db.close()
+
+    def writer():
+        db = SessionLocal()
+        clan_id = FIRST_CLAN_ID + size
+        try:
+            while not stop.is_set():
+                start_time = time.perf_counter()
+                try:
+                    crud.create_clan(db, clan_id, f"w{clan_id - FIRST_CLAN_ID}", f"Writer {clan_id}", "FRANCE")
+                    write_latencies.append(time.perf_counter() - start_time)
+                except ValueError:
+                    write_errors[0] += 1
+                clan_id += 1
+                stop.wait(write_interval)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=reader, args=(index,)) for index in range(readers)]
+    threads.append(threading.Thread(target=writer))
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with engine.connect() as conn:
+        journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+    all_reads = [latency for latencies in read_latencies for latency in latencies]
+    return {
+        "journal_mode": journal_mode,
+        "rows": size,
+        "readers": readers,
+        "duration_s": duration,
+        "reads": len(all_reads),
+        "reads_per_sec": len(all_reads) / duration,
+        "read_errors": sum(read_errors),
+        "read_latency": _percentiles(all_reads),
+        "writes": len(write_latencies),
+        "writes_per_sec": len(write_latencies) / duration,
+        "write_errors": write_errors[0],
+        "write_latency": _percentiles(write_latencies),
+    }
+
+def run_mode(mode: str, args) -> dict:
+    """
+    Run the worker in a subprocess configured for one journal mode.
+    """
+    with tempfile.TemporaryDirectory(prefix=f"wot_bench_{mode.lower()}_") as work_dir:
+        output_path = os.path.join(work_dir, "result.json")
+        env = dict(os.environ, SQLITE_JOURNAL_MODE=mode, PYTHONPATH=REPO_ROOT)
+        subprocess.run(
+            [
+                sys.executable, "-m", "benchmarks.concurrent_reads", "--worker", output_path,
+                "--size", args.size, "--readers", str(args.readers),
+                "--duration", str(args.duration), "--write-interval", str(args.write_interval),
+            ],
+            cwd=work_dir,
+            env=env,
+            check=True,
+        )
+        with open(output_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure read throughput during concurrent clan inserts.")
+    parser.add_argument("--modes", default="DELETE,WAL", help="Comma-separated SQLite journal modes to compare.")
+    parser.add_argument("--size", default="100k", choices=list(SIZES), help="Dataset size.")
+    parser.add_argument("--readers", type=int, default=8, help="Reader threads.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of concurrent reads and writes per mode.")
+    parser.add_argument("--write-interval", type=float, default=0.01, help="Pause in seconds between two inserts.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>_concurrent.json.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_worker(SIZES[args.size], args.readers, args.duration, args.write_interval)
+        with open(args.worker, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        return
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}_concurrent.json"))
+
+    results = []
+    for mode in (mode.strip().upper() for mode in args.modes.split(",") if mode.strip()):
+        print(f"Benchmarking {args.readers} readers and one writer on {SIZES[args.size]:,} clans in {mode} mode", flush=True)
+        result = run_mode(mode, args)
+        results.append(result)
+        read_latency, write_latency = result["read_latency"], result["write_latency"]
+        print(
+            f"{mode:>8}  {result['reads_per_sec']:>10,.1f} reads/s (p50 {read_latency['p50_ms'] or 0:.2f} ms, p99 {read_latency['p99_ms'] or 0:.2f} ms, {result['read_errors']} errors)"
+            f"  {result['writes_per_sec']:>7,.1f} writes/s (p99 {write_latency['p99_ms'] or 0:.2f} ms, {result['write_errors']} errors)",
+            flush=True,
+        )
+
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import json
+import random
+import string
+from typing import Dict, List, Optional
+
+# Named dataset sizes accepted by the benchmark runner
+SIZES = {"4k": 4_000, "100k": 100_000, "1m": 1_000_000}
+
+FIRST_CLAN_ID = 500_000_000
+TAG_CHARACTERS = string.ascii_uppercase + string.digits + "_-"
+NAME_WORDS = [
+    "Les", "Loups", "Chevaliers", "Brigade", "Légion", "Garde", "Escadron", "Blindés", "Tigres",
+    "Panthères", "Éclaireurs", "Vétérans", "Ordre", "Acier", "Tonnerre", "Dragons", "Élite",
+    "Steel", "Iron", "Wolves", "Knights", "Armored", "Division", "Fury", "Storm", "Phoenix",
+]
+# Roughly the shape of the real seed: mostly unknown clans, a French minority, a few others
+COUNTRY_WEIGHTS = {"UNKNOWN": 80, "FRANCE": 12, "BELGIUM": 3, "SWITZERLAND": 3, "INTERNATIONAL": 2}
+
+def _encode_tag(number: int) -> str:
+    tag = ""
+    while number:
+        number, digit = divmod(number, len(TAG_CHARACTERS))
+        tag += TAG_CHARACTERS[digit]
+    return tag
+
+def generate_clans(size: int, seed: int = 0) -> List[dict]:
+    """
+    Generate size synthetic clans in the seed file layout, the same list for the same seed.
+
+    Tags are unique, like in the clans table, and 2 to 5 characters long.
+    """
+    rng = random.Random(seed)
+    tags = rng.sample(range(len(TAG_CHARACTERS), len(TAG_CHARACTERS) ** 5), size)
+    countries = rng.choices(list(COUNTRY_WEIGHTS), weights=list(COUNTRY_WEIGHTS.values()), k=size)
+    return [
+        {
+            "clan_id": FIRST_CLAN_ID + index,
+            "clan_tag": _encode_tag(tag),
+            "clan_name": " ".join(rng.choices(NAME_WORDS, k=rng.randint(1, 4))),
+            "country": country,
+        }
+        for index, (tag, country) in enumerate(zip(tags, countries))
+    ]
+
+def write_legacy_seed_file(clans: List[dict], path: str, indent: Optional[int] = None):
+    """
+    Write clans as a legacy JSON array seed file, the seed format before gzip JSON Lines.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(clans, f, ensure_ascii=False, indent=indent)
+
+def write_raw_dumps(clans: List[dict], full_json_path: str, validated_json_path: str) -> Dict[str, str]:
+    """
+    Write the full clan dump and the validated French clan list read by generate_seed.
+
+    Returns:
+        The validated list path mapped to its Country name.
+    """
+    full_clans = {str(clan["clan_id"]): {"clan_tag": clan["clan_tag"], "clan_name": clan["clan_name"]} for clan in clans}
+    with open(full_json_path, "w", encoding="utf-8") as f:
+        json.dump(full_clans, f, ensure_ascii=False)
+
+    validated_clans = {clan_id: full_clans[clan_id] for clan_id in (str(clan["clan_id"]) for clan in clans if clan["country"] == "FRANCE")}
+    with open(validated_json_path, "w", encoding="utf-8") as f:
+        json.dump(validated_clans, f, ensure_ascii=False)
+    return {validated_json_path: "FRANCE"}
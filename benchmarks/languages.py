@@ -0,0 +1,118 @@
+"""
+Clan language lookups: the plain HTML fast path against the headless browser.
+
+A local HTTP server serves the saved clan page of tests/fixtures for every clan ID, so both
+paths run offline on the same page. The fast path is timed with parse_languages alone and
+with fetch_languages over HTTP. The browser path is skipped when Chromium is not installed.
+
+Usage, from the repository root:
+    python -m benchmarks.languages [--requests 500] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.run import REPO_ROOT, RESULTS_DIR, git_commit
+
+FIXTURE_PATH = os.path.join(REPO_ROOT, "tests", "fixtures", "clan_page_languages.html")
+
+def serve_fixture() -> ThreadingHTTPServer:
+    """
+    Serve the fixture page on a free local port from a background thread.
+    """
+    with open(FIXTURE_PATH, "rb") as f:
+        page = f.read()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+async def run_lookups(lookup, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(clan_id: int):
+        async with semaphore:
+            assert await lookup(clan_id)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(one(clan_id) for clan_id in range(requests)))
+    elapsed = time.perf_counter() - start_time
+    return {"requests": requests, "concurrency": concurrency, "total_s": elapsed, "lookups_per_sec": requests / elapsed}
+
+async def run_all(requests: int, concurrency: int, parse_repeat: int) -> list:
+    from scraper.html_languages import close_http_client, fetch_languages, parse_languages
+    from scraper.pool import browser_pool
+    from scraper.scraper import get_languages_with_browser
+
+    results = []
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        html = f.read()
+    start_time = time.perf_counter()
+    for _ in range(parse_repeat):
+        parse_languages(html)
+    elapsed = time.perf_counter() - start_time
+    results.append({"name": "parse_languages", "requests": parse_repeat, "total_s": elapsed, "lookups_per_sec": parse_repeat / elapsed})
+
+    try:
+        results.append({"name": "fetch_languages (HTTP)", **await run_lookups(fetch_languages, requests, concurrency)})
+    finally:
+        await close_http_client()
+
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        print(f"Browser path skipped, Chromium could not be launched: {str(e).splitlines()[0]}")
+    else:
+        try:
+            # Fewer lookups, the browser path is much slower
+            browser_requests = max(concurrency, requests // 10)
+            results.append({"name": "get_languages_with_browser", **await run_lookups(get_languages_with_browser, browser_requests, concurrency)})
+        finally:
+            await browser_pool.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the HTML fast path and the browser path of the language lookups.")
+    parser.add_argument("--requests", type=int, default=500, help="Lookups through the HTTP fast path.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Lookups in flight, like LANGUAGES_REFRESH_CONCURRENCY.")
+    parser.add_argument("--parse-repeat", type=int, default=5000, help="Calls of parse_languages alone.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>_languages.json.")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}_languages.json"))
+
+    server = serve_fixture()
+    # Read by utils.config, so it must be set before the scraper modules are imported
+    os.environ["CLAN_PAGE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/clans/wot/{{clan_id}}/"
+    try:
+        results = asyncio.run(run_all(args.requests, args.concurrency, args.parse_repeat))
+    finally:
+        server.shutdown()
+
+    for result in results:
+        print(f"{result['name']:<28} {result['lookups_per_sec']:>10.1f} lookups/s  ({result['requests']} in {result['total_s']:.2f}s)", flush=True)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "created_at": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=4)
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
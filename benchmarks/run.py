@@ -0,0 +1,283 @@
+"""
+Micro-benchmarks for the CRUD functions, seeding, seed export, seed generation and the list endpoints.
+
+The benchmarks run in a temporary working directory with their own SQLite database, so the
+repository database and data files are never touched. Results are printed as a table and
+written to a JSON file that can be passed back with --baseline to compare two commits.
+
+Usage, from the repository root:
+    python -m benchmarks.run [--sizes 4k,100k,1m] [--repeat 3] [--output results.json] [--baseline previous.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, List, Optional
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, "benchmarks", "results")
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# The configuration requires an API key, but no benchmark calls the Wargaming API
+os.environ.setdefault("WG_API_KEY", "benchmark")
+os.environ.setdefault("LOG_CONSOLE_LEVEL", "WARNING")
+# Always a relative SQLite file, so the configured database is never benchmarked against
+os.environ["DATABASE_URL"] = "sqlite:///./database.db"
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "wot_bench_log"))
+
+from benchmarks.datasets import SIZES, FIRST_CLAN_ID, generate_clans, write_raw_dumps
+
+POINT_OPERATIONS = 1000
+WRITE_OPERATIONS = 200
+SEARCH_QUERIES = ["lo", "garde", "steel fury", "éclaireurs", "les ch", "dragons élite"]
+
+def measure(name: str, func: Callable[[], object], repeat: int, ops_per_call: int = 1, setup: Optional[Callable[[], None]] = None, memory: bool = True) -> dict:
+    """
+    Time repeat calls of func, then trace the peak Python memory of one more call.
+
+    setup runs untimed before every call, e.g. to reset the database for non-idempotent benchmarks.
+    """
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        start_time = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start_time)
+
+    peak = None
+    if memory:
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    total = sum(timings)
+    return {
+        "name": name,
+        "calls": repeat,
+        "ops": repeat * ops_per_call,
+        "total_s": total,
+        "best_call_s": min(timings),
+        "mean_op_s": total / (repeat * ops_per_call),
+        "ops_per_sec": repeat * ops_per_call / total if total > 0 else None,
+        "peak_memory_bytes": peak,
+    }
+
+def reset_database():
+    """
+    Drop the pooled connections, delete the database file and create empty tables.
+    """
+    from database.database import engine, create_tables
+
+    engine.dispose()
+    database_path = engine.url.database
+    for path in (database_path, f"{database_path}-wal", f"{database_path}-shm", f"{database_path}-journal"):
+        if os.path.exists(path):
+            os.remove(path)
+    create_tables()
+
+class SizeBenchmark:
+    """
+    All benchmarks for one dataset size, with its generated files in work_dir.
+    """
+    def __init__(self, label: str, size: int, work_dir: str, repeat: int, memory: bool):
+        self.label = label
+        self.size = size
+        self.work_dir = work_dir
+        self.repeat = repeat
+        self.memory = memory
+        self.results: List[dict] = []
+
+        from database.seed_format import write_seed_file
+
+        self.clans = generate_clans(size)
+        self.seed_path = os.path.join(work_dir, "seed.jsonl.gz")
+        write_seed_file(self.clans, self.seed_path)
+        self.full_json_path = os.path.join(work_dir, "full.json")
+        self.validated_json_paths = write_raw_dumps(self.clans, self.full_json_path, os.path.join(work_dir, "validated.json"))
+
+        rng = random.Random(size)
+        self.sample_ids = [clan["clan_id"] for clan in rng.choices(self.clans, k=POINT_OPERATIONS)]
+        self.write_ids = self.sample_ids[:WRITE_OPERATIONS]
+
+    def run(self, name: str, func: Callable[[], object], repeat: Optional[int] = None, ops_per_call: int = 1, setup: Optional[Callable[[], None]] = None):
+        result = measure(name, func, repeat or self.repeat, ops_per_call, setup, self.memory)
+        result["size"] = self.label
+        result["rows"] = self.size
+        self.results.append(result)
+        print(format_result(result), flush=True)
+
+    def fresh_database(self):
+        reset_database()
+
+    def run_all(self):
+        from fastapi.testclient import TestClient
+        from api import crud
+        from api.model import Clan, ClanSQL, Country
+        from database.convert_to_seed_ready import generate_seed
+        from database.database import SessionLocal
+        from database.save_new_seed import export_clans_to_seed_file
+        from database.seeds import seed_database
+        from main import app
+
+        # Seeding, each timed call starts from an empty database
+        def seed():
+            assert seed_database(self.seed_path) == self.size
+        self.run("seeds.seed_database", seed, ops_per_call=self.size, setup=self.fresh_database)
+        self.run("seeds.seed_database(upsert)", lambda: seed_database(self.seed_path, upsert=True), ops_per_call=self.size)
+
+        db = SessionLocal()
+        try:
+            def read_clans():
+                for clan_id in self.sample_ids:
+                    crud.read_clan(db, clan_id)
+            self.run("crud.read_clan", read_clans, ops_per_call=len(self.sample_ids))
+
+            def update_clans():
+                for clan_id in self.write_ids:
+                    crud.update_clan(db, clan_id, clan_name=f"Benchmark {clan_id}")
+            self.run("crud.update_clan", update_clans, ops_per_call=len(self.write_ids))
+
+            new_ids = range(FIRST_CLAN_ID + self.size, FIRST_CLAN_ID + self.size + WRITE_OPERATIONS)
+            def create_and_delete_clans():
+                for clan_id in new_ids:
+                    crud.create_clan(db, clan_id, f"b{clan_id - FIRST_CLAN_ID}", f"Benchmark {clan_id}", "FRANCE")
+                    crud.delete_clan(db, clan_id)
+            self.run("crud.create_clan+delete_clan", create_and_delete_clans, ops_per_call=len(new_ids))
+
+            bulk_clans = [Clan(id=clan_id, clan_tag=f"b{clan_id - FIRST_CLAN_ID}", clan_name=f"Benchmark {clan_id}", country=Country.FRANCE) for clan_id in new_ids]
+            def remove_bulk_clans():
+                db.query(ClanSQL).filter(ClanSQL.id.in_(list(new_ids))).delete(synchronize_session=False)
+                db.commit()
+            self.run("crud.create_clans", lambda: crud.create_clans(db, bulk_clans), ops_per_call=len(bulk_clans), setup=remove_bulk_clans)
+            remove_bulk_clans()
+
+            def read_pages():
+                for clan_id in self.sample_ids[:WRITE_OPERATIONS]:
+                    crud.get_clans_page(db, 100, after_id=clan_id)
+            self.run("crud.get_clans_page(limit=100)", read_pages, ops_per_call=WRITE_OPERATIONS)
+
+            def search():
+                for query in SEARCH_QUERIES:
+                    crud.search_clans(db, query, 20)
+            self.run("crud.search_clans", search, ops_per_call=len(SEARCH_QUERIES))
+
+            def read_all_clans():
+                crud.get_all_clans(db)
+                db.expunge_all()
+            self.run("crud.get_all_clans", read_all_clans)
+            self.run("crud.get_clans_by_country(france)", lambda: crud.get_clans_by_country(db, "france"))
+        finally:
+            db.close()
+
+        # Seed files
+        self.run("save_new_seed.export_clans_to_seed_file", export_clans_to_seed_file)
+        seed_output_path = os.path.join(self.work_dir, "generated_seed.jsonl.gz")
+        validated_json_paths = {path: Country[country] for path, country in self.validated_json_paths.items()}
+        self.run("convert_to_seed_ready.generate_seed", lambda: generate_seed(self.full_json_path, validated_json_paths, seed_output_path))
+
+        # Endpoints, without the lifespan so nothing seeds the database or starts a browser
+        client = TestClient(app)
+        def get(url: str):
+            def call():
+                response = client.get(url)
+                assert response.status_code == 200, f"GET {url} returned {response.status_code}"
+            return call
+        self.run("GET /clans", get("/clans"))
+        self.run("GET /clans?limit=100", get("/clans?limit=100"))
+        self.run("GET /clans/country/france", get("/clans/country/france"))
+
+def format_result(result: dict, baseline: Optional[dict] = None) -> str:
+    peak = result["peak_memory_bytes"]
+    line = (
+        f"{result['size']:>5}  {result['name']:<42} {result['ops_per_sec'] or 0:>14,.1f} ops/s"
+        f"  {result['mean_op_s'] * 1000:>10.3f} ms/op  {'-' if peak is None else f'{peak / 2 ** 20:.1f}':>8} MiB"
+    )
+    if baseline and baseline.get("ops_per_sec") and result["ops_per_sec"]:
+        change = result["ops_per_sec"] / baseline["ops_per_sec"] - 1
+        line += f"  {change:+.1%} vs baseline"
+    return line
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CRUD, seeding, seed export, seed generation and the list endpoints.")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Comma-separated dataset sizes among {', '.join(SIZES)}.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per benchmark.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced call that measures peak memory.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>.json.")
+    parser.add_argument("--baseline", help="Results file of a previous run to compare against.")
+    args = parser.parse_args()
+
+    labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}.json"))
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {(result["size"], result["name"]): result for result in json.load(f)["results"]}
+
+    results = []
+    original_dir = os.getcwd()
+    # The database and seed export paths are relative, so they all land in the run directory
+    with tempfile.TemporaryDirectory(prefix="wot_bench_") as run_dir:
+        os.chdir(run_dir)
+        try:
+            for label in labels:
+                work_dir = os.path.join(run_dir, label)
+                os.makedirs(work_dir)
+                print(f"Benchmarking {SIZES[label]:,} clans in {work_dir}", flush=True)
+                benchmark = SizeBenchmark(label, SIZES[label], work_dir, args.repeat, memory=not args.no_memory)
+                benchmark.run_all()
+                results.extend(benchmark.results)
+                shutil.rmtree(work_dir)
+        finally:
+            from database.database import engine
+            engine.dispose()
+            os.chdir(original_dir)
+
+    report = {
+        "commit": commit,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+
+    if baseline:
+        print("\nCompared to the baseline:")
+        for result in results:
+            print(format_result(result, baseline.get((result["size"], result["name"]))))
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Seed file formats: the legacy indented JSON array against gzip JSON Lines.
+
+For each format, the synthetic clans are written once to measure the file size and write time,
+then the file is read alone and loaded into an empty database with seed_database. The peak
+memory of a gzip JSON Lines load stays flat with the dataset size, the legacy load grows with it.
+
+Usage, from the repository root:
+    python -m benchmarks.seed_files [--sizes 100k,1m] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import List
+
+from benchmarks.run import RESULTS_DIR, git_commit, measure, reset_database
+from benchmarks.datasets import SIZES, generate_clans, write_legacy_seed_file
+
+def run_size(label: str, work_dir: str, repeat: int, memory: bool) -> List[dict]:
+    from database.seed_format import iter_seed_file, write_seed_file
+    from database.seeds import seed_database
+
+    size = SIZES[label]
+    clans = generate_clans(size)
+    formats = {
+        "legacy json (indent=4)": (os.path.join(work_dir, f"seed_{label}.json"), lambda path: write_legacy_seed_file(clans, path, indent=4)),
+        "gzip jsonl": (os.path.join(work_dir, f"seed_{label}.jsonl.gz"), lambda path: write_seed_file(clans, path)),
+    }
+
+    results = []
+    for format_name, (path, write) in formats.items():
+        def read():
+            assert sum(1 for _ in iter_seed_file(path)) == size
+
+        def load():
+            assert seed_database(path) == size
+
+        cases = [
+            ("write", lambda: write(path), None),
+            ("read", read, None),
+            ("seed_database", load, reset_database),
+        ]
+        timings = {}
+        for step, func, setup in cases:
+            result = measure(f"{format_name} {step}", func, repeat, ops_per_call=size, setup=setup, memory=memory)
+            result["size"] = label
+            result["rows"] = size
+            result["file_bytes"] = os.path.getsize(path)
+            results.append(result)
+            timings[step] = result
+
+        peak = timings["seed_database"]["peak_memory_bytes"]
+        print(
+            f"{label:>5}  {format_name:<24} {os.path.getsize(path) / 1e6:>8.1f} MB"
+            f"  write {timings['write']['best_call_s']:>6.2f} s  read {timings['read']['best_call_s']:>6.2f} s"
+            f"  seed {timings['seed_database']['best_call_s']:>6.2f} s"
+            + (f"  peak {peak / 1e6:>7.1f} MB" if peak is not None else ""),
+            flush=True,
+        )
+        os.remove(path)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the size and load time of the seed file formats.")
+    parser.add_argument("--sizes", default="100k,1m", help=f"Comma-separated dataset sizes among {', '.join(SIZES)}.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed calls per step.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced call that measures peak memory.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>_seed_files.json.")
+    args = parser.parse_args()
+
+    labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}_seed_files.json"))
+
+    results = []
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="wot_bench_") as run_dir:
+        os.chdir(run_dir)
+        try:
+            for label in labels:
+                results.extend(run_size(label, run_dir, args.repeat, memory=not args.no_memory))
+        finally:
+            from database.database import engine
+            engine.dispose()
+            os.chdir(original_dir)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "created_at": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=4)
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Serialization of the list endpoints: ORM objects and response model validation against row tuples.
+
+The model path is what FastAPI does when a route returns ORM objects with response_model=List[Clan]:
+load the objects, validate them into Clan models, dump them and encode them with JSONResponse.
+The row path is what the /clans and /clans/country/{country_name} routes do now. Both must
+produce the same bytes.
+
+Usage, from the repository root:
+    python -m benchmarks.serialization [--sizes 100k] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import tempfile
+from datetime import datetime
+from typing import List
+
+from benchmarks.run import RESULTS_DIR, git_commit, measure, reset_database
+from benchmarks.datasets import SIZES, generate_clans
+
+def run_size(label: str, repeat: int, memory: bool) -> List[dict]:
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from api import crud
+    from api.model import Clan
+    from api.serialization import clan_rows_to_dicts, dumps
+    from database.database import SessionLocal
+    from database.seeds import bulk_insert_clans
+
+    reset_database()
+    bulk_insert_clans(generate_clans(SIZES[label]))
+
+    clans_adapter = TypeAdapter(List[Clan])
+    db = SessionLocal()
+    try:
+        def model_path(clans) -> bytes:
+            validated = clans_adapter.validate_python(clans, from_attributes=True)
+            body = JSONResponse(content=clans_adapter.dump_python(validated, mode="json")).body
+            db.expunge_all()
+            return body
+
+        cases = {
+            "GET /clans": (
+                lambda: model_path(crud.get_all_clans(db)),
+                lambda: dumps(clan_rows_to_dicts(crud.get_clan_rows(db))),
+            ),
+            "GET /clans/country/france": (
+                lambda: model_path(crud.get_clans_by_country(db, "france")),
+                lambda: dumps(clan_rows_to_dicts(crud.get_clan_rows(db, "france"))),
+            ),
+        }
+
+        results = []
+        for name, (model_func, rows_func) in cases.items():
+            if model_func() != rows_func():
+                raise AssertionError(f"{name}: the row path does not produce the same JSON as the model path")
+            for path, func in (("models", model_func), ("rows", rows_func)):
+                result = measure(f"{name} [{path}]", func, repeat, memory=memory)
+                result["size"] = label
+                result["rows"] = SIZES[label]
+                results.append(result)
+            speedup = results[-1]["ops_per_sec"] / results[-2]["ops_per_sec"]
+            print(f"{label:>5}  {name:<28} models {results[-2]['mean_op_s'] * 1000:>9.1f} ms  rows {results[-1]['mean_op_s'] * 1000:>9.1f} ms  x{speedup:.1f}", flush=True)
+        return results
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the model and row serialization paths of the list endpoints.")
+    parser.add_argument("--sizes", default="100k", help=f"Comma-separated dataset sizes among {', '.join(SIZES)}.")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per path.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced call that measures peak memory.")
+    parser.add_argument("--output", help="Results file, defaults to benchmarks/results/<date>_<commit>_serialization.json.")
+    args = parser.parse_args()
+
+    labels = [label.strip().lower() for label in args.sizes.split(",") if label.strip()]
+    unknown = [label for label in labels if label not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    commit = git_commit()
+    output_path = os.path.abspath(args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit or 'unknown'}_serialization.json"))
+
+    results = []
+    original_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="wot_bench_") as run_dir:
+        os.chdir(run_dir)
+        try:
+            for label in labels:
+                results.extend(run_size(label, args.repeat, memory=not args.no_memory))
+        finally:
+            from database.database import engine
+            engine.dispose()
+            os.chdir(original_dir)
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"commit": commit, "created_at": datetime.now().isoformat(timespec="seconds"), "results": results}, f, indent=4)
+    print(f"\nResults written to {output_path}")
+
+if __name__ == "__main__":
+    main()
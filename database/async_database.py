@@ -0,0 +1,51 @@
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from database.database import engine_options, set_sqlite_pragmas
+from utils.config import SQLALCHEMY_DATABASE_URL
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Async driver used for each backend of DATABASE_URL
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
+def async_database_url(url: str) -> URL:
+    """
+    Turn the sync DATABASE_URL into the same database behind its async driver,
+    e.g. sqlite:///./database.db -> sqlite+aiosqlite:///./database.db.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for the {backend} database backend.")
+    return parsed.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+def _create_async_engine(url: str):
+    """
+    Create the async engine with the same pool settings and PRAGMAs as the sync engine.
+    """
+    new_engine = create_async_engine(async_database_url(url), **engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        # Connect events are only available on the sync engine wrapped by the async one
+        event.listen(new_engine.sync_engine, "connect", set_sqlite_pragmas)
+    logger.info(f"Async database engine for {new_engine.url.render_as_string(hide_password=True)}.")
+    return new_engine
+
+# Created on import, so only import this module when DATABASE_ASYNC is enabled
+async_engine = _create_async_engine(SQLALCHEMY_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    """
+    Get an async database session for FastAPI dependency injection.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def close_async_engine():
+    """
+    Close the connections of the async engine.
+    """
+    await async_engine.dispose()
@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import List, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from api.model import ClanChangeSQL
+from database.meta import META_TABLE, bump_dataset_version
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+CHANGES_TABLE = ClanChangeSQL.__tablename__
+# Highest sequence number removed by compaction, stored in the dataset meta table. Clients whose
+# cursor is below it may have missed changes and must download the full list again.
+FLOOR_KEY = "change_log_floor"
+# Present in the dataset meta table while a write must not be logged, see paused_change_log
+PAUSED_KEY = "change_log_paused"
+_NOT_PAUSED = f"NOT EXISTS (SELECT 1 FROM {META_TABLE} WHERE key = '{PAUSED_KEY}')"
+
+# Triggers log every write to the clans table, from the API, the importer or an upsert seed.
+# Changing the ID of a clan is logged as the deletion of the old ID.
+CHANGE_TRIGGERS = [f"{CHANGES_TABLE}_ai", f"{CHANGES_TABLE}_ad", f"{CHANGES_TABLE}_au"]
+CREATE_CHANGE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_ai AFTER INSERT ON clans WHEN {_NOT_PAUSED} BEGIN
+        INSERT INTO {CHANGES_TABLE}(clan_id, operation, changed_at) VALUES (new.id, 'insert', datetime('now'));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_ad AFTER DELETE ON clans WHEN {_NOT_PAUSED} BEGIN
+        INSERT INTO {CHANGES_TABLE}(clan_id, operation, changed_at) VALUES (old.id, 'delete', datetime('now'));
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {CHANGES_TABLE}_au AFTER UPDATE ON clans
+    WHEN (old.id IS NOT new.id OR old.clan_tag IS NOT new.clan_tag OR old.clan_name IS NOT new.clan_name OR old.country IS NOT new.country)
+        AND {_NOT_PAUSED}
+    BEGIN
+        INSERT INTO {CHANGES_TABLE}(clan_id, operation, changed_at) SELECT old.id, 'delete', datetime('now') WHERE old.id IS NOT new.id;
+        INSERT INTO {CHANGES_TABLE}(clan_id, operation, changed_at) VALUES (new.id, 'update', datetime('now'));
+    END
+    """,
+]
+
+def init_change_log(conn: Connection, max_entries: int, max_age: timedelta):
+    """
+    Create the triggers filling the change log, and compact the entries beyond the retention.
+    """
+    if conn.dialect.name != "sqlite":
+        logger.warning(f"The change log triggers require SQLite, not {conn.dialect.name}. Change log disabled.")
+        return
+
+    # Recreated, so databases created before a trigger changed get the current version
+    for trigger in CHANGE_TRIGGERS:
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    for trigger in CREATE_CHANGE_TRIGGERS:
+        conn.execute(text(trigger))
+    compact_expired_changes(conn, max_entries, max_age)
+
+@contextmanager
+def paused_change_log(conn: Connection):
+    """
+    Stop the triggers from logging the writes made in the block, in the caller's transaction.
+
+    Other connections never see the pause, it is only committed along with its removal.
+    """
+    conn.execute(text(f"INSERT OR REPLACE INTO {META_TABLE}(key, value) VALUES (:key, '1')"), {"key": PAUSED_KEY})
+    try:
+        yield
+    finally:
+        conn.execute(text(f"DELETE FROM {META_TABLE} WHERE key = :key"), {"key": PAUSED_KEY})
+
+def get_change_log_floor(db: Union[Session, Connection]) -> int:
+    """
+    Return the highest sequence number removed from the change log, 0 if it was never compacted.
+    """
+    value = db.execute(text(f"SELECT value FROM {META_TABLE} WHERE key = :key"), {"key": FLOOR_KEY}).scalar()
+    return int(value) if value is not None else 0
+
+def get_last_seq(db: Union[Session, Connection]) -> int:
+    """
+    Return the sequence number of the latest change, the floor if the log is empty.
+    """
+    last_seq = db.execute(text(f"SELECT MAX(seq) FROM {CHANGES_TABLE}")).scalar()
+    return max(last_seq or 0, get_change_log_floor(db))
+
+def compact_change_log(db: Union[Session, Connection], up_to_seq: int):
+    """
+    Delete the changes up to up_to_seq, in the caller's transaction, and raise the floor to it.
+    """
+    floor = get_change_log_floor(db)
+    if up_to_seq <= floor:
+        return
+    result = db.execute(text(f"DELETE FROM {CHANGES_TABLE} WHERE seq <= :seq"), {"seq": up_to_seq})
+    db.execute(text(f"INSERT OR REPLACE INTO {META_TABLE}(key, value) VALUES (:key, :value)"), {"key": FLOOR_KEY, "value": str(up_to_seq)})
+    # Responses of /clans/changes depend on the floor, so their ETags must change with it
+    bump_dataset_version(db)
+    logger.info(f"Compacted {result.rowcount} changes up to sequence {up_to_seq}.")
+
+def mark_resync(db: Union[Session, Connection]):
+    """
+    Raise the floor above every change handed out so far, so every client downloads the full list again.
+
+    Used after writes that were not logged. A marker row takes the next sequence number and is
+    compacted right away, in the caller's transaction.
+    """
+    result = db.execute(text(f"INSERT INTO {CHANGES_TABLE}(clan_id, operation, changed_at) VALUES (0, 'resync', datetime('now'))"))
+    compact_change_log(db, result.lastrowid)
+
+def compact_expired_changes(db: Union[Session, Connection], max_entries: int, max_age: timedelta):
+    """
+    Keep at most max_entries changes, none older than max_age.
+    """
+    cutoff = (datetime.utcnow() - max_age).strftime("%Y-%m-%d %H:%M:%S")
+    expired_seq = db.execute(text(f"SELECT MAX(seq) FROM {CHANGES_TABLE} WHERE changed_at < :cutoff"), {"cutoff": cutoff}).scalar() or 0
+    compact_change_log(db, max(expired_seq, get_last_seq(db) - max_entries))
+
+def get_changed_clan_ids(db: Union[Session, Connection], since: int, limit: int) -> List[tuple]:
+    """
+    Return (clan_id, seq) of the clans changed after since, with the sequence of their latest change,
+    oldest first. Up to limit + 1 rows, the extra one tells whether more remain.
+    """
+    return db.execute(
+        text(f"SELECT clan_id, MAX(seq) AS last_seq FROM {CHANGES_TABLE} WHERE seq > :since GROUP BY clan_id ORDER BY last_seq LIMIT :limit"),
+        {"since": since, "limit": limit + 1},
+    ).all()
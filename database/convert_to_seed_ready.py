@@ -1,13 +1,26 @@
 import json
-from utils.config import FULL_JSON_PATH, FRENCH_JSON_PATH, SEED_DATA_PATH
+from typing import Dict
+from api.model import Country
+from database.seed_format import write_seed_file
+from utils.config import FULL_JSON_PATH, VALIDATED_JSON_PATHS, SEED_DATA_PATH
 from utils.logging import setup_logger
 
 # Set up the logger for this file/module
 logger = setup_logger(__name__)
 
-def generate_seed(full_json_path, french_json_path, output_path):
+def generate_seed(full_json_path, validated_json_paths: Dict[str, Country], output_path):
+    """
+    Build the seed file from the full clan dump and any number of validated clan lists.
+
+    Every clan of the full dump starts as UNKNOWN and takes the country mapped to the validated
+    list it appears in. A clan validated for two different countries keeps the first one and is
+    reported as a conflict.
+
+    Returns:
+        A summary with the clan count, the clans per country and the conflicts, or None on error.
+    """
     logger.info(f"Starting seed generation process.")
-    
+
     # Load full clan dump
     try:
         with open(full_json_path, 'r', encoding='utf-8') as f:
@@ -17,49 +30,60 @@ def generate_seed(full_json_path, french_json_path, output_path):
         logger.error(f"Error loading full clan data from {full_json_path}: {e}")
         return
 
-    # Load manually validated French clans
-    try:
-        with open(french_json_path, 'r', encoding='utf-8') as f:
-            french_clans = json.load(f)
-        logger.info(f"Successfully loaded French clan data from {french_json_path}.")
-    except Exception as e:
-        logger.error(f"Error loading French clan data from {french_json_path}: {e}")
-        return
+    # Index validated clan IDs by country, one dictionary lookup per ID
+    clan_countries: Dict[str, Country] = {}
+    conflicts = []
+    for validated_json_path, country in validated_json_paths.items():
+        try:
+            with open(validated_json_path, 'r', encoding='utf-8') as f:
+                validated_clans = json.load(f)
+            logger.info(f"Successfully loaded {country.name} clan data from {validated_json_path}.")
+        except Exception as e:
+            logger.error(f"Error loading {country.name} clan data from {validated_json_path}: {e}")
+            return
 
-    seed_clans = []
+        missing = 0
+        for clan_id in validated_clans:
+            clan_id = str(clan_id)
+            if clan_id not in full_clans:
+                missing += 1
+                logger.debug(f"Clan ID {clan_id} not found in full data!", extra={"rate_limit_key": "generate_seed.missing"})
+                continue
 
-    # Loop over all clans in the full data
-    logger.info(f"Processing {len(full_clans)} clans from full data.")
-    for clan_id, clan_info in full_clans.items():
-        seed_clans.append({
-            "clan_id": int(clan_id),
-            "clan_tag": clan_info["clan_tag"],
-            "clan_name": clan_info["clan_name"],
-            "country": "UNKNOWN"  # Default country is "UNKNOWN"
-        })
+            previous_country = clan_countries.setdefault(clan_id, country)
+            if previous_country != country:
+                conflicts.append({"clan_id": int(clan_id), "countries": [previous_country.name, country.name]})
+                logger.warning(f"Clan ID {clan_id} is validated for both {previous_country.name} and {country.name}, keeping {previous_country.name}.", extra={"rate_limit_key": "generate_seed.conflict"})
 
-    # Loop over validated French clans
-    logger.info(f"Processing {len(french_clans)} validated French clans.")
-    for clan_id in french_clans:
-        if clan_id in full_clans:
-            clan_info = full_clans[clan_id]
-            # Update country to "FRANCE" for validated French clans
-            for seed_clan in seed_clans:
-                if seed_clan["clan_id"] == int(clan_id):
-                    seed_clan["country"] = "FRANCE"
-                    break
-            logger.info(f"Updated country for clan ID {clan_id} to FRANCE.")
-        else:
-            logger.warning(f"Clan ID {clan_id} not found in full data!")
+        logger.info(f"Processed {len(validated_clans)} validated {country.name} clans, {missing} not found in full data.")
+
+    # Stream the seed file, one clan per line
+    per_country = {}
+    def seed_clans():
+        for clan_id, clan_info in full_clans.items():
+            country = clan_countries.get(clan_id, Country.UNKNOWN).name
+            per_country[country] = per_country.get(country, 0) + 1
+            yield {
+                "clan_id": int(clan_id),
+                "clan_tag": clan_info["clan_tag"],
+                "clan_name": clan_info["clan_name"],
+                "country": country
+            }
 
-    # Save final seed file
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(seed_clans, f, ensure_ascii=False, indent=4)
-        logger.info(f"Seed file generated successfully at {output_path} with {len(seed_clans)} clans.")
+        write_seed_file(seed_clans(), output_path)
+        logger.info(f"Seed file generated successfully at {output_path} with {len(full_clans)} clans.")
     except Exception as e:
         logger.error(f"Error saving seed file to {output_path}: {e}")
         return
 
+    summary = {"clans": len(full_clans), "per_country": per_country, "conflicts": conflicts}
+    logger.info(f"Seed clans per country: {per_country}, {len(conflicts)} conflicts.")
+    return summary
+
 if __name__ == "__main__":
-    generate_seed(FULL_JSON_PATH, FRENCH_JSON_PATH, SEED_DATA_PATH)
\ No newline at end of file
+    generate_seed(
+        FULL_JSON_PATH,
+        {path: Country[country] for path, country in VALIDATED_JSON_PATHS.items()},
+        SEED_DATA_PATH,
+    )
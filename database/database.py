@@ -1,25 +1,161 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import sessionmaker, Session
-from api.model import Base, Clan, ClanSQL
-from utils.config import SQLALCHEMY_DATABASE_URL
+from api.model import Base, Clan, ClanSQL, Country, parse_country
+from database.search import init_search_index
+from database.stats import init_country_stats
+from database.changes import init_change_log
+from database.meta import init_dataset_meta, bump_dataset_version
+from utils.config import (
+    SQLALCHEMY_DATABASE_URL,
+    SQLITE_JOURNAL_MODE,
+    SQLITE_SYNCHRONOUS,
+    SQLITE_CACHE_SIZE,
+    SQLITE_MMAP_SIZE,
+    SQLITE_BUSY_TIMEOUT_MS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    CHANGE_LOG_MAX_ENTRIES,
+    CHANGE_LOG_RETENTION,
+)
 from utils.logging import setup_logger
 
 # Set up the logger for this file/module
 logger = setup_logger(__name__)
 
+SQLITE_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SQLITE_SYNCHRONOUS_LEVELS = ["OFF", "NORMAL", "FULL", "EXTRA"]
+
+if SQLITE_JOURNAL_MODE not in SQLITE_JOURNAL_MODES:
+    raise ValueError(f"Invalid SQLITE_JOURNAL_MODE: {SQLITE_JOURNAL_MODE}")
+if SQLITE_SYNCHRONOUS not in SQLITE_SYNCHRONOUS_LEVELS:
+    raise ValueError(f"Invalid SQLITE_SYNCHRONOUS: {SQLITE_SYNCHRONOUS}")
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Apply the configured PRAGMAs to a new SQLite connection, sync or async.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    finally:
+        cursor.close()
+
+def uses_queue_pool(url: str) -> bool:
+    """
+    Tell whether SQLAlchemy pools connections to this URL with a sized queue pool.
+
+    In-memory SQLite databases get a pool of their own (one connection per thread, or a single
+    shared one for async drivers) that rejects the pool size settings.
+    """
+    return make_url(url).database not in (None, "", ":memory:")
+
+def engine_options(url: str) -> dict:
+    """
+    Keyword arguments of create_engine for the configured pool settings.
+    """
+    options = {}
+    if uses_queue_pool(url):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if make_url(url).get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+    else:
+        options["pool_pre_ping"] = True
+    return options
+
+def _create_engine(url: str):
+    """
+    Create the engine from the configured URL and pool settings.
+    """
+    new_engine = create_engine(url, **engine_options(url))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine, "connect", set_sqlite_pragmas)
+    return new_engine
+
 # Create the engine and session
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def log_engine_settings():
+    """
+    Log the database URL, the pool settings and the PRAGMAs actually in effect.
+    """
+    settings = {"pool": type(engine.pool).__name__}
+    if uses_queue_pool(SQLALCHEMY_DATABASE_URL):
+        settings.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conn:
+            for pragma in ("journal_mode", "synchronous", "cache_size", "mmap_size", "busy_timeout"):
+                settings[pragma] = conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+        settings["synchronous"] = SQLITE_SYNCHRONOUS_LEVELS[settings["synchronous"]]
+    logger.info(f"Database engine for {engine.url.render_as_string(hide_password=True)}: {settings}")
+
+def normalize_countries(conn: Connection):
+    """
+    Migrate country values stored as display names ("France") or in another case to enum names.
+
+    Unrecognized values become UNKNOWN. Only distinct values are read, so this is cheap once
+    the column is normalized.
+    """
+    clans = ClanSQL.__table__
+    for (value,) in conn.execute(text("SELECT DISTINCT country FROM clans")).all():
+        if value in Country.__members__:
+            continue
+        try:
+            name = parse_country(value).name
+        except (ValueError, AttributeError):
+            logger.warning(f"Unknown country {value!r} in the clans table, replacing it with {Country.UNKNOWN.name}.")
+            name = Country.UNKNOWN.name
+        result = conn.execute(clans.update().where(clans.c.country.is_(None) if value is None else clans.c.country == value).values(country=name))
+        logger.info(f"Migrated {result.rowcount} clans from country {value!r} to {name}.")
+        bump_dataset_version(conn)
+
+def add_missing_clan_columns(conn: Connection):
+    """
+    Add the clans columns introduced since the table was created, which create_all does not do.
+    """
+    existing = {column["name"] for column in inspect(conn).get_columns(ClanSQL.__tablename__)}
+    for column in ClanSQL.__table__.columns:
+        if column.name in existing:
+            continue
+        ddl = f"ALTER TABLE {ClanSQL.__tablename__} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+        if column.server_default is not None:
+            ddl += f"{'' if column.nullable else ' NOT NULL'} DEFAULT {column.server_default.arg}"
+        conn.execute(text(ddl))
+        logger.info(f"Added column {column.name} to the {ClanSQL.__tablename__} table.")
+
+def create_tables():
+    """
+    Create the tables in the database if they don't exist, along with the indexes, the search
+    index, the country statistics and the change log.
+    """
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        add_missing_clan_columns(conn)
+        # create_all skips existing tables, so add indexes introduced since they were created
+        for index in ClanSQL.__table__.indexes:
+            index.create(conn, checkfirst=True)
+        init_dataset_meta(conn)
+        normalize_countries(conn)
+        init_search_index(conn)
+        init_country_stats(conn)
+        init_change_log(conn, CHANGE_LOG_MAX_ENTRIES, CHANGE_LOG_RETENTION)
+    logger.info("Database tables created or already exist.")
+
 def init_db():
     """
     Initialize the database, creating tables if they don't exist and seeding if the database is empty.
     """
     try:
-        # Create the tables in the database if they don't exist
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created or already exist.")
-        
+        create_tables()
+        log_engine_settings()
+
         # Check if the 'clans' table is empty
         db = SessionLocal()
         clan_count = db.query(ClanSQL).count()
@@ -27,7 +163,7 @@ def init_db():
         if clan_count == 0:
             logger.info("Database is empty. Seeding the database...")
             from database.seeds import seed_database  # Importing seed_database here to avoid circular import
-            seed_database()  # Call the seed function to populate the database with initial data
+            seed_database()  # Bulk-load the seed file in a single transaction
         else:
             logger.info(f"Database already contains {clan_count} clans. Skipping seed.")
         db.close()  # Close the session
@@ -68,7 +204,7 @@ def save_clans(db: Session, clan: ClanSQL):
         db.add(clan)
         db.commit()
         db.refresh(clan)
-        logger.info(f"Clan {clan.clan_name} saved successfully.")
+        logger.debug(f"Clan {clan.clan_name} saved successfully.", extra={"rate_limit_key": "database.save_clans"})
         return clan
     except Exception as e:
         logger.error(f"Error saving clan {clan.clan_name}: {e}")
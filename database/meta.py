@@ -0,0 +1,63 @@
+import uuid
+from typing import Callable, List, Union
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from api.model import DatasetMetaSQL
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+META_TABLE = DatasetMetaSQL.__tablename__
+
+# A random epoch is drawn when the database is created, so that a recreated database never
+# reuses the versions, and therefore the ETags, of a previous one.
+EPOCH_KEY = "epoch"
+VERSION_KEY = "version"
+
+# Called after a write to the clans table is committed, e.g. to refresh in-process caches
+_change_listeners: List[Callable[[], None]] = []
+
+def init_dataset_meta(conn: Connection):
+    """
+    Create the dataset epoch and version if the database does not have them yet.
+    """
+    conn.execute(text(f"INSERT OR IGNORE INTO {META_TABLE}(key, value) VALUES (:key, :value)"), {"key": EPOCH_KEY, "value": uuid.uuid4().hex[:12]})
+    conn.execute(text(f"INSERT OR IGNORE INTO {META_TABLE}(key, value) VALUES (:key, '0')"), {"key": VERSION_KEY})
+
+def bump_dataset_version(db: Union[Session, Connection]):
+    """
+    Increment the dataset version, inside the caller's transaction so it commits with the write.
+    """
+    db.execute(text(f"UPDATE {META_TABLE} SET value = CAST(value AS INTEGER) + 1 WHERE key = :key"), {"key": VERSION_KEY})
+
+def get_dataset_version(db: Union[Session, Connection]) -> str:
+    """
+    Return the dataset version as "<epoch>.<version>", it changes whenever the clans change.
+    """
+    values = dict(db.execute(text(f"SELECT key, value FROM {META_TABLE} WHERE key IN (:epoch, :version)"), {"epoch": EPOCH_KEY, "version": VERSION_KEY}).all())
+    return f"{values.get(EPOCH_KEY, '')}.{values.get(VERSION_KEY, '0')}"
+
+def get_dataset_epoch(db: Union[Session, Connection]) -> str:
+    """
+    Return the random epoch drawn when the database was created.
+    """
+    return db.execute(text(f"SELECT value FROM {META_TABLE} WHERE key = :key"), {"key": EPOCH_KEY}).scalar() or ""
+
+def on_dataset_change(listener: Callable[[], None]) -> Callable[[], None]:
+    """
+    Register a listener called by notify_dataset_change.
+    """
+    _change_listeners.append(listener)
+    return listener
+
+def notify_dataset_change():
+    """
+    Tell the listeners that a write to the clans table was committed. Listeners must not block.
+    """
+    for listener in _change_listeners:
+        try:
+            listener()
+        except Exception as e:
+            logger.error(f"Dataset change listener {listener} failed: {e}")
@@ -1,7 +1,7 @@
-import json
 import os
 from datetime import datetime
-from database.database import load_clans, SessionLocal
+from database.seed_format import write_seed_file
+from importer_exporter.exporter import iter_clan_batches
 from utils.logging import setup_logger
 from utils.config import SEED_DIR
 
@@ -13,48 +13,37 @@ def generate_seed_file_path():
     Generates the seed file path with today's date.
     """
     today_str = datetime.now().strftime("%Y%m%d")
-    filename = f"clan_seed_{today_str}.json"
+    filename = f"clan_seed_{today_str}.jsonl.gz"
     return os.path.join(SEED_DIR, filename)
 
+def _iter_seed_clans():
+    """
+    Stream the clans of the database as seed entries, with countries as enum names.
+    """
+    for batch in iter_clan_batches(display_countries=False):
+        for clan_id, clan_tag, clan_name, country in batch:
+            yield {"clan_id": clan_id, "clan_tag": clan_tag, "clan_name": clan_name, "country": country}
+
 def export_clans_to_seed_file():
     """
-    Exports all current clans from the database into a JSON seed file with today's date.
+    Exports all current clans from the database into a seed file with today's date.
     """
-    db = SessionLocal()
     seed_file_path = generate_seed_file_path()
 
     try:
-        clans = load_clans(db)
+        total = write_seed_file(_iter_seed_clans(), seed_file_path)
 
-        if not clans:
+        if not total:
             logger.warning("No clans found in the database to export.")
+            os.remove(seed_file_path)
             return None
 
-        # Prepare data in a serializable format
-        seed_data = [
-            {
-                "clan_id": clan.id,
-                "clan_tag": clan.clan_tag,
-                "clan_name": clan.clan_name,
-                "country": str(clan.country)
-            }
-            for clan in clans
-        ]
-
-        # Write to JSON file
-        os.makedirs(os.path.dirname(seed_file_path), exist_ok=True)
-        with open(seed_file_path, 'w', encoding='utf-8') as f:
-            json.dump(seed_data, f, ensure_ascii=False, indent=4)
-
-        logger.info(f"✅ Successfully saved {len(seed_data)} clans to seed file: {seed_file_path}")
+        logger.info(f"✅ Successfully saved {total} clans to seed file: {seed_file_path}")
         return seed_file_path
 
     except Exception as e:
         logger.error(f"❌ Failed to export clans to seed file: {str(e)}")
         raise e
 
-    finally:
-        db.close()
-
 if __name__ == "__main__":
-    export_clans_to_seed_file()
\ No newline at end of file
+    export_clans_to_seed_file()
@@ -0,0 +1,96 @@
+import re
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+FTS_TABLE = "clans_fts"
+
+# External-content FTS5 index over the clans table. The unicode61 tokenizer folds case and
+# accents ("Blindée" matches "blindee"), and the prefix indexes keep short tag prefixes fast.
+CREATE_FTS_TABLE = f"""
+CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+    clan_tag,
+    clan_name,
+    content='clans',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+)
+"""
+
+# Triggers keep the index in sync with every write to the clans table, including bulk seeding.
+CREATE_FTS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON clans BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, clan_tag, clan_name) VALUES (new.id, new.clan_tag, new.clan_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON clans BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, clan_tag, clan_name) VALUES ('delete', old.id, old.clan_tag, old.clan_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF id, clan_tag, clan_name ON clans BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, clan_tag, clan_name) VALUES ('delete', old.id, old.clan_tag, old.clan_name);
+        INSERT INTO {FTS_TABLE}(rowid, clan_tag, clan_name) VALUES (new.id, new.clan_tag, new.clan_name);
+    END
+    """,
+]
+
+# Tag matches weigh ten times more than name matches in the bm25 ranking.
+RANK_FUNCTION = "bm25(10.0, 1.0)"
+
+def init_search_index(conn: Connection):
+    """
+    Create the full-text index and its sync triggers, building it from existing clans if new.
+    """
+    if conn.dialect.name != "sqlite":
+        logger.warning(f"Full-text search requires SQLite, not {conn.dialect.name}. Search index disabled.")
+        return
+
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+    ).first()
+
+    if not exists:
+        conn.execute(text(CREATE_FTS_TABLE))
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', :rank)"), {"rank": RANK_FUNCTION})
+        conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        logger.info("Full-text search index created.")
+
+    for trigger in CREATE_FTS_TRIGGERS:
+        conn.execute(text(trigger))
+
+def build_match_query(query: str) -> str:
+    """
+    Turn free text into an FTS5 query where every word is matched as a prefix.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+def search_clan_ids(db: Session, query: str, limit: int) -> List[int]:
+    """
+    Return the IDs of the clans matching the query, best match first.
+
+    A clan whose tag is exactly the query comes first, then the full-text matches by rank. The
+    tokenizer ignores punctuation, so "-FR-" or "FR" alone would rank behind longer look-alikes.
+    """
+    # WG clan tags are upper case, so the exact lookup can use the unique tag index, where
+    # COLLATE NOCASE would scan the whole table
+    exact_ids = [row[0] for row in db.execute(text("SELECT id FROM clans WHERE clan_tag = :tag"), {"tag": query.strip().upper()})]
+
+    match = build_match_query(query)
+    if not match:
+        return exact_ids[:limit]
+
+    rows = db.execute(
+        text(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match ORDER BY rank LIMIT :limit"),
+        {"match": match, "limit": limit + len(exact_ids)},
+    )
+    return (exact_ids + [row[0] for row in rows if row[0] not in exact_ids])[:limit]
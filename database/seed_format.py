@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import os
+import shutil
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+from utils.config import SEED_COMPRESS_LEVEL
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# Seed files are gzip-compressed JSON Lines: a header line, then one clan per line. The header
+# records the row count and the SHA-256 of the uncompressed clan lines, so a truncated or
+# edited file is rejected before the load is committed.
+SEED_FORMAT = "wot-clans-seed"
+SEED_FORMAT_VERSION = 1
+GZIP_MAGIC = b"\x1f\x8b"
+WRITE_BATCH_SIZE = 1000
+READ_BLOCK_SIZE = 1024 * 1024
+
+def is_compact_seed(seed_file_path: str) -> bool:
+    """
+    Tell a gzip JSON Lines seed from a legacy JSON array seed by its first bytes.
+    """
+    with open(seed_file_path, "rb") as f:
+        return f.read(2) == GZIP_MAGIC
+
+def _gzip_writer(f, compress_level: int) -> gzip.GzipFile:
+    # No file name and a zero timestamp, so the same clans always give the same bytes
+    return gzip.GzipFile(filename="", mode="wb", fileobj=f, compresslevel=compress_level, mtime=0)
+
+def write_seed_file(seed_clans: Iterable[dict], seed_file_path: str, compress_level: int = SEED_COMPRESS_LEVEL) -> int:
+    """
+    Stream seed entries to a gzip JSON Lines seed file.
+
+    The clan lines are compressed to a temporary file while they are counted and hashed, then
+    the header is written as its own gzip member followed by the compressed lines, so the rows
+    are never held in memory. The file is replaced atomically.
+
+    Returns:
+        The number of clans written.
+    """
+    body_path = f"{seed_file_path}.body.partial"
+    partial_path = f"{seed_file_path}.partial"
+    directory = os.path.dirname(seed_file_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    checksum = hashlib.sha256()
+    total = 0
+    try:
+        with open(body_path, "wb") as raw, _gzip_writer(raw, compress_level) as body:
+            seed_clans = iter(seed_clans)
+            while True:
+                batch = list(islice(seed_clans, WRITE_BATCH_SIZE))
+                if not batch:
+                    break
+                lines = "".join(json.dumps(clan, ensure_ascii=False, separators=(",", ":")) + "\n" for clan in batch).encode("utf-8")
+                checksum.update(lines)
+                body.write(lines)
+                total += len(batch)
+
+        header = {"format": SEED_FORMAT, "version": SEED_FORMAT_VERSION, "rows": total, "sha256": checksum.hexdigest()}
+        with open(partial_path, "wb") as f:
+            with _gzip_writer(f, compress_level) as header_member:
+                header_member.write((json.dumps(header) + "\n").encode("utf-8"))
+            with open(body_path, "rb") as body:
+                shutil.copyfileobj(body, f)
+        os.replace(partial_path, seed_file_path)
+    finally:
+        for path in (body_path, partial_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    logger.info(f"Wrote {total} clans to seed file {seed_file_path} ({os.path.getsize(seed_file_path)} bytes).")
+    return total
+
+def _parse_header(line: bytes, seed_file_path: str) -> dict:
+    try:
+        header = json.loads(line)
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != SEED_FORMAT:
+        raise ValueError(f"{seed_file_path} is not a {SEED_FORMAT} file.")
+    if header.get("version") != SEED_FORMAT_VERSION:
+        raise ValueError(f"Unsupported seed format version {header.get('version')} in {seed_file_path}.")
+    return header
+
+def read_seed_header(seed_file_path: str) -> Optional[dict]:
+    """
+    Return the header of a gzip JSON Lines seed file, None for a legacy JSON seed.
+    """
+    if not is_compact_seed(seed_file_path):
+        return None
+    with gzip.open(seed_file_path, "rb") as f:
+        return _parse_header(f.readline(), seed_file_path)
+
+def iter_seed_file(seed_file_path: str) -> Iterator[dict]:
+    """
+    Yield the seed entries of a seed file one at a time.
+
+    Gzip JSON Lines seeds are streamed, and ValueError is raised if the rows do not match the
+    row count or checksum of the header, after the last row so a load in progress rolls back.
+    Legacy JSON array seeds are parsed whole.
+    """
+    if not is_compact_seed(seed_file_path):
+        logger.info(f"{seed_file_path} is a legacy JSON seed, loading it whole.")
+        with open(seed_file_path, "r", encoding="utf-8") as f:
+            yield from json.load(f)
+        return
+
+    with gzip.open(seed_file_path, "rb") as f:
+        header = _parse_header(f.readline(), seed_file_path)
+        checksum = hashlib.sha256()
+        total = 0
+        remainder = b""
+        # Read blocks of whole lines and parse each block as one JSON array, far faster than line by line
+        while True:
+            block = f.read(READ_BLOCK_SIZE)
+            if not block:
+                break
+            block = remainder + block
+            end = block.rfind(b"\n") + 1
+            block, remainder = block[:end], block[end:]
+            if not block:
+                continue
+            checksum.update(block)
+            lines = block.splitlines()
+            total += len(lines)
+            if total > header["rows"]:
+                raise ValueError(f"{seed_file_path} has more rows than the {header['rows']} of its header.")
+            yield from json.loads(b"[" + b",".join(lines) + b"]")
+        if remainder:
+            raise ValueError(f"{seed_file_path} does not end with a newline, it is truncated.")
+
+    if total != header["rows"]:
+        raise ValueError(f"{seed_file_path} has {total} rows, its header records {header['rows']}.")
+    if checksum.hexdigest() != header["sha256"]:
+        raise ValueError(f"Checksum mismatch in {seed_file_path}, the file is corrupted.")
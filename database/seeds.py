@@ -1,49 +1,161 @@
-from database.database import save_clans, SessionLocal
-from utils.config import SEED_DATA_PATH
-import json
+import argparse
+import time
+from contextlib import nullcontext
+from itertools import islice
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.database import engine, create_tables
+from database.meta import bump_dataset_version, notify_dataset_change
+from database.changes import compact_expired_changes, mark_resync, paused_change_log
+from database.seed_format import iter_seed_file, read_seed_header
+from utils.config import SEED_DATA_PATH, SEED_CHUNK_SIZE, CHANGE_LOG_MAX_ENTRIES, CHANGE_LOG_RETENTION
 import os
-from api.model import ClanSQL
+from api.model import ClanSQL, Country, parse_country
 from utils.logging import setup_logger
+from utils.metrics import SEED_DURATION, SEED_ROWS
 
 # Set up the logger for this file/module
 logger = setup_logger(__name__)
 
+# Tag given to a stored clan whose tag an upserted clan takes over, until the seed gives it a new one.
+# WG tags never contain "#", so it cannot clash with a real tag.
+FREED_TAG_PREFIX = "#"
+
 def load_seed_data(seed_file_path):
     """
-    Loads the seed data from a JSON file.
+    Opens a seed file and returns an iterator over its entries, see seed_format.iter_seed_file.
     """
     if not os.path.exists(seed_file_path):
         logger.error(f"Seed file not found: {seed_file_path}")
         raise FileNotFoundError(f"Seed file not found: {seed_file_path}")
 
-    with open(seed_file_path, 'r', encoding='utf-8') as f:
-        logger.info(f"Successfully loaded seed data from {seed_file_path}.")
-        return json.load(f)
+    header = read_seed_header(seed_file_path)
+    if header:
+        logger.info(f"Opened seed file {seed_file_path} with {header['rows']} clans.")
+    return iter_seed_file(seed_file_path)
 
-def seed_database():
+def _seed_rows(seed_clans):
     """
-    Seeds the database with the clans from the seed file.
+    Map seed entries to rows of the clans table, storing countries as enum names.
     """
-    db = SessionLocal()  # Create a database session
+    for clan_data in seed_clans:
+        yield {
+            "id": clan_data['clan_id'],
+            "clan_tag": clan_data['clan_tag'],
+            "clan_name": clan_data['clan_name'],
+            "country": parse_country(clan_data.get('country') or Country.UNKNOWN.name).name,
+        }
 
-    try:
-        seed_clans = load_seed_data(SEED_DATA_PATH)
+def _chunked(rows, chunk_size):
+    """
+    Yield lists of at most chunk_size rows.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _free_taken_tags(conn, chunk) -> int:
+    """
+    Give a placeholder tag to the stored clans holding a tag that a row of chunk assigns to
+    another clan, so the upsert of a tag moved between clans does not break the unique tag.
 
-        logger.info(f"Starting to seed database with {len(seed_clans)} clans...")
+    Returns:
+        The number of clans whose tag was freed.
+    """
+    table = ClanSQL.__table__
+    owners = {row["clan_tag"]: row["id"] for row in chunk}
+    holders = conn.execute(select(table.c.id, table.c.clan_tag).where(table.c.clan_tag.in_(list(owners)))).all()
+    freed = [{"b_id": clan_id, "b_tag": f"{FREED_TAG_PREFIX}{clan_id}"} for clan_id, clan_tag in holders if owners[clan_tag] != clan_id]
+    if freed:
+        conn.execute(table.update().where(table.c.id == bindparam("b_id")).values(clan_tag=bindparam("b_tag")), freed)
+    return len(freed)
 
-        for clan_data in seed_clans:
-            clan = ClanSQL(
-                id=clan_data['clan_id'],
-                clan_tag=clan_data['clan_tag'],
-                clan_name=clan_data['clan_name'],
-                country=clan_data.get('country', "Unknown")
-            )
-            save_clans(db, clan)  # Pass the db session to save_clans()
+def bulk_insert_clans(seed_clans, chunk_size: int = SEED_CHUNK_SIZE, upsert: bool = False) -> int:
+    """
+    Insert seed entries into the clans table in a single transaction.
 
-        logger.info(f"✅ Successfully seeded database with {len(seed_clans)} clans.")
+    seed_clans can be any iterable, it is consumed one chunk at a time and an error raised
+    while iterating it rolls the whole load back. Rows are sent in chunks of chunk_size with
+    executemany-style inserts. In upsert mode, rows whose ID already exists have their tag,
+    name and country overwritten instead of failing the whole load, and a stored clan holding
+    a tag the seed gives to another clan gets a placeholder tag until the seed renames it.
+    A plain load is not written to the change log, it moves the log floor instead so clients
+    syncing deltas download the full list again.
+
+    Returns:
+        The number of rows written.
+    """
+    table = ClanSQL.__table__
+    if upsert:
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.id],
+            set_={
+                "clan_tag": stmt.excluded.clan_tag,
+                "clan_name": stmt.excluded.clan_name,
+                "country": stmt.excluded.country,
+            },
+        )
+    else:
+        stmt = insert(table)
+
+    total = 0
+    freed = 0
+    start_time = time.perf_counter()
+    with engine.begin() as conn:
+        # A full load is not worth replaying change by change, it is marked as a resync instead
+        with nullcontext() if upsert else paused_change_log(conn):
+            for chunk in _chunked(_seed_rows(seed_clans), chunk_size):
+                if upsert:
+                    freed += _free_taken_tags(conn, chunk)
+                conn.execute(stmt, chunk)
+                total += len(chunk)
+                logger.debug(f"Seeded {total} clans so far...")
+        if freed:
+            untagged = conn.execute(select(ClanSQL.id).where(ClanSQL.clan_tag.startswith(FREED_TAG_PREFIX, autoescape=True))).scalars().all()
+            if untagged:
+                logger.warning(f"{len(untagged)} clans lost their tag to another clan and are not in the seed, they keep a placeholder tag until the next refresh: {untagged[:20]}")
+        if upsert:
+            compact_expired_changes(conn, CHANGE_LOG_MAX_ENTRIES, CHANGE_LOG_RETENTION)
+        else:
+            mark_resync(conn)
+        bump_dataset_version(conn)
+
+    notify_dataset_change()
+    elapsed = time.perf_counter() - start_time
+    SEED_DURATION.observe(elapsed)
+    SEED_ROWS.inc(total)
+    rate = total / elapsed if elapsed > 0 else float(total)
+    logger.info(f"Wrote {total} clans in {elapsed:.2f}s ({rate:.0f} rows/s, chunk size {chunk_size}, upsert={upsert}).")
+    return total
+
+def seed_database(seed_file_path: str = SEED_DATA_PATH, chunk_size: int = SEED_CHUNK_SIZE, upsert: bool = False):
+    """
+    Seeds the database with the clans from the seed file, streamed into bulk_insert_clans.
+
+    Use upsert=True to re-seed a database that already contains clans.
+    """
+    try:
+        seed_clans = load_seed_data(seed_file_path)
+
+        logger.info(f"Starting to seed database from {seed_file_path}...")
+        total = bulk_insert_clans(seed_clans, chunk_size=chunk_size, upsert=upsert)
+        logger.info(f"✅ Successfully seeded database with {total} clans.")
+        return total
 
     except Exception as e:
         logger.error(f"❌ Error while seeding the database: {str(e)}")
+        return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed the clans database from a seed file.")
+    parser.add_argument("--seed-file", default=SEED_DATA_PATH, help="Path to the seed file.")
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE, help="Rows sent per executemany batch.")
+    parser.add_argument("--upsert", action="store_true", help="Overwrite clans that already exist instead of failing.")
+    args = parser.parse_args()
 
-    finally:
-        db.close()  # Ensure the db session is closed after seeding
+    create_tables()
+    seed_database(args.seed_file, chunk_size=args.chunk_size, upsert=args.upsert)
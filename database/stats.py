@@ -0,0 +1,71 @@
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from api.model import CountryStatsSQL
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+STATS_TABLE = CountryStatsSQL.__tablename__
+
+# Triggers adjust the per-country counts on every write to the clans table, including bulk
+# seeding, so reading the stats never scans the clans table.
+CREATE_STATS_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_ai AFTER INSERT ON clans BEGIN
+        INSERT INTO {STATS_TABLE}(country, clan_count) VALUES (new.country, 1)
+            ON CONFLICT(country) DO UPDATE SET clan_count = clan_count + 1;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_ad AFTER DELETE ON clans BEGIN
+        UPDATE {STATS_TABLE} SET clan_count = clan_count - 1 WHERE country = old.country;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {STATS_TABLE}_au AFTER UPDATE OF country ON clans WHEN old.country IS NOT new.country BEGIN
+        UPDATE {STATS_TABLE} SET clan_count = clan_count - 1 WHERE country = old.country;
+        INSERT INTO {STATS_TABLE}(country, clan_count) VALUES (new.country, 1)
+            ON CONFLICT(country) DO UPDATE SET clan_count = clan_count + 1;
+    END
+    """,
+]
+
+def rebuild_country_stats(conn: Connection):
+    """
+    Recompute the per-country counts from the clans table.
+    """
+    conn.execute(text(f"DELETE FROM {STATS_TABLE}"))
+    conn.execute(text(f"INSERT INTO {STATS_TABLE}(country, clan_count) SELECT country, COUNT(*) FROM clans GROUP BY country"))
+    logger.info("Country statistics rebuilt.")
+
+def init_country_stats(conn: Connection):
+    """
+    Create the triggers maintaining the country statistics, rebuilding them if they drifted.
+    """
+    if conn.dialect.name != "sqlite":
+        logger.warning(f"Country statistics triggers require SQLite, not {conn.dialect.name}. Statistics disabled.")
+        return
+
+    for trigger in CREATE_STATS_TRIGGERS:
+        conn.execute(text(trigger))
+
+    # Both totals are cheap, and they differ when the table is new or was written without triggers
+    counted = conn.execute(text(f"SELECT COALESCE(SUM(clan_count), 0) FROM {STATS_TABLE}")).scalar()
+    total = conn.execute(text("SELECT COUNT(*) FROM clans")).scalar()
+    if counted != total:
+        logger.info(f"Country statistics count {counted} clans instead of {total}.")
+        rebuild_country_stats(conn)
+
+def get_country_counts(db: Session) -> List[CountryStatsSQL]:
+    """
+    Return the countries that have clans, largest first.
+    """
+    return (
+        db.query(CountryStatsSQL)
+        .filter(CountryStatsSQL.clan_count > 0)
+        .order_by(CountryStatsSQL.clan_count.desc(), CountryStatsSQL.country)
+        .all()
+    )
@@ -1,132 +1,238 @@
+"""
+Extract new French clans from a text file of clan tags.
+
+Tags are checked against a persistent SQLite index of known and rejected tags, only unknown
+tags are looked up on the Wargaming API, and each run writes the clans it added or rejected
+instead of rewriting the full lists.
+
+Usage, from the repository root:
+    python -m extract_clan_FR.extract [--src extract_clan_FR/src.txt] [--full-dump]
+"""
+import argparse
 import glob
-import os
-import requests
 import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+import requests
+from utils.config import WG_API_KEY, WG_API_URL
+from utils.logging import setup_logger
 
-input_path = "./extract_clan_FR"
-data_path = "./data"
-output_path = "./extract_clan_FR"
-
-clansFR = {}
-extract = []
-old_removed_clan = []
-
-### Extract from txt src file
-input_file_path = f"{input_path}/src.txt"
-if os.path.isfile(input_file_path):
-    print(f"Opening file {input_file_path}")
-    text_file = open(input_file_path, "r")
-else :
-    print("No text file found")
-
-### Extract most recent *_french_clan_list.json from data_path
-if not os.path.exists(data_path):
-    print("Folder data not found, dying program")
-    exit(code=-1)
-most_recent_file = glob.glob(f'{data_path}/*_french_clan_list.json')
-most_recent_file.sort()
-most_recent_file.reverse()
-most_recent_file = most_recent_file[0]
-if os.path.isfile(most_recent_file):
-    print(f"Opening file {most_recent_file}")
-    json_file = open(most_recent_file)
-    clansFR = json.load(json_file)
-else :
-    print("No json file found, ending program") 
-    exit(code=-1)
-
-### Extract data from all *_removed_clan.json file in folder output_path
-if not os.path.exists(output_path):
-    print("Folder data not found, dying program")
-    exit(code=-1)
-most_recent_file = glob.glob(f'{output_path}/*_removed_clan.json')
-for rfile in most_recent_file:
-    if os.path.isfile(rfile):
-        print(f"Opening file {rfile}")
-        json_file = open(rfile)
-        for item_old_removed_clan in json.load(json_file):
-            old_removed_clan.append(item_old_removed_clan)
-    else :
-        print(f"An error occured, invalid path to json file {rfile}")
-old_removed_clan.sort()
-
-### Extracting data from input file
-print("=== Extracting data from file ===")
-for lines in text_file:
-    items = lines.split()
-    for item in items:
-        extract.append(item)
-
-print(f"Found {len(extract)} clans in file")
-
-### Removing duplicates in clan tag
-print("=== Cleaning data ===")
-before_removing_duplicates = len(extract)
-extract = list(set(extract))
-extract.sort()
-print(f"Removed {str(before_removing_duplicates - len(extract))} duplicate elements")
-
-### Removing already known clans
-before_removing_duplicates = len(extract)
-
-known_clans = set([e['clan_tag'] for e in clansFR.values()])
-print(f"Found {len(known_clans)} already repertoried clans")
-
-extract_clean = []
-for clan in extract:
-    if clan not in known_clans and clan not in old_removed_clan:
-        extract_clean.append(clan)
-extract = extract_clean
-print(f"Found {len(extract_clean)} new clans in file")
-
-### Collecting data from API
-base_url = 'https://api.worldoftanks.eu/wgn/clans/list/?application_id=6267be451d158341277b1a61f3e32e97&fields=clan_id%2Cname%2Ctag&game=wot&language=fr&search='
-MAX_RETRY = 3
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
 
-print("=== Contacting Wargaming API to get clan data like id and full name ===")
+INPUT_PATH = "./extract_clan_FR"
+DATA_PATH = "./data"
+OUTPUT_PATH = "./extract_clan_FR"
+INDEX_PATH = f"{OUTPUT_PATH}/tag_index.db"
 
-removed_clan = []
-for clan in extract:
-    print(f"Requesting WG API for clan {clan} \t\t\t........ {extract.index(clan)+1}/{str(len(extract))}")
-    for _ in range(MAX_RETRY):
+SEARCH_URL = f"{WG_API_URL.rstrip('/')}/clans/list/"
+MAX_RETRY = 3
+RETRY_BACKOFF = 1.0
+REQUEST_TIMEOUT = 10
+MAX_IN_FLIGHT = int(os.getenv("EXTRACT_MAX_IN_FLIGHT", "8"))
+MAX_REQUESTS_PER_SECOND = float(os.getenv("EXTRACT_MAX_RPS", "10"))
+
+class TagIndex:
+    """
+    Persistent index of clan tags already known or rejected by previous runs.
+    """
+    def __init__(self, path: str = INDEX_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS known_clans (
+                tag TEXT PRIMARY KEY,
+                clan_id INTEGER NOT NULL,
+                clan_name TEXT NOT NULL,
+                added_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS rejected_tags (
+                tag TEXT PRIMARY KEY,
+                reason TEXT,
+                rejected_at TEXT NOT NULL
+            );
+        """)
+
+    def close(self):
+        self.conn.close()
+
+    def is_empty(self) -> bool:
+        return self.conn.execute("SELECT NOT EXISTS (SELECT 1 FROM known_clans) AND NOT EXISTS (SELECT 1 FROM rejected_tags)").fetchone()[0] == 1
+
+    def contains(self, tag: str) -> bool:
+        """
+        Return True if the tag is either known or rejected.
+        """
+        return self.conn.execute(
+            "SELECT EXISTS (SELECT 1 FROM known_clans WHERE tag = ?) OR EXISTS (SELECT 1 FROM rejected_tags WHERE tag = ?)",
+            (tag, tag),
+        ).fetchone()[0] == 1
+
+    def add_known(self, clans: Iterable[dict]):
+        """
+        Record clans given as {"clan_id", "tag", "name"} dictionaries.
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO known_clans (tag, clan_id, clan_name, added_at) VALUES (?, ?, ?, ?)",
+            ((clan["tag"], int(clan["clan_id"]), clan["name"], now) for clan in clans),
+        )
+        self.conn.commit()
+
+    def add_rejected(self, tags: Iterable[str], reason: str):
+        now = datetime.now().isoformat(timespec="seconds")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO rejected_tags (tag, reason, rejected_at) VALUES (?, ?, ?)",
+            ((tag, reason, now) for tag in tags),
+        )
+        self.conn.commit()
+
+    def known_clans(self) -> Dict[str, dict]:
+        """
+        Return all known clans in the *_french_clan_list.json layout.
+        """
+        rows = self.conn.execute("SELECT clan_id, tag, clan_name FROM known_clans ORDER BY tag")
+        return {str(clan_id): {"clan_tag": tag, "clan_name": clan_name} for clan_id, tag, clan_name in rows}
+
+    def import_legacy_dumps(self, data_path: str = DATA_PATH, output_path: str = OUTPUT_PATH):
+        """
+        Fill the index from the newest *_french_clan_list.json and every *_removed_clan.json.
+        """
+        clan_lists = sorted(glob.glob(f"{data_path}/*_french_clan_list.json"), reverse=True)
+        if clan_lists:
+            logger.info(f"Importing known clans from {clan_lists[0]}")
+            with open(clan_lists[0], "r", encoding="utf-8") as f:
+                clans = json.load(f)
+            self.add_known({"clan_id": clan_id, "tag": clan["clan_tag"], "name": clan["clan_name"]} for clan_id, clan in clans.items())
+
+        for removed_file in glob.glob(f"{output_path}/*_removed_clan.json"):
+            logger.info(f"Importing rejected tags from {removed_file}")
+            with open(removed_file, "r", encoding="utf-8") as f:
+                self.add_rejected(json.load(f), "imported")
+
+class RateLimiter:
+    """
+    Space out calls so that at most `rate` of them start every second, across threads.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+_thread_data = threading.local()
+
+def lookup_tag(tag: str, rate_limiter: RateLimiter) -> Optional[dict]:
+    """
+    Search a clan tag on the WG API, retrying only failed requests.
+
+    Returns the clan whose tag matches exactly, or None if there is none.
+    """
+    if not hasattr(_thread_data, "session"):
+        _thread_data.session = requests.Session()
+
+    params = {"application_id": WG_API_KEY, "fields": "clan_id,name,tag", "game": "wot", "language": "fr", "search": tag}
+    for attempt in range(MAX_RETRY):
+        rate_limiter.wait()
         try:
-            response = requests.get(base_url+clan)
-        except requests.exceptions.ConnectionError:
-            print("Connection error")
-            pass
-
-    result = response.json()
-    if result["meta"]["count"] >= 1:
-        clan_api_info = result["data"][0]
-        if clan == clan_api_info['tag']:
-            clansFR[clan_api_info['clan_id']] = {
-                'clan_tag': clan_api_info['tag'],
-                'clan_name': clan_api_info['name']
-            }
-            print("SUCCESS")
-        else :
-            removed_clan.append(clan)
-            print("FAILED, invalid clan name, probably missspelled")
-    else :
-        removed_clan.append(clan)
-        print("FAILED, invalid clan name")
-
-
-### Dumping data in files
-current_date_time = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-
-print("=== Stats from data ===")
-print(f"Added {len(extract_clean)-len(removed_clan)} new clans ")
-print(f"Found {len(clansFR)} total clans ")
-print(f"Added {len(removed_clan)} invalid clans")
-
-print("=== Dumping data ===")
-print("Dumping correct data with all available clans")
-with open(f"{data_path}/{current_date_time}_french_clan_list.json", "w") as outfile:
-    outfile.write(json.dumps(clansFR, indent=4))
-    
-output_removed = list(set(removed_clan+old_removed_clan))
-print("Dumping data for unavailable clans")
-with open(f"{output_path}/{current_date_time}_removed_clan.json", "w") as outfile:
-    outfile.write(json.dumps(output_removed, indent=4))
+            response = _thread_data.session.get(SEARCH_URL, params=params, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            result = response.json()
+            if result.get("status") == "ok":
+                return next((clan for clan in result["data"] if clan["tag"] == tag), None)
+            logger.warning(f"API error for clan {tag}: {result.get('error')}")
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.warning(f"Request error for clan {tag}: {e}")
+        if attempt + 1 < MAX_RETRY:
+            time.sleep(RETRY_BACKOFF * 2 ** attempt)
+    raise RuntimeError(f"No valid response for clan {tag} after {MAX_RETRY} attempts")
+
+def read_tags(src_path: str) -> List[str]:
+    """
+    Read the whitespace-separated clan tags of a text file, without duplicates.
+    """
+    with open(src_path, "r", encoding="utf-8") as text_file:
+        return sorted(set(text_file.read().split()))
+
+def lookup_new_tags(tags: List[str], index: TagIndex, max_in_flight: int = MAX_IN_FLIGHT, max_rps: float = MAX_REQUESTS_PER_SECOND):
+    """
+    Look up tags concurrently and record each result in the index as soon as it arrives.
+
+    Returns the added clans, the rejected tags and the tags whose lookup failed.
+    """
+    rate_limiter = RateLimiter(max_rps)
+    added, rejected, failed = [], [], []
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+        futures = {executor.submit(lookup_tag, tag, rate_limiter): tag for tag in tags}
+        for done, future in enumerate(as_completed(futures), start=1):
+            tag = futures[future]
+            try:
+                clan = future.result()
+            except RuntimeError as e:
+                logger.error(str(e))
+                failed.append(tag)
+                continue
+
+            if clan is None:
+                index.add_rejected([tag], "not found")
+                rejected.append(tag)
+            else:
+                index.add_known([clan])
+                added.append(clan)
+            logger.info(f"Looked up clan {tag} ({'found' if clan else 'not found'}) \t\t........ {done}/{len(tags)}", extra={"rate_limit_key": "extract.lookup"})
+
+    return added, rejected, failed
+
+def run(src_path: str = f"{INPUT_PATH}/src.txt", index_path: str = INDEX_PATH, data_path: str = DATA_PATH, output_path: str = OUTPUT_PATH, full_dump: bool = False) -> dict:
+    """
+    Extract the new clans of a tag file and write the run's delta next to the previous dumps.
+    """
+    index = TagIndex(index_path)
+    try:
+        if index.is_empty():
+            index.import_legacy_dumps(data_path, output_path)
+
+        tags = read_tags(src_path)
+        new_tags = [tag for tag in tags if not index.contains(tag)]
+        logger.info(f"Found {len(tags)} unique clans in {src_path}, {len(new_tags)} not seen before.")
+
+        added, rejected, failed = lookup_new_tags(new_tags, index)
+
+        current_date_time = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+        if added:
+            with open(f"{data_path}/{current_date_time}_new_french_clan.json", "w", encoding="utf-8") as outfile:
+                json.dump({str(clan["clan_id"]): {"clan_tag": clan["tag"], "clan_name": clan["name"]} for clan in added}, outfile, indent=4, ensure_ascii=False)
+        if rejected:
+            with open(f"{output_path}/{current_date_time}_removed_clan.json", "w", encoding="utf-8") as outfile:
+                json.dump(sorted(rejected), outfile, indent=4)
+        if full_dump:
+            with open(f"{data_path}/{current_date_time}_french_clan_list.json", "w", encoding="utf-8") as outfile:
+                json.dump(index.known_clans(), outfile, indent=4, ensure_ascii=False)
+
+        summary = {"tags": len(tags), "new_tags": len(new_tags), "added": len(added), "rejected": len(rejected), "failed": len(failed)}
+        logger.info(f"Extraction finished: {summary}")
+        if failed:
+            logger.warning(f"Could not look up {len(failed)} clans, run again to retry them.")
+        return summary
+    finally:
+        index.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract new French clans from a file of clan tags.")
+    parser.add_argument("--src", default=f"{INPUT_PATH}/src.txt", help="Text file with whitespace-separated clan tags.")
+    parser.add_argument("--index", default=INDEX_PATH, help="SQLite index of known and rejected tags.")
+    parser.add_argument("--full-dump", action="store_true", help="Also write the complete list of known clans.")
+    args = parser.parse_args()
+    run(args.src, index_path=args.index, full_dump=args.full_dump)
@@ -1,31 +1,144 @@
 import csv
+import io
+import json
 import os
-from database.database import load_clans
+import threading
+import time
+import zlib
+from enum import Enum
+from typing import Iterable, Iterator, Optional
+from sqlalchemy import select
+from api.model import ClanSQL
+from api.serialization import COUNTRY_VALUES
+from database.database import engine
+from utils.config import EXPORT_BATCH_SIZE, GZIP_LEVEL
+from utils.logging import setup_logger
+from utils.metrics import EXPORT_DURATION
 
-def export_clans_to_csv(filepath: str):
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    TXT = "txt"
+    NDJSON = "ndjson"
+
+MEDIA_TYPES = {
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.TXT: "text/plain; charset=utf-8",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+
+def iter_clan_batches(batch_size: int = EXPORT_BATCH_SIZE, display_countries: bool = True) -> Iterator[list]:
     """
-    Export clan data to a CSV file.
+    Stream clans from the database as batches of (id, clan_tag, clan_name, country) rows.
+
+    Countries are display values ("France") like in the API responses, or the stored enum
+    names ("FRANCE") with display_countries=False. Uses a server-side cursor so only one batch
+    is held in memory at a time.
     """
-    clans = load_clans()
+    clans = ClanSQL.__table__
+    query = select(clans.c.id, clans.c.clan_tag, clans.c.clan_name, clans.c.country).order_by(clans.c.id)
 
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(query)
+        for batch in result.partitions():
+            if display_countries:
+                batch = [(clan_id, clan_tag, clan_name, COUNTRY_VALUES[country]) for clan_id, clan_tag, clan_name, country in batch]
+            yield batch
 
-    with open(filepath, "w", newline='', encoding="utf-8") as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(["ID", "Clan Tag", "Clan Name"])
-        for clan_id, data in clans.items():
-            writer.writerow([clan_id, data.get("clan_tag"), data.get("clan_name")])
+def _render_csv(batches: Iterable[list]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["ID", "Clan Tag", "Clan Name", "Country"])
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
 
-def export_clans_to_txt(filepath: str):
+def _render_txt(batches: Iterable[list]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            f"ID: {clan_id}\nClan Tag: {clan_tag}\nClan Name: {clan_name}\nCountry: {country}\n\n"
+            for clan_id, clan_tag, clan_name, country in batch
+        )
+
+def _render_ndjson(batches: Iterable[list]) -> Iterator[str]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({"id": clan_id, "clan_tag": clan_tag, "clan_name": clan_name, "country": country}, ensure_ascii=False) + "\n"
+            for clan_id, clan_tag, clan_name, country in batch
+        )
+
+RENDERERS = {
+    ExportFormat.CSV: _render_csv,
+    ExportFormat.TXT: _render_txt,
+    ExportFormat.NDJSON: _render_ndjson,
+}
+
+def _gzip_chunks(chunks: Iterable[bytes], level: int) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def _timed(chunks: Iterable[bytes], export_format: ExportFormat) -> Iterator[bytes]:
+    start_time = time.perf_counter()
+    try:
+        yield from chunks
+    finally:
+        EXPORT_DURATION.labels(export_format.value).observe(time.perf_counter() - start_time)
+
+def stream_clans(export_format: ExportFormat, compress: bool = False, batch_size: int = EXPORT_BATCH_SIZE, gzip_level: int = GZIP_LEVEL) -> Iterator[bytes]:
     """
-    Export clan data to a TXT file.
+    Stream all clans in the given format as UTF-8 encoded chunks, optionally gzip-compressed at gzip_level.
+    """
+    chunks = (text.encode("utf-8") for text in RENDERERS[export_format](iter_clan_batches(batch_size)) if text)
+    if compress:
+        chunks = _gzip_chunks(chunks, gzip_level)
+    return _timed(chunks, export_format)
+
+def export_filename(export_format: ExportFormat, compress: bool = False) -> str:
+    """
+    Name of the downloaded export file.
+    """
+    filename = f"clans.{export_format.value}"
+    return f"{filename}.gz" if compress else filename
+
+def export_clans_to_file(filepath: str, export_format: ExportFormat, compress: bool = False, stop_event: Optional[threading.Event] = None):
     """
-    clans = load_clans()
+    Export clan data to a file without loading the whole table in memory.
 
+    Setting stop_event aborts the export between two chunks and leaves any previous file in place.
+    """
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
 
-    with open(filepath, "w", encoding="utf-8") as txtfile:
-        for clan_id, data in clans.items():
-            txtfile.write(f"ID: {clan_id}\n")
-            txtfile.write(f"Clan Tag: {data.get('clan_tag')}\n")
-            txtfile.write(f"Clan Name: {data.get('clan_name')}\n\n")
+    # Written next to the target and renamed, so readers never see a partial export
+    partial_path = f"{filepath}.partial"
+    try:
+        with open(partial_path, "wb") as outfile:
+            for chunk in stream_clans(export_format, compress=compress):
+                if stop_event is not None and stop_event.is_set():
+                    raise RuntimeError(f"Export to {filepath} stopped before completion.")
+                outfile.write(chunk)
+        os.replace(partial_path, filepath)
+    finally:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+    logger.info(f"Exported clans as {export_format.value} to {filepath}")
+
+def export_clans_to_csv(filepath: str):
+    """
+    Export clan data to a CSV file.
+    """
+    export_clans_to_file(filepath, ExportFormat.CSV)
+
+def export_clans_to_txt(filepath: str):
+    """
+    Export clan data to a TXT file.
+    """
+    export_clans_to_file(filepath, ExportFormat.TXT)
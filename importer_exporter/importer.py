@@ -1,23 +1,113 @@
-from database.database import load_clans, save_clans
-import requests
+import argparse
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import select
+from api.crud import bulk_update_clans
+from api.model import ClanSQL, RefreshSummary
+from database.database import SessionLocal, create_tables
+from utils.config import IMPORTER_CONCURRENCY, WG_API_BATCH_SIZE
+from utils.logging import setup_logger
+from utils.wg_api import WGAPIError, WGClient
 
-# You can later make these constants configurable
-APPLICATION_ID = "6267be451d158341277b1a61f3e32e97"
-BASE_API_URL = f"https://api.worldoftanks.eu/wgn/clans/list/?application_id={APPLICATION_ID}&fields=clan_id%2Cname%2Ctag&game=wot&language=fr&search="
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
 
-def update_clan_data():
+async def _fetch_batches(client: WGClient, clan_ids: List[int], concurrency: int, progress: Optional[Callable[[int, int], None]] = None, stop_event: Optional[threading.Event] = None) -> Dict[int, Optional[dict]]:
     """
-    Dummy function to simulate a clan update.
-    Ideally you would provide a list of clan tags or some other mechanism.
+    Fetch clans/info for clan_ids in batches of WG_API_BATCH_SIZE, at most concurrency batches at a time.
+
+    IDs of batches that failed after the client's retries are left out of the result. progress
+    is called with the number of finished and total batches. Once stop_event is set, the
+    batches not started yet are skipped.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(batch: List[int]) -> Dict[int, Optional[dict]]:
+        async with semaphore:
+            if stop_event is not None and stop_event.is_set():
+                return {}
+            try:
+                return await client.fetch_clans(batch)
+            except WGAPIError as e:
+                logger.error(f"Could not refresh clans {batch[0]} to {batch[-1]}: {e}")
+                return {}
+
+    batches = [clan_ids[i:i + WG_API_BATCH_SIZE] for i in range(0, len(clan_ids), WG_API_BATCH_SIZE)]
+    wg_clans = {}
+    for done, task in enumerate(asyncio.as_completed([fetch(batch) for batch in batches]), start=1):
+        wg_clans.update(await task)
+        if progress:
+            progress(done, len(batches))
+        if done % 100 == 0:
+            logger.info(f"Fetched {done}/{len(batches)} clans/info batches.")
+    return wg_clans
+
+async def refresh_clans(client: WGClient, concurrency: int = IMPORTER_CONCURRENCY, progress: Optional[Callable[[int, int], None]] = None, stop_event: Optional[threading.Event] = None) -> RefreshSummary:
+    """
+    Check every clan against the WG API, then apply tag and name changes and disbanded flags in bulk.
+
+    Clans unknown to the API are flagged as disbanded, and flagged clans the API reports as
+    active again are unflagged. Setting stop_event abandons the refresh before anything is written.
     """
-    # For now, just reload and save again (you can later improve this).
-    clans = load_clans()
+    start_time = time.perf_counter()
+    # Separate sessions, so no transaction stays open while the WG API is queried
+    db = SessionLocal()
+    try:
+        stored = {row.id: row for row in db.execute(select(ClanSQL.id, ClanSQL.clan_tag, ClanSQL.clan_name, ClanSQL.is_disbanded))}
+    finally:
+        db.close()
+
+    logger.info(f"Refreshing {len(stored)} clans from the WG API, {concurrency} batches at a time...")
+    wg_clans = await _fetch_batches(client, list(stored), concurrency, progress, stop_event)
+    if stop_event is not None and stop_event.is_set():
+        raise RuntimeError(f"Clan refresh stopped after checking {len(wg_clans)} of {len(stored)} clans, nothing was written.")
+
+    renames = []
+    disbanded = {}
+    for clan_id, wg_clan in wg_clans.items():
+        clan = stored[clan_id]
+        is_disbanded = not wg_clan or bool(wg_clan.get("is_clan_disbanded"))
+        if is_disbanded != clan.is_disbanded:
+            disbanded[clan_id] = is_disbanded
+        if not is_disbanded and (wg_clan["tag"], wg_clan["name"]) != (clan.clan_tag, clan.clan_name):
+            renames.append({"id": clan_id, "clan_tag": wg_clan["tag"], "clan_name": wg_clan["name"]})
+
+    conflicts = {}
+    if renames or disbanded:
+        db = SessionLocal()
+        try:
+            conflicts = bulk_update_clans(db, renames, disbanded)
+        finally:
+            db.close()
+
+    summary = RefreshSummary(
+        checked=len(wg_clans),
+        renamed=len(renames) - len(conflicts),
+        disbanded=sum(disbanded.values()),
+        reactivated=len(disbanded) - sum(disbanded.values()),
+        failed=len(stored) - len(wg_clans),
+        conflicts=conflicts,
+        duration_s=round(time.perf_counter() - start_time, 3),
+    )
+    logger.info(f"Clan refresh done: {summary.model_dump()}")
+    return summary
+
+def update_clan_data(concurrency: int = IMPORTER_CONCURRENCY, progress: Optional[Callable[[int, int], None]] = None, stop_event: Optional[threading.Event] = None) -> RefreshSummary:
+    """
+    Refresh every clan from the WG API, see refresh_clans. Runs its own event loop and WG API client.
+    """
+    async def run() -> RefreshSummary:
+        async with WGClient(max_connections=concurrency) as client:
+            return await refresh_clans(client, concurrency, progress, stop_event)
+
+    return asyncio.run(run())
 
-    # Example: Adding a static fake clan
-    new_clan_id = 999999
-    clans[str(new_clan_id)] = {
-        "clan_tag": "FAKE",
-        "clan_name": "Fake Clan Name"
-    }
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh clan tags, names and disbanded flags from the WG API.")
+    parser.add_argument("--concurrency", type=int, default=IMPORTER_CONCURRENCY, help="clans/info batches in flight.")
+    args = parser.parse_args()
 
-    save_clans(clans)
+    create_tables()
+    print(update_clan_data(args.concurrency).model_dump_json(indent=2))
@@ -4,6 +4,14 @@ from database.database import init_db
 import uvicorn
 from contextlib import asynccontextmanager
 from utils.logging import setup_logger
+from utils.wg_api import close_wg_client
+from scraper.pool import browser_pool
+from scraper.html_languages import close_http_client
+from utils.metrics import MetricsMiddleware
+from utils.config import SNAPSHOT_CACHE_ENABLED, DATABASE_ASYNC
+from api.snapshots import snapshot_cache
+from api.jobs import job_manager
+from starlette.concurrency import run_in_threadpool
 
 # Set up the logger for this file/module
 logger = setup_logger(__name__)
@@ -13,8 +21,31 @@ async def lifespan(app: FastAPI):
     # This will run at startup
     logger.info("Starting up the application...")
     init_db()
+    if SNAPSHOT_CACHE_ENABLED:
+        snapshot_cache.open()
+        try:
+            await run_in_threadpool(snapshot_cache.warm)
+        except Exception as e:
+            # Snapshots are built on first request instead
+            logger.warning(f"Could not warm the clan list snapshots: {e}")
+    job_manager.start()
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Scraping routes retry the launch on first use, the rest of the API works without a browser
+        logger.warning(f"Could not start the browser pool: {e}")
     yield
     logger.info("Shutting down the application...")
+    # Queued jobs are cancelled, running ones finish first
+    await run_in_threadpool(job_manager.stop)
+    await close_wg_client()
+    await close_http_client()
+    await browser_pool.stop()
+    # Waits for a snapshot being rebuilt, so none is built after shutdown
+    await run_in_threadpool(snapshot_cache.close)
+    if DATABASE_ASYNC:
+        from database.async_database import close_async_engine
+        await close_async_engine()
 
 app = FastAPI(
     title="WOT French Clan API",
@@ -25,8 +56,16 @@ app = FastAPI(
     redoc_url=None     # Disable ReDoc
 )
 
+# Record request counts and latencies for the /metrics endpoint.
+app.add_middleware(MetricsMiddleware)
+
 # Include the API router for handling endpoints.
-app.include_router(router)
+if DATABASE_ASYNC:
+    # Imported only in async mode, it creates the async engine and needs its driver (aiosqlite for SQLite)
+    from api.async_routes import build_async_router
+    app.include_router(build_async_router())
+else:
+    app.include_router(router)
 
 if __name__ == "__main__":
     # Run the API with uvicorn.
@@ -0,0 +1,67 @@
+from typing import List, Optional
+import httpx
+from selectolax.lexbor import LexborHTMLParser
+from utils.config import CLAN_PAGE_URL, SCRAPER_HTTP_TIMEOUT
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+LANGUAGE_LIST_SELECTOR = ".language-list"
+
+def parse_languages(html: str) -> Optional[List[str]]:
+    """
+    Extract the deduplicated texts under the '.language-list' element of a clan page.
+
+    Returns None when the page has no such element, so callers can fall back to a browser.
+    """
+    language_list = LexborHTMLParser(html).css_first(LANGUAGE_LIST_SELECTOR)
+    if language_list is None:
+        return None
+
+    languages = set()
+    for item in language_list.css("*"):
+        if item == language_list:
+            continue
+        text = " ".join(item.text(deep=True).split())
+        if text:
+            languages.add(text)
+    return list(languages)
+
+# Keep-alive HTTP client shared by all fast path requests, created on first use
+_client: Optional[httpx.AsyncClient] = None
+
+def _get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(SCRAPER_HTTP_TIMEOUT),
+            follow_redirects=True,
+            headers={"Accept": "text/html", "Accept-Language": "fr,en;q=0.8"},
+        )
+    return _client
+
+async def close_http_client():
+    """
+    Close the shared HTTP client, if it was created.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def fetch_languages(clan_id: int) -> Optional[List[str]]:
+    """
+    Get a clan's languages from the server-rendered clan page, without a browser.
+
+    Returns None if the page could not be fetched or does not contain the language list.
+    """
+    url = CLAN_PAGE_URL.format(clan_id=clan_id)
+    try:
+        response = await _get_client().get(url)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        logger.debug(f"Fast path could not fetch {url}: {e}")
+        return None
+
+    return parse_languages(response.text)
@@ -0,0 +1,114 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
+from utils.config import SCRAPER_MAX_PAGES, SCRAPER_PAGE_TIMEOUT_MS, SCRAPER_PAGE_MAX_USES
+from utils.logging import setup_logger
+from utils.metrics import SCRAPER_BROWSER_LAUNCHES, SCRAPER_PAGES_OPENED
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+class PooledPage:
+    """
+    A browser page with its own context, reused until it reaches its maximum number of uses.
+    """
+    def __init__(self, context: BrowserContext, page: Page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    async def close(self):
+        with suppress(Exception):
+            await self.context.close()
+
+class BrowserPool:
+    """
+    One headless Chromium shared by all scraping calls.
+
+    At most max_pages pages are open at once, extra callers wait for a free page. Pages are
+    reused between calls and recycled after max_uses navigations or after any error.
+    """
+    def __init__(self, max_pages: int = SCRAPER_MAX_PAGES, page_timeout_ms: int = SCRAPER_PAGE_TIMEOUT_MS, max_uses: int = SCRAPER_PAGE_MAX_USES):
+        self.max_pages = max_pages
+        self.page_timeout_ms = page_timeout_ms
+        self.max_uses = max_uses
+        self._playwright: Playwright = None
+        self._browser: Browser = None
+        self._idle = []
+        self._semaphore = asyncio.Semaphore(max_pages)
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def is_running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self):
+        """
+        Launch the browser if it is not running, relaunching it after a crash.
+        """
+        async with self._start_lock:
+            if self.is_running:
+                return
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._idle.clear()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            SCRAPER_BROWSER_LAUNCHES.inc()
+            logger.info(f"Browser pool started: {self.max_pages} pages max, {self.page_timeout_ms}ms timeout, recycled after {self.max_uses} uses.")
+
+    async def stop(self):
+        """
+        Close every page, the browser and Playwright.
+        """
+        async with self._start_lock:
+            idle, self._idle = self._idle, []
+            for pooled_page in idle:
+                await pooled_page.close()
+            if self._browser is not None:
+                with suppress(Exception):
+                    await self._browser.close()
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+            logger.info("Browser pool stopped.")
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Borrow a page from the pool, waiting if all pages are busy.
+        """
+        async with self._semaphore:
+            pooled_page = await self._acquire()
+            healthy = False
+            try:
+                yield pooled_page.page
+                healthy = True
+            finally:
+                await self._release(pooled_page, healthy)
+
+    async def _acquire(self) -> PooledPage:
+        await self.start()
+        while self._idle:
+            pooled_page = self._idle.pop()
+            if not pooled_page.page.is_closed():
+                return pooled_page
+            await pooled_page.close()
+
+        context = await self._browser.new_context()
+        page = await context.new_page()
+        page.set_default_timeout(self.page_timeout_ms)
+        SCRAPER_PAGES_OPENED.inc()
+        logger.debug("Opened a new browser page.")
+        return PooledPage(context, page)
+
+    async def _release(self, pooled_page: PooledPage, healthy: bool):
+        pooled_page.uses += 1
+        if healthy and pooled_page.uses < self.max_uses and self.is_running and not pooled_page.page.is_closed():
+            self._idle.append(pooled_page)
+        else:
+            logger.debug(f"Recycling browser page after {pooled_page.uses} uses.")
+            await pooled_page.close()
+
+# Shared pool, started in the application lifespan
+browser_pool = BrowserPool()
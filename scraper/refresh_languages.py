@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+from typing import Optional
+from api.crud import get_clan_ids_with_stale_languages, save_languages
+from database.database import SessionLocal
+from scraper.html_languages import close_http_client
+from scraper.pool import browser_pool
+from scraper.scraper import get_languages
+from utils.config import LANGUAGES_TTL, LANGUAGES_REFRESH_CONCURRENCY
+from utils.logging import setup_logger
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+def _stale_clan_ids(max_age: timedelta, country: Optional[str]):
+    db = SessionLocal()
+    try:
+        return get_clan_ids_with_stale_languages(db, max_age, country)
+    finally:
+        db.close()
+
+def _store_languages(clan_id: int, languages):
+    db = SessionLocal()
+    try:
+        save_languages(db, clan_id, languages)
+    finally:
+        db.close()
+
+async def refresh_languages(country: Optional[str] = None, max_age: timedelta = LANGUAGES_TTL, concurrency: int = LANGUAGES_REFRESH_CONCURRENCY) -> dict:
+    """
+    Scrape and cache the languages of every clan whose cached entry is missing or stale.
+
+    Args:
+        country: Only refresh clans of this country (e.g. "UNKNOWN"), defaults to all clans.
+        max_age: Cached languages younger than this are kept.
+        concurrency: Number of clans scraped in parallel.
+
+    Returns:
+        A summary with the number of refreshed and failed clans.
+    """
+    clan_ids = await asyncio.to_thread(_stale_clan_ids, max_age, country)
+    logger.info(f"Refreshing languages of {len(clan_ids)} clans with {concurrency} workers...")
+
+    queue = asyncio.Queue()
+    for clan_id in clan_ids:
+        queue.put_nowait(clan_id)
+    summary = {"clans": len(clan_ids), "refreshed": 0, "failed": 0}
+    start_time = time.perf_counter()
+
+    async def worker():
+        while True:
+            try:
+                clan_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                languages = await get_languages(clan_id)
+                await asyncio.to_thread(_store_languages, clan_id, languages)
+                summary["refreshed"] += 1
+            except Exception as e:
+                logger.warning(f"Could not refresh languages for clan ID {clan_id}: {e}", extra={"rate_limit_key": "refresh_languages.failed"})
+                summary["failed"] += 1
+            done = summary["refreshed"] + summary["failed"]
+            if done % 100 == 0:
+                logger.info(f"Refreshed languages of {done}/{len(clan_ids)} clans...")
+
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+
+    elapsed = time.perf_counter() - start_time
+    logger.info(f"Languages refresh finished in {elapsed:.1f}s: {summary}")
+    return summary
+
+async def _main(country: Optional[str], max_age: timedelta, concurrency: int):
+    await browser_pool.start()
+    try:
+        await refresh_languages(country, max_age, concurrency)
+    finally:
+        await browser_pool.stop()
+        await close_http_client()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the cached languages of clans with missing or stale entries.")
+    parser.add_argument("--country", help="Only refresh clans of this country, e.g. UNKNOWN.")
+    parser.add_argument("--max-age-hours", type=float, default=LANGUAGES_TTL.total_seconds() / 3600, help="Refresh entries older than this.")
+    parser.add_argument("--concurrency", type=int, default=LANGUAGES_REFRESH_CONCURRENCY, help="Clans scraped in parallel.")
+    args = parser.parse_args()
+    asyncio.run(_main(args.country, timedelta(hours=args.max_age_hours), args.concurrency))
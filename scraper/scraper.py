@@ -1,43 +1,62 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from playwright.async_api import async_playwright
-import asyncio
+from scraper.html_languages import CLAN_PAGE_URL, LANGUAGE_LIST_SELECTOR, close_http_client, fetch_languages
+from scraper.pool import browser_pool
+from utils.logging import setup_logger
+from utils.metrics import SCRAPER_LOOKUPS
 import time  # Import the time module to measure elapsed time
 
-app = FastAPI()
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await browser_pool.start()
+    yield
+    await close_http_client()
+    await browser_pool.stop()
+
+app = FastAPI(lifespan=lifespan)
 
 # Async function for scraping the page
 async def get_languages(id: int):
-    url = f"https://eu.wargaming.net/clans/wot/{id}/"
+    """
+    Get a clan's languages, from the plain HTML page when possible and with a browser otherwise.
+    """
+    languages = await fetch_languages(id)
+    if languages is not None:
+        SCRAPER_LOOKUPS.labels("html").inc()
+        return languages
 
-    async with async_playwright() as playwright:
-        # Launch browser
-        browser = await playwright.chromium.launch(headless=True)
-        page = await browser.new_page()
+    logger.debug(f"Language list not found in the HTML of clan {id}, falling back to the browser.")
+    SCRAPER_LOOKUPS.labels("browser").inc()
+    return await get_languages_with_browser(id)
 
-        try:
-            # Navigate to the URL
-            await page.goto(url)
+async def get_languages_with_browser(id: int):
+    url = CLAN_PAGE_URL.format(clan_id=id)
 
-            css_selector = ".language-list"
+    # Borrow a warm page from the shared browser pool
+    async with browser_pool.page() as page:
+        # Navigate to the URL
+        await page.goto(url)
 
-            # Wait for the page to load
-            await page.wait_for_selector(css_selector)  # Wait for 10 seconds (you can adjust this)
+        css_selector = LANGUAGE_LIST_SELECTOR
 
-            # Locate the '.language-list' element and its children
-            language_list = await page.query_selector(css_selector)
-            items = await language_list.query_selector_all("*")  # Find all child elements
+        # Wait for the page to load, up to the pool's page timeout
+        await page.wait_for_selector(css_selector)
 
-            # Extract and return the unique text content
-            languages = set()  # Use a set to deduplicate
-            for item in items:
-                text = await item.inner_text()
-                if text.strip():  # Avoid adding empty text
-                    languages.add(text.strip())
+        # Locate the '.language-list' element and its children
+        language_list = await page.query_selector(css_selector)
+        items = await language_list.query_selector_all("*")  # Find all child elements
 
-        finally:
-            await browser.close()
+        # Extract and return the unique text content
+        languages = set()  # Use a set to deduplicate
+        for item in items:
+            text = await item.inner_text()
+            if text.strip():  # Avoid adding empty text
+                languages.add(text.strip())
 
-        return list(languages)  # Return a list of deduplicated text
+    return list(languages)  # Return a list of deduplicated text
 
 # FastAPI endpoint
 @app.get("/get_language_by_scraping/{id}")
@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# The configuration requires an API key, but no test calls the Wargaming API
+os.environ.setdefault("WG_API_KEY", "test")
+os.environ.setdefault("LOG_CONSOLE_LEVEL", "WARNING")
+os.environ.setdefault("LOG_DIR", os.path.join(tempfile.gettempdir(), "wot_test_log"))
+# A throwaway SQLite file, so the repository database is never touched
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='wot_test_'), 'test.db')}"
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SAMPLE_CLANS = [
+    {"clan_id": 1, "clan_tag": "FR", "clan_name": "Les Français", "country": "FRANCE"},
+    {"clan_id": 2, "clan_tag": "FROG", "clan_name": "Frogs", "country": "FRANCE"},
+    {"clan_id": 3, "clan_tag": "BE", "clan_name": "Belgique Unie", "country": "BELGIUM"},
+    {"clan_id": 4, "clan_tag": "XX", "clan_name": "Inconnus", "country": "UNKNOWN"},
+]
+
+@pytest.fixture(scope="session")
+def read_fixture():
+    """
+    Read a file of tests/fixtures as text.
+    """
+    def read(name: str) -> str:
+        with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+            return f.read()
+    return read
+
+@pytest.fixture(scope="session")
+def load_clans():
+    """
+    Replace every clan of the test database with the given seed entries, SAMPLE_CLANS by default.
+    """
+    # Imported here, the database modules read DATABASE_URL when they are first imported
+    from api.model import ClanSQL
+    from database.database import create_tables, engine
+    from database.seeds import bulk_insert_clans
+
+    def load(clans=SAMPLE_CLANS) -> int:
+        create_tables()
+        with engine.begin() as conn:
+            conn.execute(ClanSQL.__table__.delete())
+        return bulk_insert_clans(clans)
+    return load
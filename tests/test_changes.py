@@ -0,0 +1,48 @@
+from api.crud import get_clan_changes, update_clan
+from api.model import ClanChangeSQL
+from database.changes import get_last_seq
+from database.database import SessionLocal
+from database.seeds import bulk_insert_clans
+
+NEW_CLANS = [{"clan_id": clan_id, "clan_tag": f"N{clan_id}", "clan_name": "Nouveaux", "country": "FRANCE"} for clan_id in range(100, 1100)]
+
+def test_plain_seed_is_not_logged_but_forces_a_resync(load_clans):
+    load_clans()
+    db = SessionLocal()
+    try:
+        cursor = get_last_seq(db)
+        assert not get_clan_changes(db, cursor, 10).resync
+        db.rollback()
+
+        bulk_insert_clans(NEW_CLANS)
+
+        # One sequence number for the resync marker, none for the 1000 clans
+        assert get_last_seq(db) == cursor + 1
+        assert db.query(ClanChangeSQL).count() == 0
+        assert get_clan_changes(db, cursor, 10).resync
+    finally:
+        db.close()
+
+def test_writes_after_a_plain_seed_are_logged_again(load_clans):
+    load_clans()
+    db = SessionLocal()
+    try:
+        cursor = get_last_seq(db)
+        update_clan(db, 1, clan_name="Les Français Unis")
+        changes = get_clan_changes(db, cursor, 10)
+        assert not changes.resync
+        assert [change.id for change in changes.changes] == [1]
+    finally:
+        db.close()
+
+def test_upsert_seed_is_logged(load_clans):
+    load_clans()
+    db = SessionLocal()
+    try:
+        cursor = get_last_seq(db)
+        bulk_insert_clans([{"clan_id": 2, "clan_tag": "FROG", "clan_name": "Grenouilles", "country": "FRANCE"}, NEW_CLANS[0]], upsert=True)
+        changes = get_clan_changes(db, cursor, 10)
+        assert not changes.resync
+        assert sorted(change.id for change in changes.changes) == [2, 100]
+    finally:
+        db.close()
@@ -0,0 +1,16 @@
+import pytest
+from sqlalchemy import create_engine, text
+from database.database import engine_options
+
+@pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+def test_in_memory_sqlite_gets_no_pool_size_settings(url):
+    options = engine_options(url)
+    assert "pool_size" not in options and "max_overflow" not in options and "pool_timeout" not in options
+    with create_engine(url, **options).connect() as conn:
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+
+def test_file_sqlite_gets_the_pool_size_settings(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    options = engine_options(url)
+    assert {"pool_size", "max_overflow", "pool_timeout"} <= set(options)
+    create_engine(url, **options).dispose()
@@ -0,0 +1,45 @@
+import csv
+import gzip
+import io
+import json
+import pytest
+from api.crud import get_clan_rows
+from api.serialization import clan_rows_to_dicts
+from database.database import SessionLocal
+from importer_exporter import exporter
+from importer_exporter.exporter import ExportFormat, iter_clan_batches, stream_clans
+
+@pytest.fixture(scope="module", autouse=True)
+def clans(load_clans):
+    load_clans([
+        {"clan_id": 1, "clan_tag": "FR", "clan_name": "Les Français", "country": "FRANCE"},
+        {"clan_id": 2, "clan_tag": "UK", "clan_name": "Tea Time", "country": "United Kingdom"},
+        {"clan_id": 3, "clan_tag": "XX", "clan_name": "Inconnus", "country": None},
+    ])
+
+def test_ndjson_export_matches_the_api_records():
+    db = SessionLocal()
+    try:
+        api_clans = clan_rows_to_dicts(get_clan_rows(db))
+    finally:
+        db.close()
+    exported = b"".join(stream_clans(ExportFormat.NDJSON)).decode("utf-8").splitlines()
+    assert [json.loads(line) for line in exported] == api_clans
+    assert api_clans[1]["country"] == "United Kingdom"
+
+def test_csv_export_uses_display_countries():
+    rows = list(csv.reader(io.StringIO(b"".join(stream_clans(ExportFormat.CSV)).decode("utf-8"))))
+    assert [row[3] for row in rows[1:]] == ["France", "United Kingdom", "Unknown"]
+
+def test_seed_batches_keep_the_enum_names():
+    rows = [row for batch in iter_clan_batches(display_countries=False) for row in batch]
+    assert [row[3] for row in rows] == ["FRANCE", "UNITED_KINGDOM", "UNKNOWN"]
+
+def test_gzip_export_uses_the_configured_level(monkeypatch):
+    levels = []
+    compressobj = exporter.zlib.compressobj
+    monkeypatch.setattr(exporter.zlib, "compressobj", lambda level, *args: levels.append(level) or compressobj(level, *args))
+    plain = b"".join(stream_clans(ExportFormat.CSV))
+    assert gzip.decompress(b"".join(stream_clans(ExportFormat.CSV, compress=True))) == plain
+    assert gzip.decompress(b"".join(stream_clans(ExportFormat.CSV, compress=True, gzip_level=1))) == plain
+    assert levels == [exporter.GZIP_LEVEL, 1]
@@ -0,0 +1,12 @@
+from scraper.html_languages import parse_languages
+
+def test_parse_languages_reads_the_language_list(read_fixture):
+    languages = parse_languages(read_fixture("clan_page_languages.html"))
+    assert sorted(languages) == ["English", "Français", "Nederlands"]
+
+def test_parse_languages_returns_none_without_a_language_list(read_fixture):
+    # None, not an empty list, so get_languages falls back to the browser
+    assert parse_languages(read_fixture("clan_page_no_language_list.html")) is None
+
+def test_parse_languages_returns_an_empty_list_for_an_empty_language_list(read_fixture):
+    assert parse_languages(read_fixture("clan_page_empty_language_list.html")) == []
@@ -0,0 +1,83 @@
+import asyncio
+import httpx
+from sqlalchemy import text
+from api.model import ClanChangeSQL, ClanSQL
+from database.database import SessionLocal, engine
+from importer_exporter.importer import refresh_clans
+from utils.wg_api import WGClient
+
+STORED_CLANS = [
+    {"clan_id": 1, "clan_tag": "FR", "clan_name": "Les Français", "country": "FRANCE"},
+    {"clan_id": 2, "clan_tag": "FROG", "clan_name": "Frogs", "country": "FRANCE"},
+    {"clan_id": 3, "clan_tag": "BE", "clan_name": "Belgique Unie", "country": "BELGIUM"},
+    {"clan_id": 4, "clan_tag": "XX", "clan_name": "Inconnus", "country": "UNKNOWN"},
+    {"clan_id": 5, "clan_tag": "OLD", "clan_name": "Anciens", "country": "FRANCE"},
+    {"clan_id": 6, "clan_tag": "LOST", "clan_name": "Perdus", "country": "FRANCE"},
+    {"clan_id": 7, "clan_tag": "SAME", "clan_name": "Pareils", "country": "FRANCE"},
+]
+# clans/info of the stub WG API. Clans 2 and 3 swapped their tags, 4 is unknown, 5 is active
+# again and clan 6 is in a batch the API keeps failing.
+WG_CLANS = {
+    1: {"tag": "FR", "name": "Les Français Unis", "is_clan_disbanded": False},
+    2: {"tag": "BE", "name": "Frogs", "is_clan_disbanded": False},
+    3: {"tag": "FROG", "name": "Belgique Unie", "is_clan_disbanded": False},
+    5: {"tag": "OLD", "name": "Anciens", "is_clan_disbanded": False},
+    7: {"tag": "SAME", "name": "Pareils", "is_clan_disbanded": False},
+}
+FAILING_ID = 6
+
+def stub_clans_info(request: httpx.Request) -> httpx.Response:
+    clan_ids = [int(clan_id) for clan_id in request.url.params["clan_id"].split(",")]
+    if FAILING_ID in clan_ids:
+        return httpx.Response(503)
+    return httpx.Response(200, json={"status": "ok", "data": {str(clan_id): WG_CLANS.get(clan_id) for clan_id in clan_ids}})
+
+async def run_refresh():
+    transport = httpx.MockTransport(stub_clans_info)
+    async with WGClient(base_url="http://wg.test/wgn/", application_id="test", max_retries=0, transport=transport) as client:
+        return await refresh_clans(client, concurrency=2)
+
+def test_refresh_applies_the_wg_api_changes(load_clans, monkeypatch):
+    load_clans(STORED_CLANS)
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE clans SET is_disbanded = 1 WHERE id = 5"))
+        conn.execute(text(f"DELETE FROM {ClanChangeSQL.__tablename__}"))
+    # One clan per batch, so the failing batch only holds clan 6
+    monkeypatch.setattr("importer_exporter.importer.WG_API_BATCH_SIZE", 1)
+
+    summary = asyncio.run(run_refresh())
+
+    assert (summary.checked, summary.renamed, summary.disbanded, summary.reactivated, summary.failed) == (6, 3, 1, 1, 1)
+    assert summary.conflicts == {}
+    db = SessionLocal()
+    try:
+        rows = {clan.id: (clan.clan_tag, clan.clan_name, clan.is_disbanded) for clan in db.query(ClanSQL)}
+        changes = sorted(tuple(change) for change in db.query(ClanChangeSQL.clan_id, ClanChangeSQL.operation))
+    finally:
+        db.close()
+    assert rows == {
+        1: ("FR", "Les Français Unis", False),
+        2: ("BE", "Frogs", False),
+        3: ("FROG", "Belgique Unie", False),
+        4: ("XX", "Inconnus", True),
+        5: ("OLD", "Anciens", False),
+        6: ("LOST", "Perdus", False),
+        7: ("SAME", "Pareils", False),
+    }
+    # Only the renamed clans are logged, the disbanded flag is not part of the API records
+    assert sorted(set(changes)) == [(1, "update"), (2, "update"), (3, "update")]
+
+def test_refresh_reports_a_tag_still_held_by_another_clan(load_clans, monkeypatch):
+    load_clans(STORED_CLANS)
+    monkeypatch.setitem(WG_CLANS, 1, {"tag": "SAME", "name": "Les Français", "is_clan_disbanded": False})
+    monkeypatch.setattr("importer_exporter.importer.WG_API_BATCH_SIZE", 1)
+
+    summary = asyncio.run(run_refresh())
+
+    assert list(summary.conflicts) == [1]
+    db = SessionLocal()
+    try:
+        assert db.get(ClanSQL, 1).clan_tag == "FR"
+        assert db.get(ClanSQL, 7).clan_tag == "SAME"
+    finally:
+        db.close()
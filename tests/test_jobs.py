@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import threading
+import time
+import pytest
+from api.jobs import JobManager
+from api.model import ClanSQL, JobStatus
+from database.database import SessionLocal
+from importer_exporter.importer import refresh_clans
+
+def wait_for_status(manager, job_id, statuses, timeout=5):
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id).status not in statuses:
+        assert time.monotonic() < deadline, f"Job {job_id} is still {manager.get(job_id).status}"
+        time.sleep(0.01)
+
+def test_stop_cancels_jobs_that_check_the_stop_event():
+    manager = JobManager(workers=1, stop_timeout=5)
+    manager.start()
+
+    def long_job(progress, stop_event):
+        while not stop_event.wait(0.01):
+            pass
+        raise RuntimeError("Stopped between batches.")
+
+    running, _ = manager.submit("long", long_job)
+    queued, _ = manager.submit("queued", long_job)
+    wait_for_status(manager, running.id, {JobStatus.RUNNING})
+
+    start_time = time.perf_counter()
+    manager.stop()
+    assert time.perf_counter() - start_time < 1
+    assert manager.get(running.id).status == JobStatus.CANCELLED
+    assert manager.get(queued.id).status == JobStatus.CANCELLED
+
+def test_stop_gives_up_on_jobs_that_ignore_the_stop_event(caplog):
+    manager = JobManager(workers=1, stop_timeout=0.2)
+    manager.start()
+    release = threading.Event()
+    job, _ = manager.submit("stubborn", lambda progress, stop_event: release.wait(5))
+    wait_for_status(manager, job.id, {JobStatus.RUNNING})
+
+    with caplog.at_level(logging.WARNING, logger="api.jobs"):
+        start_time = time.perf_counter()
+        manager.stop()
+        assert time.perf_counter() - start_time < 2
+    assert f"Job {job.id} (stubborn) still running" in caplog.text
+    release.set()
+    wait_for_status(manager, job.id, {JobStatus.SUCCEEDED})
+
+class SlowWGClient:
+    """
+    Knows every clan under a new name, and takes a while to answer each batch.
+    """
+    def __init__(self, stop_event, stop_after):
+        self.stop_event = stop_event
+        self.stop_after = stop_after
+        self.batches = 0
+
+    async def fetch_clans(self, clan_ids):
+        self.batches += 1
+        if self.batches == self.stop_after:
+            self.stop_event.set()
+        await asyncio.sleep(0.01)
+        return {clan_id: {"tag": f"N{clan_id}", "name": "Renamed", "is_clan_disbanded": False} for clan_id in clan_ids}
+
+def test_stopped_refresh_skips_the_remaining_batches_and_writes_nothing(load_clans):
+    load_clans({"clan_id": clan_id, "clan_tag": f"T{clan_id}", "clan_name": "Original", "country": "FRANCE"} for clan_id in range(1, 1001))
+
+    stop_event = threading.Event()
+    client = SlowWGClient(stop_event, stop_after=2)
+    with pytest.raises(RuntimeError, match="nothing was written"):
+        asyncio.run(refresh_clans(client, concurrency=1, stop_event=stop_event))
+    assert client.batches == 2
+    db = SessionLocal()
+    assert db.query(ClanSQL).filter(ClanSQL.clan_name != "Original").count() == 0
+    db.close()
@@ -0,0 +1,103 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.async_routes import build_async_router
+from api.routes import router
+from api.snapshots import snapshot_cache
+from utils.config import MAX_INSERT_BATCH_SIZE
+
+# Clans of the fake WG API, None for IDs it does not know
+WG_CLANS = {10: {"tag": "NEW", "name": "Nouveau"}, 11: None, 12: {"tag": "NEW2", "name": "Nouveau 2"}}
+
+class FakeWGClient:
+    async def get_clan(self, clan_id):
+        return WG_CLANS.get(clan_id)
+
+    async def get_clans(self, clan_ids):
+        return {clan_id: WG_CLANS.get(clan_id) for clan_id in clan_ids}
+
+@pytest.fixture(autouse=True)
+def clans(load_clans, monkeypatch):
+    load_clans()
+    # Drop the snapshots of the previous test, the cache would serve them while it rebuilds them
+    snapshot_cache.close()
+    snapshot_cache.open()
+    monkeypatch.setattr("api.routes.get_wg_client", FakeWGClient)
+    monkeypatch.setattr("api.async_routes.get_wg_client", FakeWGClient)
+
+def make_client(mode: str) -> TestClient:
+    # Without the lifespan, so nothing seeds the database or starts a browser
+    app = FastAPI()
+    app.include_router(router if mode == "sync" else build_async_router())
+    return TestClient(app)
+
+@pytest.fixture(params=["sync", "async"])
+def client(request):
+    return make_client(request.param)
+
+READ_URLS = [
+    "/clans",
+    "/clans?limit=2",
+    "/clans?limit=2&fields=clan_tag,country",
+    "/clans?after=bad-cursor",
+    "/clans?fields=unknown",
+    "/clans/search?q=FR&limit=1",
+    "/clans/changes?since=0",
+    "/clans/country/france",
+    "/clans/country/atlantis",
+    "/countries/stats",
+]
+
+@pytest.mark.parametrize("url", READ_URLS)
+def test_sync_and_async_routes_respond_alike(url):
+    sync_response = make_client("sync").get(url, headers={"Accept-Encoding": "identity"})
+    async_response = make_client("async").get(url, headers={"Accept-Encoding": "identity"})
+    assert sync_response.status_code == async_response.status_code
+    assert sync_response.json() == async_response.json()
+    for header in ("ETag", "X-Next-Cursor"):
+        assert sync_response.headers.get(header) == async_response.headers.get(header)
+
+def test_pagination_follows_the_cursor(client):
+    ids = []
+    url = "/clans?limit=3"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [clan["id"] for clan in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/clans?limit=3&after={cursor}" if cursor else None
+    assert ids == [1, 2, 3, 4]
+
+def test_invalid_parameters_are_bad_requests(client):
+    assert client.get("/clans?after=bad-cursor").status_code == 400
+    assert client.get("/clans/country/atlantis").status_code == 400
+
+def test_unchanged_list_is_not_modified(client):
+    response = client.get("/clans", headers={"Accept-Encoding": "identity"})
+    etag = response.headers["ETag"]
+    assert client.get("/clans", headers={"Accept-Encoding": "identity", "If-None-Match": etag}).status_code == 304
+
+def test_insert_by_id(client):
+    response = client.post("/clans/insert_by_id", json={"id": 10, "country": "France"})
+    assert response.status_code == 200
+    assert response.json()["clan_tag"] == "NEW"
+    assert client.post("/clans/insert_by_id", json={"id": 11}).status_code == 404
+    assert client.post("/clans/insert_by_id", json={"id": 10}).status_code == 400
+
+def test_insert_by_ids_reports_every_id_in_request_order(client):
+    response = client.post("/clans/insert_by_ids", json=[
+        {"id": 12, "country": "France"},
+        {"id": 1},
+        {"id": 11},
+        {"id": 13, "country": "Atlantis"},
+        {"id": 12},
+    ])
+    assert response.status_code == 200
+    assert [(result["id"], result["status"]) for result in response.json()] == [
+        (12, "created"), (1, "duplicate"), (11, "not_found"), (13, "invalid_country"),
+    ]
+    assert 12 in [clan["id"] for clan in client.get("/clans/country/france").json()]
+
+def test_insert_by_ids_rejects_oversized_batches(client):
+    response = client.post("/clans/insert_by_ids", json=[{"id": clan_id} for clan_id in range(MAX_INSERT_BATCH_SIZE + 1)])
+    assert response.status_code == 400
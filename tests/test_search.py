@@ -0,0 +1,24 @@
+import pytest
+from api.crud import search_clans
+from database.database import SessionLocal
+from database.seeds import load_seed_data
+from utils.config import SEED_DATA_PATH
+
+@pytest.fixture(scope="module")
+def db(load_clans):
+    assert load_clans(load_seed_data(SEED_DATA_PATH)) > 0
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.mark.parametrize("query, clan_id", [("FR", 500000604), ("-FR-", 500004318), ("fr", 500000604)])
+def test_exact_tag_comes_first_even_beyond_the_limit(db, query, clan_id):
+    # Dozens of tags start with FR and outrank the exact one in bm25
+    clans = search_clans(db, query, 20)
+    assert clans[0].id == clan_id
+    assert len(clans) == 20
+
+def test_search_without_exact_tag_keeps_the_rank_order(db):
+    clans = search_clans(db, "FROG", 5)
+    assert 0 < len(clans) <= 5
+    assert all("FROG" in clan.clan_tag or "frog" in clan.clan_name.lower() for clan in clans)
@@ -0,0 +1,30 @@
+from api.model import ClanSQL
+from database.database import SessionLocal
+from database.seeds import bulk_insert_clans
+
+def stored_tags():
+    db = SessionLocal()
+    try:
+        return dict(db.query(ClanSQL.id, ClanSQL.clan_tag))
+    finally:
+        db.close()
+
+def test_upsert_swaps_tags_between_clans(load_clans):
+    load_clans()
+    total = bulk_insert_clans([
+        {"clan_id": 1, "clan_tag": "BE", "clan_name": "Les Français", "country": "FRANCE"},
+        {"clan_id": 3, "clan_tag": "FR", "clan_name": "Belgique Unie", "country": "BELGIUM"},
+    ], upsert=True)
+    assert total == 2
+    assert stored_tags() == {1: "BE", 2: "FROG", 3: "FR", 4: "XX"}
+
+def test_upsert_of_a_new_clan_takes_over_a_stored_tag(load_clans, caplog):
+    load_clans()
+    # The swap spans two chunks, and clan 4 is not in the seed, so it keeps a placeholder tag
+    bulk_insert_clans([
+        {"clan_id": 1, "clan_tag": "FROG", "clan_name": "Les Français", "country": "FRANCE"},
+        {"clan_id": 2, "clan_tag": "FR", "clan_name": "Frogs", "country": "FRANCE"},
+        {"clan_id": 5, "clan_tag": "XX", "clan_name": "Nouveaux", "country": "FRANCE"},
+    ], chunk_size=1, upsert=True)
+    assert stored_tags() == {1: "FROG", 2: "FR", 3: "BE", 4: "#4", 5: "XX"}
+    assert "1 clans lost their tag" in caplog.text
@@ -0,0 +1,77 @@
+import gzip
+import threading
+import time
+import pytest
+from api import snapshots
+from api.http_cache import IDENTITY
+from api.snapshots import ALL_CLANS, SnapshotCache
+from database.database import engine
+from database.meta import bump_dataset_version
+
+@pytest.fixture
+def cache(load_clans):
+    load_clans()
+    cache = SnapshotCache()
+    yield cache
+    cache.close()
+
+def test_close_stops_a_running_rebuild(cache, monkeypatch):
+    for key in (ALL_CLANS, "FRANCE", "BELGIUM"):
+        cache.build(key)
+    with engine.begin() as conn:
+        bump_dataset_version(conn)
+
+    built = []
+    build = cache.build
+    def tracked_build(key):
+        built.append(threading.current_thread())
+        return build(key)
+    monkeypatch.setattr(cache, "build", tracked_build)
+
+    # Slow for the rebuild of this cache only, the shared cache may be rebuilding too
+    started = threading.Event()
+    get_clan_rows = snapshots.get_clan_rows
+    def slow_get_clan_rows(db, country=None):
+        if threading.current_thread() in built:
+            started.set()
+            time.sleep(0.2)
+        return get_clan_rows(db, country)
+    monkeypatch.setattr(snapshots, "get_clan_rows", slow_get_clan_rows)
+    cache.schedule_rebuild()
+    assert started.wait(5)
+    cache.close()
+
+    # The rebuild in progress finished without caching its snapshot, and no other key was built
+    assert len(built) == 1
+    time.sleep(0.3)
+    assert len(built) == 1
+    assert cache.get_cached(ALL_CLANS, "any") is None
+
+def test_closed_cache_serves_without_caching(cache):
+    cache.close()
+    assert cache.build(ALL_CLANS).bodies
+    assert cache.get_cached(ALL_CLANS, "any") is None
+    cache.schedule_rebuild()
+
+    cache.open()
+    snapshot = cache.build(ALL_CLANS)
+    assert cache.get_cached(ALL_CLANS, snapshot.version) is snapshot
+
+def test_codings_are_compressed_on_first_request_and_kept_by_rebuilds(cache, monkeypatch):
+    monkeypatch.setattr(snapshots, "COMPRESSION_MIN_SIZE", 0)
+    snapshot = cache.build(ALL_CLANS)
+    assert list(snapshot.bodies) == [IDENTITY]
+
+    assert gzip.decompress(snapshot.body("gzip")) == snapshot.body(IDENTITY)
+    assert list(snapshot.bodies) == [IDENTITY, "gzip"]
+
+    with engine.begin() as conn:
+        bump_dataset_version(conn)
+    rebuilt = cache.build(ALL_CLANS)
+    assert rebuilt.version != snapshot.version
+    assert list(rebuilt.bodies) == [IDENTITY, "gzip"]
+
+def test_small_snapshots_are_not_compressed(cache):
+    snapshot = cache.build(ALL_CLANS)
+    assert snapshot.body("gzip") is snapshot.body(IDENTITY)
+    assert list(snapshot.bodies) == [IDENTITY]
@@ -0,0 +1,102 @@
+import asyncio
+import httpx
+import pytest
+from utils import wg_api
+from utils.wg_api import WGAPIError, WGClient
+
+class StubWGAPI:
+    """
+    clans/info of a WG API knowing the clans of known_ids, answering with the queued failures first.
+
+    A failure is an HTTP status code, an exception to raise or a WG API error message.
+    """
+    def __init__(self, known_ids=(), failures=(), delay=0):
+        self.known_ids = set(known_ids)
+        self.failures = list(failures)
+        self.delay = delay
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        clan_ids = [int(clan_id) for clan_id in request.url.params["clan_id"].split(",")]
+        self.requests.append(clan_ids)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+
+        if self.failures:
+            failure = self.failures.pop(0)
+            if isinstance(failure, int):
+                return httpx.Response(failure)
+            if isinstance(failure, Exception):
+                raise failure
+            return httpx.Response(200, json={"status": "error", "error": {"message": failure}})
+        data = {str(clan_id): {"clan_id": clan_id, "tag": f"T{clan_id}", "name": f"Clan {clan_id}", "is_clan_disbanded": False} if clan_id in self.known_ids else None for clan_id in clan_ids}
+        return httpx.Response(200, json={"status": "ok", "data": data})
+
+def make_client(stub, **kwargs) -> WGClient:
+    return WGClient(base_url="http://wg.test/wgn/", application_id="test", transport=httpx.MockTransport(stub), **kwargs)
+
+async def run_with(stub, coroutine_factory, **kwargs):
+    async with make_client(stub, **kwargs) as client:
+        return await coroutine_factory(client)
+
+def test_fetch_clans_sends_batches_of_batch_size_ids():
+    stub = StubWGAPI(known_ids=range(1, 201))
+    clans = asyncio.run(run_with(stub, lambda client: client.fetch_clans(range(1, 251)), batch_size=100))
+    assert sorted(len(batch) for batch in stub.requests) == [50, 100, 100]
+    assert clans[1]["tag"] == "T1"
+    assert clans[250] is None
+    assert len(clans) == 250
+
+def test_concurrent_get_clan_calls_share_one_request():
+    stub = StubWGAPI(known_ids={1, 2})
+
+    async def lookups(client):
+        return await asyncio.gather(client.get_clan(1), client.get_clan(1), client.get_clan(2), client.get_clan(3))
+
+    first, same, second, unknown = asyncio.run(run_with(stub, lookups))
+    assert stub.requests == [[1, 2, 3]]
+    assert first == same and first["tag"] == "T1"
+    assert second["tag"] == "T2"
+    assert unknown is None
+
+def test_get_clan_batches_are_flushed_at_batch_size():
+    stub = StubWGAPI(known_ids=range(5))
+    asyncio.run(run_with(stub, lambda client: client.get_clans(range(5)), batch_size=2))
+    assert sorted(map(sorted, stub.requests)) == [[0, 1], [2, 3], [4]]
+
+@pytest.mark.parametrize("failures", [[503, 502], [httpx.ReadTimeout("timed out"), 500], ["REQUEST_LIMIT_EXCEEDED", 429]])
+def test_transient_failures_are_retried_with_backoff(failures, monkeypatch):
+    delays = []
+    sleep = asyncio.sleep
+    monkeypatch.setattr(wg_api.asyncio, "sleep", lambda delay: delays.append(delay) or sleep(0))
+    stub = StubWGAPI(known_ids={1}, failures=failures)
+    clans = asyncio.run(run_with(stub, lambda client: client.fetch_clans([1]), max_retries=3, retry_backoff=0.5))
+    assert clans[1]["tag"] == "T1"
+    assert len(stub.requests) == 3
+    # The stub's own sleeps are the zero ones
+    assert [delay for delay in delays if delay] == [0.5, 1.0]
+
+def test_retries_give_up_after_max_retries(monkeypatch):
+    stub = StubWGAPI(failures=[503] * 10)
+    with pytest.raises(WGAPIError):
+        asyncio.run(run_with(stub, lambda client: client.fetch_clans([1]), max_retries=2, retry_backoff=0))
+    assert len(stub.requests) == 3
+
+def test_other_errors_are_not_retried():
+    stub = StubWGAPI(failures=[404, "INVALID_APPLICATION_ID"])
+    with pytest.raises(WGAPIError):
+        asyncio.run(run_with(stub, lambda client: client.fetch_clans([1]), retry_backoff=0))
+    assert len(stub.requests) == 1
+
+def test_in_flight_requests_are_bounded_by_max_connections():
+    stub = StubWGAPI(known_ids=range(12), delay=0.02)
+    clans = asyncio.run(run_with(stub, lambda client: client.fetch_clans(range(12)), batch_size=1, max_connections=3))
+    assert len(stub.requests) == 12
+    assert stub.max_in_flight == 3
+    assert all(clans[clan_id]["tag"] == f"T{clan_id}" for clan_id in range(12))
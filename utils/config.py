@@ -1,26 +1,92 @@
 import os
+from datetime import timedelta
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Logging: LOG_LEVELS sets per-module levels, e.g. "api.crud=WARNING,database=INFO"
+LOG_DIR = os.getenv("LOG_DIR", "log")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "INFO").upper()
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "DEBUG").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_RATE_LIMIT_PER_SECOND = float(os.getenv("LOG_RATE_LIMIT_PER_SECOND", "5"))
+
 WG_API_KEY = os.getenv("WG_API_KEY")
 if WG_API_KEY is None:
     raise ValueError("WG_API_KEY not found in .env file")
 
-# f"https://api.worldoftanks.eu/wgn/clans/list/?application_id={WG_API_KEY}&fields=clan_id%2Cname%2Ctag&game=wot&language=fr&search="
+# Wargaming API client settings, WG_API_URL can point to a local stub server for testing
+WG_API_URL = os.getenv("WG_API_URL", "https://api.worldoftanks.eu/wgn/")
+WG_API_TIMEOUT = float(os.getenv("WG_API_TIMEOUT", "10"))
+WG_API_MAX_RETRIES = int(os.getenv("WG_API_MAX_RETRIES", "3"))
+WG_API_RETRY_BACKOFF = float(os.getenv("WG_API_RETRY_BACKOFF", "0.5"))
+WG_API_MAX_CONNECTIONS = int(os.getenv("WG_API_MAX_CONNECTIONS", "10"))
+WG_API_BATCH_SIZE = 100  # Maximum number of clan IDs accepted by clans/info
+WG_API_BATCH_DELAY = float(os.getenv("WG_API_BATCH_DELAY", "0.01"))
+WG_API_CLAN_FIELDS = "clan_id,name,tag,is_clan_disbanded"
+# clans/info batches the importer refresh keeps in flight
+IMPORTER_CONCURRENCY = int(os.getenv("IMPORTER_CONCURRENCY", "4"))
+
+# Headless browser pool used to scrape clan pages
+SCRAPER_MAX_PAGES = int(os.getenv("SCRAPER_MAX_PAGES", "4"))
+SCRAPER_PAGE_TIMEOUT_MS = int(os.getenv("SCRAPER_PAGE_TIMEOUT_MS", "10000"))
+SCRAPER_PAGE_MAX_USES = int(os.getenv("SCRAPER_PAGE_MAX_USES", "50"))
+SCRAPER_HTTP_TIMEOUT = float(os.getenv("SCRAPER_HTTP_TIMEOUT", "10"))
+# Clan page scraped for languages, can point to a local server for testing
+CLAN_PAGE_URL = os.getenv("CLAN_PAGE_URL", "https://eu.wargaming.net/clans/wot/{clan_id}/")
+# Scraped clan languages are served from the database until they are older than this
+LANGUAGES_TTL = timedelta(hours=float(os.getenv("LANGUAGES_TTL_HOURS", "168")))
+LANGUAGES_REFRESH_CONCURRENCY = int(os.getenv("LANGUAGES_REFRESH_CONCURRENCY", os.getenv("SCRAPER_MAX_PAGES", "4")))
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+MAX_SEARCH_RESULTS = int(os.getenv("MAX_SEARCH_RESULTS", "100"))
+MAX_INSERT_BATCH_SIZE = int(os.getenv("MAX_INSERT_BATCH_SIZE", "1000"))
+
+# Read endpoints compress responses of at least COMPRESSION_MIN_SIZE bytes, brotli requires the brotli package
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+# Pre-serialized /clans and per-country lists, compressed again after every write, so keep the levels moderate
+SNAPSHOT_CACHE_ENABLED = os.getenv("SNAPSHOT_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SNAPSHOT_GZIP_LEVEL = int(os.getenv("SNAPSHOT_GZIP_LEVEL", str(GZIP_LEVEL)))
+SNAPSHOT_BROTLI_QUALITY = int(os.getenv("SNAPSHOT_BROTLI_QUALITY", str(BROTLI_QUALITY)))
 
-BASE_URL = (
-    f"https://api.worldoftanks.eu/wgn/clans/info/?application_id={WG_API_KEY}&game=wot&language=fr&fields=clan_id%2Cname%2Ctag&clan_id="
-)
+EXPORT_DIR = "data/export"
+CSV_EXPORT_PATH = f"{EXPORT_DIR}/clans.csv"
+TXT_EXPORT_PATH = f"{EXPORT_DIR}/clans.txt"
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
 
-CSV_EXPORT_PATH = "data/export/clans.csv"
-TXT_EXPORT_PATH = "data/export/clans.txt"
+# Background jobs (refresh, seed export, file exports) run on JOB_WORKERS threads
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "100"))  # Finished jobs kept for GET /jobs/{id}
+JOB_STOP_TIMEOUT = float(os.getenv("JOB_STOP_TIMEOUT", "30"))  # Seconds shutdown waits for running jobs
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./database.db"
-DATABASE_URL = "sqlite:///./data/database/clans.db"
+# Database engine: the PRAGMAs are applied to every new SQLite connection
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL").upper()  # WAL lets readers run while a write commits
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # Negative values are in KiB, so 64 MiB per connection
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Serve the database routes from async handlers on an AsyncEngine (aiosqlite for SQLite) instead of the threadpool
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
+# Changes served by /clans/changes, older ones are compacted and their clients must resync
+CHANGE_LOG_MAX_ENTRIES = int(os.getenv("CHANGE_LOG_MAX_ENTRIES", "100000"))
+CHANGE_LOG_RETENTION = timedelta(days=int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30")))
 
 FULL_JSON_PATH = 'data/raw/Full_version_french_clan_list.json'
 FRENCH_JSON_PATH = 'data/raw/Safe_version_french_clan_list.json'
+# Manually validated clan lists used to build the seed, mapped to their Country name
+VALIDATED_JSON_PATHS = {FRENCH_JSON_PATH: "FRANCE"}
 SEED_DIR = "data/seed"
-SEED_DATA_PATH = f'{SEED_DIR}/seed_data.json'
\ No newline at end of file
+# Gzip JSON Lines seed, see database/seed_format.py. Legacy JSON array seeds still load.
+SEED_DATA_PATH = f'{SEED_DIR}/seed_data.jsonl.gz'
+SEED_CHUNK_SIZE = int(os.getenv("SEED_CHUNK_SIZE", "5000"))
+SEED_COMPRESS_LEVEL = int(os.getenv("SEED_COMPRESS_LEVEL", "6"))
\ No newline at end of file
@@ -1,39 +1,137 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
+from utils.config import LOG_DIR, LOG_FORMAT, LOG_LEVEL, LOG_CONSOLE_LEVEL, LOG_FILE_LEVEL, LOG_LEVELS, LOG_RATE_LIMIT_PER_SECOND
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class JsonFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+    """
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let at most `rate` records per second through for each `rate_limit_key`.
+
+    Per-row messages opt in with `extra={"rate_limit_key": "..."}`. The next record that gets
+    through reports how many similar records were dropped in between.
+    """
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.windows = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "rate_limit_key", None)
+        if key is None or self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        with self.lock:
+            window_start, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - window_start >= 1.0:
+                window_start, count = now, 0
+            if count >= self.rate:
+                self.windows[key] = (window_start, count, suppressed + 1)
+                return False
+            self.windows[key] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+_lock = threading.Lock()
+_queue_handler = None
+_listener = None
+
+def _parse_levels(levels: str) -> dict:
+    """
+    Parse "module=LEVEL,other.module=LEVEL" into a dictionary.
+    """
+    parsed = {}
+    for item in levels.split(","):
+        if "=" in item:
+            name, level = item.split("=", 1)
+            parsed[name.strip()] = level.strip().upper()
+    return parsed
+
+_module_levels = _parse_levels(LOG_LEVELS)
+
+def _level_for(name: str) -> str:
+    """
+    Level of the most specific LOG_LEVELS entry matching the logger name, else LOG_LEVEL.
+    """
+    matches = [module for module in _module_levels if name == module or name.startswith(module + ".")]
+    return _module_levels[max(matches, key=len)] if matches else LOG_LEVEL
+
+def _get_queue_handler() -> logging.Handler:
+    """
+    Create, once per process, the queue handler and the listener thread writing to the console and log file.
+    """
+    global _queue_handler, _listener
+    with _lock:
+        if _queue_handler is not None:
+            return _queue_handler
+
+        # Ensure the log folder exists
+        os.makedirs(LOG_DIR, exist_ok=True)
+
+        formatter = JsonFormatter() if LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT)
+
+        # Console handler to log messages to the console
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(LOG_CONSOLE_LEVEL)
+        console_handler.setFormatter(formatter)
+
+        # File handler to save logs to a file in the log folder
+        file_handler = logging.FileHandler(os.path.join(LOG_DIR, 'app.log'), encoding='utf-8')  # Ensure UTF-8 encoding
+        file_handler.setLevel(LOG_FILE_LEVEL)
+        file_handler.setFormatter(formatter)
+
+        # Records are queued by the calling thread and written to disk by the listener thread
+        log_queue = queue.SimpleQueue()
+        _queue_handler = logging.handlers.QueueHandler(log_queue)
+        _queue_handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT_PER_SECOND))
+        _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _queue_handler
 
 def setup_logger(name: str) -> logging.Logger:
     """
     Set up a logger with a specified name and save logs in the 'log' folder.
 
+    All loggers share one queue handler, so calling this several times for the same name does
+    not duplicate output, and logging never blocks on console or disk writes.
+
     Args:
         name (str): The name of the logger.
 
     Returns:
         logging.Logger: The configured logger.
     """
-    # Ensure the 'log' folder exists
-    if not os.path.exists('log'):
-        os.makedirs('log')
+    queue_handler = _get_queue_handler()
 
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)  # Set the default log level to DEBUG
-
-    # Create a formatter that includes the timestamp, log level, and message
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-
-    # Create a console handler to log messages to the console
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.INFO)  # Set the log level for the console
-    console_handler.setFormatter(formatter)
-
-    # Create a file handler to save logs to a file in the 'log' folder
-    log_file_path = os.path.join('log', 'app.log')
-    file_handler = logging.FileHandler(log_file_path, encoding='utf-8')  # Ensure UTF-8 encoding
-    file_handler.setLevel(logging.DEBUG)  # Set the log level for the file
-    file_handler.setFormatter(formatter)
-
-    # Add the handlers to the logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.setLevel(_level_for(name))
+    if queue_handler not in logger.handlers:
+        logger.addHandler(queue_handler)
 
     return logger
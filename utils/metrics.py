@@ -0,0 +1,66 @@
+import time
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# HTTP metrics, labelled by route template (e.g. /clans/{clan_id}/languages) to keep cardinality bounded
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests handled.", ["method", "route", "status"])
+HTTP_REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being handled.", ["method"])
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests, until the response is fully sent.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Outbound calls and long-running operations
+WG_API_REQUESTS = Counter("wg_api_requests_total", "Requests sent to the Wargaming API.", ["method", "outcome"])
+SCRAPER_BROWSER_LAUNCHES = Counter("scraper_browser_launches_total", "Headless browser launches.")
+SCRAPER_PAGES_OPENED = Counter("scraper_pages_opened_total", "Browser pages opened by the scraper pool.")
+SCRAPER_LOOKUPS = Counter("scraper_language_lookups_total", "Clan language lookups by the path that answered them.", ["path"])
+SEED_DURATION = Histogram("seed_duration_seconds", "Time spent bulk-loading seed data.", buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900))
+SEED_ROWS = Counter("seed_rows_total", "Clans written by bulk seeding.")
+SNAPSHOT_REQUESTS = Counter("snapshot_requests_total", "List requests answered from the snapshot cache, by result (hit, stale or miss).", ["result"])
+SNAPSHOT_REBUILD_DURATION = Histogram("snapshot_rebuild_duration_seconds", "Time spent serializing and compressing a clan list snapshot.", buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60))
+EXPORT_DURATION = Histogram("export_duration_seconds", "Time spent streaming a clan export.", ["format"], buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300))
+JOBS = Counter("jobs_total", "Background jobs finished, by kind and final status.", ["kind", "status"])
+JOB_DURATION = Histogram("job_duration_seconds", "Time spent running a background job.", ["kind"], buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, in-flight requests and latency per route template.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        start_time = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            route = scope.get("route")
+            route_path = getattr(route, "path", UNMATCHED_ROUTE)
+            HTTP_REQUESTS.labels(method, route_path, str(status)).inc()
+            HTTP_REQUEST_DURATION.labels(method, route_path, str(status)).observe(time.perf_counter() - start_time)
+
+def render_metrics():
+    """
+    Return the current metrics in the Prometheus text format, with their content type.
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,231 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional
+import httpx
+from utils.config import (
+    WG_API_KEY,
+    WG_API_URL,
+    WG_API_TIMEOUT,
+    WG_API_MAX_RETRIES,
+    WG_API_RETRY_BACKOFF,
+    WG_API_MAX_CONNECTIONS,
+    WG_API_BATCH_SIZE,
+    WG_API_BATCH_DELAY,
+    WG_API_CLAN_FIELDS,
+)
+from utils.logging import setup_logger
+from utils.metrics import WG_API_REQUESTS
+
+# Set up the logger for this file/module
+logger = setup_logger(__name__)
+
+# WG API errors worth retrying: they come back as HTTP 200 with "status": "error"
+RETRYABLE_API_ERRORS = {"REQUEST_LIMIT_EXCEEDED", "SOURCE_NOT_AVAILABLE"}
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class WGAPIError(Exception):
+    """
+    Raised when the Wargaming API cannot be reached or returns an error.
+    """
+
+class _RetryableWGAPIError(WGAPIError):
+    """
+    Transient failure that the client retries before giving up.
+    """
+
+class WGClient:
+    """
+    Async Wargaming API client with keep-alive connection pooling, timeouts and retries.
+
+    Concurrent get_clan() calls are coalesced into clans/info requests of up to
+    batch_size comma-separated IDs. transport replaces the network, for tests with an
+    httpx.MockTransport.
+    """
+
+    def __init__(
+        self,
+        base_url: str = WG_API_URL,
+        application_id: str = WG_API_KEY,
+        timeout: float = WG_API_TIMEOUT,
+        max_retries: int = WG_API_MAX_RETRIES,
+        retry_backoff: float = WG_API_RETRY_BACKOFF,
+        max_connections: int = WG_API_MAX_CONNECTIONS,
+        batch_size: int = WG_API_BATCH_SIZE,
+        batch_delay: float = WG_API_BATCH_DELAY,
+        clan_fields: str = WG_API_CLAN_FIELDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.application_id = application_id
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.clan_fields = clan_fields
+        self._client = httpx.AsyncClient(
+            base_url=base_url.rstrip("/") + "/",
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            transport=transport,
+        )
+        # Bound in-flight requests to the pool size so queued batches don't hit the pool timeout
+        self._semaphore = asyncio.Semaphore(max_connections)
+        self._pending: Dict[int, List[asyncio.Future]] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        """
+        Wait for in-flight batches and close the pooled connections.
+        """
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._client.aclose()
+
+    async def request(self, path: str, params: dict) -> dict:
+        """
+        Call a WG API method and return its "data" member, retrying transient failures with backoff.
+        """
+        params = {"application_id": self.application_id, **params}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(path, params=params)
+                if response.status_code in RETRYABLE_STATUS_CODES:
+                    raise _RetryableWGAPIError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                result = response.json()
+            except (httpx.TransportError, _RetryableWGAPIError) as e:
+                WG_API_REQUESTS.labels(path, "retryable_error").inc()
+                if attempt == self.max_retries:
+                    logger.error(f"WG API request to {path} failed after {attempt + 1} attempts: {e}")
+                    raise WGAPIError(f"WG API request to {path} failed: {e}") from e
+                delay = self.retry_backoff * 2 ** attempt
+                logger.warning(f"WG API request to {path} failed ({e}), retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
+                continue
+            except (httpx.HTTPStatusError, ValueError) as e:
+                WG_API_REQUESTS.labels(path, "error").inc()
+                logger.error(f"WG API request to {path} failed: {e}")
+                raise WGAPIError(f"WG API request to {path} failed: {e}") from e
+
+            if result.get("status") == "error":
+                WG_API_REQUESTS.labels(path, "api_error").inc()
+                message = result.get("error", {}).get("message", "unknown error")
+                if message in RETRYABLE_API_ERRORS and attempt < self.max_retries:
+                    delay = self.retry_backoff * 2 ** attempt
+                    logger.warning(f"WG API returned {message} for {path}, retrying in {delay:.2f}s...")
+                    await asyncio.sleep(delay)
+                    continue
+                logger.error(f"WG API error on {path}: {message}")
+                raise WGAPIError(f"WG API error on {path}: {message}")
+
+            WG_API_REQUESTS.labels(path, "ok").inc()
+            return result.get("data") or {}
+
+    async def fetch_clans(self, clan_ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+        """
+        Fetch clans/info for the given IDs in batches of batch_size, without coalescing.
+
+        Returns a mapping of clan ID to clan data, or None for IDs unknown to the API.
+        """
+        clan_ids = list(dict.fromkeys(clan_ids))
+        batches = [clan_ids[i:i + self.batch_size] for i in range(0, len(clan_ids), self.batch_size)]
+        results = await asyncio.gather(*(self._fetch_batch(batch) for batch in batches))
+
+        clans = {}
+        for result in results:
+            clans.update(result)
+        return clans
+
+    async def get_clan(self, clan_id: int) -> Optional[dict]:
+        """
+        Fetch one clan, sharing a batched clans/info call with concurrent lookups.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(clan_id, []).append(future)
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_delay, self._flush)
+
+        return await future
+
+    async def get_clans(self, clan_ids: Iterable[int]) -> Dict[int, Optional[dict]]:
+        """
+        Fetch several clans through the coalescing path.
+        """
+        clan_ids = list(dict.fromkeys(clan_ids))
+        results = await asyncio.gather(*(self.get_clan(clan_id) for clan_id in clan_ids))
+        return dict(zip(clan_ids, results))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        clan_ids = list(pending)
+        for i in range(0, len(clan_ids), self.batch_size):
+            batch = {clan_id: pending[clan_id] for clan_id in clan_ids[i:i + self.batch_size]}
+            task = asyncio.ensure_future(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: Dict[int, List[asyncio.Future]]):
+        try:
+            clans = await self._fetch_batch(list(batch))
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for clan_id, futures in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(clans.get(clan_id))
+
+    async def _fetch_batch(self, clan_ids: List[int]) -> Dict[int, Optional[dict]]:
+        logger.debug(f"Requesting WG clans/info for {len(clan_ids)} clans.")
+        data = await self.request(
+            "clans/info/",
+            {
+                "clan_id": ",".join(str(clan_id) for clan_id in clan_ids),
+                "fields": self.clan_fields,
+                "game": "wot",
+                "language": "fr",
+            },
+        )
+        return {clan_id: data.get(str(clan_id)) for clan_id in clan_ids}
+
+# Shared client used by the API routes, created on first use
+_client: Optional[WGClient] = None
+
+def get_wg_client() -> WGClient:
+    """
+    Return the process-wide WG API client.
+    """
+    global _client
+    if _client is None:
+        _client = WGClient()
+    return _client
+
+async def close_wg_client():
+    """
+    Close the process-wide WG API client, if it was created.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None